@@ -38,12 +38,13 @@ def test_get_fields_change_mode():
 def test_get_readonly_fields_add_mode():
     """
     Tests that the get_readonly_fields method returns the correct readonly fields when adding a video.
-    For adding a video, the readonly fields should include various resolution fields.
+    For adding a video, the readonly fields should include the generated and probed fields.
     """
 
     video_admin = VideoAdmin(Video, AdminSite())
     readonly_fields = video_admin.get_readonly_fields(DummyRequest(), obj=None)
-    expected_fields = ["video_144p", "video_240p", "video_360p", "video_480p", "video_720p", "video_1080p"]
+    expected_fields = ["hls_playlist", "duration", "width", "height", "video_codec", "audio_codec",
+                       "bitrate", "frame_rate"]
     assert readonly_fields == expected_fields
 
 
@@ -51,7 +52,7 @@ def test_get_readonly_fields_add_mode():
 def test_get_readonly_fields_change_mode():
     """
     Tests that the get_readonly_fields method returns the correct readonly fields when changing a video.
-    For changing a video, the readonly fields should include various resolution fields and the 'id' field.
+    For changing a video, the readonly fields should include the generated fields and the 'id' field.
     """
 
     video_admin = VideoAdmin(Video, AdminSite())
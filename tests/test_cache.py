@@ -0,0 +1,36 @@
+import time
+from django.core.cache import cache
+from video_app.cache import get_or_compute, get_catalog_key, bump_catalog_version
+
+
+def test_get_or_compute_caches_value():
+    """
+    Tests that a value is computed once and then served from the cache.
+    """
+    calls = []
+    key = f"test:get_or_compute:{time.time()}"
+    assert get_or_compute(key, lambda: calls.append(1) or 'value') == 'value'
+    assert get_or_compute(key, lambda: calls.append(1) or 'other') == 'value'
+    assert len(calls) == 1
+
+
+def test_get_or_compute_serves_previous_value_while_locked():
+    """
+    Tests that after the soft expiry only the holder of the lock recomputes and
+    everybody else gets the previous value instead of hitting the database.
+    """
+    key = f"test:stampede:{time.time()}"
+    cache.set(key, {'value': 'previous', 'expires': time.time() - 1}, 60)
+    cache.add(f"{key}:lock", 1, 30)
+    assert get_or_compute(key, lambda: 'recomputed') == 'previous'
+    cache.delete(f"{key}:lock")
+    assert get_or_compute(key, lambda: 'recomputed') == 'recomputed'
+
+
+def test_catalog_key_changes_with_version():
+    """
+    Tests that bumping the catalog version changes all catalog keys.
+    """
+    key = get_catalog_key('rows')
+    bump_catalog_version()
+    assert get_catalog_key('rows') != key
@@ -0,0 +1,65 @@
+import os
+import shutil
+import tempfile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from video_app.models import Video, VideoRendition, TranscodeJob, get_content_hash
+from video_app.signals import probe_and_enqueue
+
+
+class ContentHashDeduplicationTestCase(TestCase):
+
+    def setUp(self):
+        """
+        Set up a temporary media root and a converted video with one rendition.
+        """
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.original = Video.objects.create(title="Original", description="desc",
+                                             video_file=SimpleUploadedFile("movie.mp4", b"same content"))
+        self.original.hls_playlist = "videos/hls/1/master.m3u8"
+        self.original.content_hash = get_content_hash(self.original.video_file)
+        self.original.save(update_fields=["hls_playlist", "content_hash"])
+        self.rendition = VideoRendition.objects.create(video=self.original, height=360,
+                                                       status=VideoRendition.STATUS_DONE,
+                                                       file=SimpleUploadedFile("movie.360p.mp4", b"converted"))
+
+    def tearDown(self):
+        """
+        Remove the temporary media root.
+        """
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def test_duplicate_upload_links_existing_files(self):
+        """
+        Test that a second upload of the same source is not hashed while it is
+        saved and that its probe job makes it share the source file and the
+        renditions of the original instead of converting it again.
+        """
+        duplicate = Video.objects.create(title="Copy", description="desc",
+                                         video_file=SimpleUploadedFile("copy.mp4", b"same content"))
+        self.assertEqual(duplicate.content_hash, '')
+        probe_and_enqueue(duplicate.id)
+        duplicate.refresh_from_db()
+        self.assertEqual(duplicate.content_hash, self.original.content_hash)
+        self.assertEqual(duplicate.video_file.name, self.original.video_file.name)
+        self.assertEqual(duplicate.hls_playlist.name, self.original.hls_playlist.name)
+        self.assertEqual([r.file.name for r in duplicate.renditions.all()], [self.rendition.file.name])
+        self.assertFalse(duplicate.jobs.filter(stage=TranscodeJob.STAGE_RENDITION).exists())
+        self.assertFalse(duplicate.renditions.exclude(file=self.rendition.file.name).exists())
+        self.assertEqual(len(os.listdir(os.path.dirname(self.original.video_file.path))), 1)
+
+    def test_deleting_duplicate_keeps_shared_files(self):
+        """
+        Test that shared files are only deleted with the last video referencing them.
+        """
+        duplicate = Video.objects.create(title="Copy", description="desc",
+                                         video_file=SimpleUploadedFile("copy.mp4", b"same content"))
+        probe_and_enqueue(duplicate.id)
+        duplicate.delete()
+        self.assertTrue(os.path.isfile(self.original.video_file.path))
+        self.assertTrue(os.path.isfile(self.rendition.file.path))
+        self.original.delete()
+        self.assertFalse(os.path.isfile(self.rendition.file.path))
@@ -0,0 +1,153 @@
+import os
+import shutil
+import tempfile
+import time
+from django.test import TestCase, override_settings
+from video_app.signing import get_signature, sign_hls_url, sign_media_url
+
+
+class MediaDeliveryTestCase(TestCase):
+
+    def setUp(self):
+        """
+        Set up a temporary media root with a video file and a staging file of an upload.
+        """
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        os.makedirs(os.path.join(self.media_root, 'videos', '720p'))
+        os.makedirs(os.path.join(self.media_root, 'uploads'))
+        with open(os.path.join(self.media_root, 'videos', '720p', 'clip.mp4'), 'wb') as file:
+            file.write(b'0123456789')
+        with open(os.path.join(self.media_root, 'uploads', 'part.part'), 'wb') as file:
+            file.write(b'secret')
+        self.url = sign_media_url('videos/720p/clip.mp4')
+
+    def tearDown(self):
+        """
+        Remove the temporary media root.
+        """
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def test_full_file(self):
+        """
+        Test that a file without Range header is delivered completely and announces range support.
+        """
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Type'], 'video/mp4')
+
+    def test_byte_range(self):
+        """
+        Test that a byte range is answered with 206 and only the requested bytes.
+        """
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), b'2345')
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(response['Content-Length'], '4')
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-3')
+        self.assertEqual(b''.join(response.streaming_content), b'789')
+
+    def test_unsatisfiable_range(self):
+        """
+        Test that a range beyond the end of the file is answered with 416.
+        """
+        response = self.client.get(self.url, HTTP_RANGE='bytes=20-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+
+    def test_private_and_missing_files(self):
+        """
+        Test that staging files of uploads, paths outside MEDIA_ROOT and missing files are not delivered.
+        """
+        self.assertEqual(self.client.get('/media/uploads/part.part').status_code, 404)
+        self.assertEqual(self.client.get('/media/../settings.py').status_code, 404)
+        self.assertEqual(self.client.get(sign_media_url('videos/720p/missing.mp4')).status_code, 404)
+
+    @override_settings(MEDIA_ACCEL_REDIRECT_PREFIX='/protected-media/')
+    def test_accel_redirect(self):
+        """
+        Test that the transfer is handed off to nginx when a redirect prefix is configured.
+        """
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/videos/720p/clip.mp4')
+        self.assertEqual(response.content, b'')
+
+
+class SignedMediaTestCase(TestCase):
+
+    def setUp(self):
+        """
+        Set up a temporary media root with a video file, an HLS segment and a thumbnail.
+        """
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        for name, content in (('videos/720p/clip.mp4', b'video'), ('videos/hls/1/720p_00001.m4s', b'segment'),
+                              ('thumbnails/clip.jpg', b'image')):
+            os.makedirs(os.path.join(self.media_root, os.path.dirname(name)), exist_ok=True)
+            with open(os.path.join(self.media_root, name), 'wb') as file:
+                file.write(content)
+
+    def tearDown(self):
+        """
+        Remove the temporary media root.
+        """
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def test_signed_url(self):
+        """
+        Test that a signed URL is delivered without a database query and may be cached until it expires.
+        """
+        url = sign_media_url('videos/720p/clip.mp4')
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('public', response['Cache-Control'])
+        self.assertEqual(url, sign_media_url('videos/720p/clip.mp4'))
+
+    def test_unsigned_video_forbidden(self):
+        """
+        Test that videos need a signed URL, while thumbnails stay public.
+        """
+        self.assertEqual(self.client.get('/media/videos/720p/clip.mp4').status_code, 403)
+        self.assertEqual(self.client.get('/media/videos/hls/../720p/clip.mp4').status_code, 403)
+        self.assertEqual(self.client.get('/media/thumbnails/clip.jpg').status_code, 200)
+
+    def test_tampered_and_expired_url(self):
+        """
+        Test that a signature for another file and an expired URL are rejected.
+        """
+        expires, signature = sign_media_url('videos/720p/clip.mp4').split('/')[3:5]
+        self.assertEqual(self.client.get(f'/media/s/{expires}/{signature}/videos/hls/1/720p_00001.m4s').status_code,
+                         403)
+        self.assertEqual(self.client.get(f'/media/s/{int(expires) + 1}/{signature}/videos/720p/clip.mp4').status_code,
+                         403)
+        expired = int(time.time()) - 1
+        signature = get_signature('videos/720p/clip.mp4', expired, b'secret')
+        with override_settings(MEDIA_SIGNING_KEYS=['secret']):
+            self.assertEqual(self.client.get(f'/media/s/{expired}/{signature}/videos/720p/clip.mp4').status_code, 403)
+
+    def test_hls_directory_scope(self):
+        """
+        Test that the signature of a master playlist covers the files of its directory only.
+        """
+        prefix = sign_hls_url('videos/hls/1/master.m3u8').rsplit('/', 1)[0]
+        self.assertEqual(self.client.get(f'{prefix}/720p_00001.m4s').status_code, 200)
+        self.assertEqual(self.client.get(f'{prefix}/../../720p/clip.mp4').status_code, 403)
+
+    def test_key_rotation(self):
+        """
+        Test that URLs signed with a previous key stay valid while the key is still configured.
+        """
+        with override_settings(MEDIA_SIGNING_KEYS=['old']):
+            url = sign_media_url('videos/720p/clip.mp4')
+        with override_settings(MEDIA_SIGNING_KEYS=['new', 'old']):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        with override_settings(MEDIA_SIGNING_KEYS=['new']):
+            self.assertEqual(self.client.get(url).status_code, 403)
@@ -0,0 +1,177 @@
+import os
+from unittest import mock
+from django.test import override_settings
+from video_app.tasks import LADDER, build_ladder_command, build_master_playlist, convert_ladder, \
+    select_resolutions, get_profile, group_by_profile, build_split_command, build_concat_command, split_source, \
+    encode_chunk, run_ffmpeg_conversion
+
+
+def test_build_ladder_command_decodes_once():
+    """
+    Tests that the ladder command reads the source only once and writes one
+    output per rung of the ladder.
+    """
+    targets = {resolution: f"/tmp/out.{resolution}.mp4" for resolution, _ in LADDER}
+    cmd = build_ladder_command("/tmp/source.mp4", LADDER, targets)
+    assert cmd.count('-i') == 1
+    assert f"split={len(LADDER)}" in cmd[cmd.index('-filter_complex') + 1]
+    for target in targets.values():
+        assert target in cmd
+
+
+def test_build_ladder_command_scales_each_rung():
+    """
+    Tests that every rung is scaled to its own size and mapped to its own output.
+    """
+    rungs = [("144p", "256x144"), ("720p", "1280x720")]
+    targets = {"144p": "/tmp/out.144p.mp4", "720p": "/tmp/out.720p.mp4"}
+    cmd = build_ladder_command("/tmp/source.mp4", rungs, targets)
+    graph = cmd[cmd.index('-filter_complex') + 1]
+    assert "[s0]scale=256:144[v0]" in graph
+    assert "[s1]scale=1280:720[v1]" in graph
+    assert cmd.index('[v1]') < cmd.index(targets["720p"])
+
+
+def test_build_ladder_command_copies_encoded_audio():
+    """
+    Tests that every rung copies the audio encoded once instead of encoding it again.
+    """
+    targets = {resolution: f"/tmp/out.{resolution}.mp4" for resolution, _ in LADDER}
+    cmd = build_ladder_command("/tmp/source.mp4", LADDER, targets, audio="/tmp/audio.mka")
+    assert cmd[cmd.index('-i') + 1] == "/tmp/source.mp4"
+    assert "/tmp/audio.mka" in cmd
+    assert cmd.count('1:a') == len(LADDER)
+    assert cmd.count('copy') == len(LADDER)
+    assert 'aac' not in cmd
+    assert '0:a?' not in build_ladder_command("/tmp/source.mp4", LADDER, targets)
+
+
+def test_convert_ladder_encodes_audio_once(tmp_path):
+    """
+    Tests that convert_ladder encodes the audio in a run of its own before the
+    ladder run and removes it afterwards.
+    """
+    source = tmp_path / "originals" / "clip.mp4"
+    source.parent.mkdir()
+    source.write_bytes(b"video")
+    rungs = [("144p", "256x144"), ("720p", "1280x720")]
+    with mock.patch('video_app.tasks.has_audio', return_value=True), \
+            mock.patch('video_app.tasks.run_ffmpeg', return_value=(0, "")) as run_ffmpeg:
+        assert set(convert_ladder(str(source), rungs)) == {"144p", "720p"}
+    audio_cmd, ladder_cmd = [call.args[0] for call in run_ffmpeg.call_args_list]
+    audio = audio_cmd[-1]
+    assert audio_cmd.count('-c:a') == 1
+    assert '-vn' in audio_cmd
+    assert audio in ladder_cmd and '-c:a' in ladder_cmd
+    assert ladder_cmd[ladder_cmd.index('-c:a') + 1] == 'copy'
+    assert not os.path.exists(audio)
+
+
+def test_run_ffmpeg_conversion_forces_segment_keyframes():
+    """
+    Tests that a single resolution is encoded with the same forced keyframes
+    as the ladder, so its HLS segments line up with the other renditions.
+    """
+    with mock.patch('video_app.tasks.subprocess.run') as run:
+        run.return_value.returncode = 1
+        run_ffmpeg_conversion("/tmp/source.mp4", "1280x720", "/tmp/out.720p.mp4", "720p")
+    cmd = run.call_args.args[0]
+    ladder = build_ladder_command("/tmp/source.mp4", [("720p", "1280x720")], {"720p": "/tmp/out.720p.mp4"})
+    index = cmd.index('-force_key_frames')
+    assert cmd[index + 1] == ladder[ladder.index('-force_key_frames') + 1]
+
+
+def test_convert_ladder_missing_source():
+    """
+    Tests that convert_ladder returns an empty mapping if the source file does not exist.
+    """
+    assert convert_ladder("/tmp/does-not-exist.mp4") == {}
+
+
+def test_build_master_playlist_lists_every_variant():
+    """
+    Tests that the master playlist references each rendition playlist with its
+    bandwidth and resolution.
+    """
+    variants = [("/tmp/hls/144p.m3u8", "256x144", 150000), ("/tmp/hls/720p.m3u8", "1280x720", 2500000)]
+    playlist = build_master_playlist(variants)
+    assert playlist.startswith("#EXTM3U")
+    assert "#EXT-X-STREAM-INF:BANDWIDTH=150000,RESOLUTION=256x144\n144p.m3u8" in playlist
+    assert "#EXT-X-STREAM-INF:BANDWIDTH=2500000,RESOLUTION=1280x720\n720p.m3u8" in playlist
+
+
+def test_select_resolutions_skips_upscaling():
+    """
+    Tests that only resolutions at or below the source resolution are selected.
+    """
+    assert select_resolutions(854, 480) == ["144p", "240p", "360p", "480p"]
+    assert select_resolutions(1080, 1920) == [resolution for resolution, _ in LADDER]
+
+
+def test_select_resolutions_unknown_or_tiny_source():
+    """
+    Tests that all resolutions are selected for an unknown source size and the
+    lowest one for a source below every rung.
+    """
+    assert select_resolutions(None, None) == [resolution for resolution, _ in LADDER]
+    assert select_resolutions(160, 120) == ["144p"]
+
+
+@override_settings(VIDEO_ENCODING_PROFILES={'fast': {'preset': 'veryfast', 'crf': 30, 'maxrate': '1M', 'queue': 'high'}},
+                   VIDEO_RUNG_PROFILES={'144p': 'fast', '240p': 'fast'})
+def test_encoding_profiles_from_settings():
+    """
+    Tests that resolutions are grouped by their profile and that the profile
+    options end up in the FFmpeg command.
+    """
+    assert group_by_profile(["144p", "240p", "720p"]) == {"fast": ["144p", "240p"], "standard": ["720p"]}
+    profile = get_profile("fast")
+    assert profile["queue"] == "high"
+    assert profile["codec"] == "libx264"
+    cmd = build_ladder_command("/tmp/source.mp4", [("144p", "256x144")], {"144p": "/tmp/out.mp4"}, profile)
+    assert cmd[cmd.index('-preset') + 1] == "veryfast"
+    assert cmd[cmd.index('-crf') + 1] == "30"
+    assert cmd[cmd.index('-maxrate') + 1] == "1M"
+
+
+def test_build_split_command_copies_video_at_keyframes():
+    """
+    Tests that the split command copies only the video stream into chunks
+    of the requested length without re-encoding.
+    """
+    cmd = build_split_command("/tmp/source.mp4", "/tmp/chunks/chunk_%05d.mkv", 120)
+    assert cmd[cmd.index('-map') + 1] == '0:v:0'
+    assert cmd[cmd.index('-c') + 1] == 'copy'
+    assert cmd[cmd.index('-segment_time') + 1] == '120'
+
+
+def test_build_concat_command_adds_encoded_audio():
+    """
+    Tests that the concat command copies the joined video and the encoded audio without re-encoding.
+    """
+    cmd = build_concat_command("/tmp/list.txt", "/tmp/audio.mka", "/tmp/out.mp4")
+    assert cmd.count('-i') == 2
+    assert '1:a' in cmd
+    assert cmd[cmd.index('-c') + 1] == 'copy'
+    assert '-c:a' not in cmd
+    assert build_concat_command("/tmp/list.txt", None, "/tmp/out.mp4").count('-i') == 1
+
+
+def test_split_source_missing_source():
+    """
+    Tests that split_source returns no chunks if the source file does not exist.
+    """
+    assert split_source("/tmp/does-not-exist.mp4", "/tmp/chunks", 120) == []
+
+
+def test_encode_chunk_removes_partial_outputs(tmp_path):
+    """
+    Tests that a failed chunk conversion leaves no encoded chunks behind, so
+    the concat job sees the chunk as missing.
+    """
+    rungs = [("144p", "256x144"), ("720p", "1280x720")]
+    (tmp_path / "144p").mkdir()
+    (tmp_path / "144p" / "chunk_00000.mp4").write_bytes(b"partial")
+    with mock.patch('video_app.tasks.run_ffmpeg', return_value=(1, "error")):
+        assert encode_chunk("/tmp/chunks/chunk_00000.mkv", rungs, str(tmp_path)) == {}
+    assert not (tmp_path / "144p" / "chunk_00000.mp4").exists()
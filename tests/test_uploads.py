@@ -0,0 +1,78 @@
+import base64
+import hashlib
+import os
+import shutil
+import tempfile
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.test import override_settings
+from django.urls import reverse
+from video_app.models import UploadSession
+
+
+class UploadSessionAPITestCase(APITestCase):
+
+    def setUp(self):
+        """
+        Set up a temporary media root and start an upload of 10 bytes.
+        """
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        response = self.client.post(reverse('upload-create'), {
+            'title': 'Chunked Video', 'description': 'desc', 'genre': 'drama',
+            'filename': 'movie.mp4', 'size': 10,
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.url = response['Location']
+
+    def tearDown(self):
+        """
+        Remove the temporary media root.
+        """
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def patch_chunk(self, data, offset, **headers):
+        """
+        Send a chunk of the upload starting at the given offset.
+        """
+        return self.client.generic('PATCH', self.url, data, content_type='application/offset+octet-stream',
+                                   HTTP_UPLOAD_OFFSET=str(offset), **headers)
+
+    def test_upload_in_chunks_creates_video(self):
+        """
+        Test that the video is only created once the last chunk has arrived and
+        that the file contains all chunks in order.
+        """
+        response = self.patch_chunk(b'01234', 0)
+        self.assertEqual(response['Upload-Offset'], '5')
+        self.assertIsNone(response.data['video'])
+        response = self.patch_chunk(b'56789', 5)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        upload = UploadSession.objects.get()
+        self.assertIsNotNone(upload.video)
+        with open(upload.video.video_file.path, 'rb') as file:
+            self.assertEqual(file.read(), b'0123456789')
+        self.assertTrue(upload.video.video_file.name.startswith('videos/originals/chunked-video'))
+
+    def test_offset_mismatch_returns_conflict(self):
+        """
+        Test that a chunk with a wrong offset is rejected with a 409 status code
+        and the current offset, so the client can resume from there.
+        """
+        self.patch_chunk(b'01234', 0)
+        response = self.patch_chunk(b'56789', 3)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response['Upload-Offset'], '5')
+
+    def test_checksum_mismatch_discards_chunk(self):
+        """
+        Test that a chunk whose SHA-256 checksum does not match is discarded.
+        """
+        digest = base64.b64encode(hashlib.sha256(b'other').digest()).decode()
+        response = self.patch_chunk(b'01234', 0, HTTP_UPLOAD_CHECKSUM=f'sha256 {digest}')
+        self.assertEqual(response.status_code, 460)
+        upload = UploadSession.objects.get()
+        self.assertEqual(upload.offset, 0)
+        self.assertEqual(os.path.getsize(upload.staging_path), 0)
@@ -9,7 +9,33 @@ from django.utils.http import urlsafe_base64_encode
 from django.utils.encoding import force_bytes
 from django.utils.crypto import get_random_string
 from django.core.cache import cache
+from django.core import mail
+from django.test import override_settings
+from rest_framework.authtoken.models import Token
+from unittest import mock
+from users_app.tasks import EmailDeliveryError, PENDING_EMAILS_KEY, BATCH_SCHEDULED_KEY, EMAIL_QUEUE, \
+    INFLIGHT_EMAILS_KEY, DEAD_EMAILS_KEY, send_email_batch, recover_stalled_emails
+from users_app.api.views import get_unique_username
+from users_app.authentication import TOKEN_LIFETIME, get_token_cache_key, get_user_cache_key
+from users_app.tasks import purge_expired_tokens
+from datetime import timedelta
+from django.utils import timezone
+import django_rq
+import hashlib
 import random
+from django_redis import get_redis_connection
+
+
+@pytest.fixture(autouse=True)
+def clear_throttles():
+    """
+    Fixture that deletes the logged attempts of the rate limits before every
+    test, so repeated test runs against the same Redis are not throttled.
+    """
+    connection = get_redis_connection('default')
+    keys = list(connection.scan_iter('throttle:*'))
+    if keys:
+        connection.delete(*keys)
 
 
 @pytest.fixture
@@ -210,7 +236,7 @@ def test_user_profile_list(client, create_user, create_user_profile):
 
     This test sends a GET request to the /profiles/ endpoint to retrieve a list
     of user profiles. It asserts that the response status code is 200 OK and
-    that the returned data contains at least one user profile.
+    that the returned page contains at least one user profile.
 
     Args:
         client (fixture): Fixture to create a new instance of the Django Rest
@@ -225,4 +251,304 @@ def test_user_profile_list(client, create_user, create_user_profile):
     client.force_authenticate(user=create_user)
     response = client.get(url)
     assert response.status_code == status.HTTP_200_OK
-    assert len(response.data) > 0
+    assert len(response.data['results']) > 0
+
+
+@pytest.fixture
+def email_queue():
+    """
+    Fixture that empties the list of queued emails and returns the Redis connection of the email queue.
+    """
+    connection = django_rq.get_connection(EMAIL_QUEUE)
+    queue = django_rq.get_queue(EMAIL_QUEUE)
+    keys = [PENDING_EMAILS_KEY, BATCH_SCHEDULED_KEY, INFLIGHT_EMAILS_KEY, DEAD_EMAILS_KEY]
+    connection.delete(*keys, *connection.zrange(INFLIGHT_EMAILS_KEY, 0, -1))
+    queue.empty()
+    yield connection
+    connection.delete(*keys, *connection.zrange(INFLIGHT_EMAILS_KEY, 0, -1))
+    for job_id in queue.scheduled_job_registry.get_job_ids():
+        queue.scheduled_job_registry.remove(job_id, delete_job=True)
+
+
+@pytest.mark.django_db
+def test_registration_queues_activation_email(client, email_queue):
+    """
+    Test that a registration only queues the activation email and that the
+    email job sends all queued emails at once and marks the profiles.
+
+    Args:
+        client (fixture): Fixture to create a new instance of the Django Rest
+            Framework's APIClient.
+        email_queue (fixture): Fixture for the Redis connection of the email queue.
+    """
+    for number in range(2):
+        response = client.post(reverse('registration'), {"email": f"queued{number}@example.com",
+                                                         "password": "password123"}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+    assert len(mail.outbox) == 0
+    assert email_queue.llen(PENDING_EMAILS_KEY) == 2
+    assert django_rq.get_queue(EMAIL_QUEUE).count == 1
+    assert not UserProfile.objects.filter(email_sent=True).exists()
+
+    assert send_email_batch() == 2
+    assert sorted(message.to[0] for message in mail.outbox) == ["queued0@example.com", "queued1@example.com"]
+    assert UserProfile.objects.filter(email_sent=True).count() == 2
+    assert email_queue.llen(PENDING_EMAILS_KEY) == 0
+
+
+@pytest.mark.django_db
+def test_email_batch_keeps_failed_emails(client, create_user, email_queue):
+    """
+    Test that emails that could not be sent stay queued and the job raises, so RQ retries it.
+
+    Args:
+        client (fixture): Fixture to create a new instance of the Django Rest
+            Framework's APIClient.
+        create_user (fixture): Fixture to create a new User instance with a
+            unique username and email.
+        email_queue (fixture): Fixture for the Redis connection of the email queue.
+    """
+    client.post(reverse('password-reset-request'), {"email": create_user.email}, format='json')
+    with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError):
+        with pytest.raises(EmailDeliveryError):
+            send_email_batch()
+    assert email_queue.llen(PENDING_EMAILS_KEY) == 1
+    assert email_queue.exists(BATCH_SCHEDULED_KEY)
+    assert django_rq.get_queue(EMAIL_QUEUE).scheduled_job_registry.count == 1
+    assert send_email_batch() == 1
+    assert mail.outbox[0].to == [create_user.email]
+
+
+@pytest.mark.django_db
+def test_email_batch_dead_letters_failing_emails(client, create_user, email_queue):
+    """
+    Test that an email that keeps failing is moved to the dead-letter list
+    after EMAIL_MAX_ATTEMPTS attempts instead of being retried forever.
+
+    Args:
+        client (fixture): Fixture to create a new instance of the Django Rest
+            Framework's APIClient.
+        create_user (fixture): Fixture to create a new User instance with a
+            unique username and email.
+        email_queue (fixture): Fixture for the Redis connection of the email queue.
+    """
+    client.post(reverse('password-reset-request'), {"email": create_user.email}, format='json')
+    with mock.patch('users_app.tasks.EMAIL_MAX_ATTEMPTS', 2), \
+            mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError):
+        with pytest.raises(EmailDeliveryError):
+            send_email_batch()
+        assert email_queue.llen(PENDING_EMAILS_KEY) == 1
+        email_queue.delete(BATCH_SCHEDULED_KEY)
+        assert send_email_batch() == 0
+    assert email_queue.llen(PENDING_EMAILS_KEY) == 0
+    assert email_queue.llen(DEAD_EMAILS_KEY) == 1
+    assert not email_queue.exists(BATCH_SCHEDULED_KEY)
+
+
+@pytest.mark.django_db
+def test_email_batch_recovered_after_crash(client, create_user, email_queue):
+    """
+    Test that the emails of a job that died while sending stay in flight and
+    are queued again, with a new job, once the lease of the job has ended.
+
+    Args:
+        client (fixture): Fixture to create a new instance of the Django Rest
+            Framework's APIClient.
+        create_user (fixture): Fixture to create a new User instance with a
+            unique username and email.
+        email_queue (fixture): Fixture for the Redis connection of the email queue.
+    """
+    client.post(reverse('password-reset-request'), {"email": create_user.email}, format='json')
+    django_rq.get_queue(EMAIL_QUEUE).empty()
+    with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=SystemExit):
+        with pytest.raises(SystemExit):
+            send_email_batch()
+    assert email_queue.llen(PENDING_EMAILS_KEY) == 0
+    assert recover_stalled_emails() == 0
+    inflight = email_queue.zrange(INFLIGHT_EMAILS_KEY, 0, -1)
+    assert len(inflight) == 1 and email_queue.llen(inflight[0]) == 1
+
+    email_queue.zadd(INFLIGHT_EMAILS_KEY, {inflight[0]: 1})
+    assert recover_stalled_emails() == 1
+    assert email_queue.llen(PENDING_EMAILS_KEY) == 1
+    assert django_rq.get_queue(EMAIL_QUEUE).count == 1
+    assert send_email_batch() == 1
+    assert mail.outbox[0].to == [create_user.email]
+    assert email_queue.zcard(INFLIGHT_EMAILS_KEY) == 0
+
+
+@pytest.mark.django_db
+def test_unique_username(django_assert_num_queries):
+    """
+    Test that the next free username is found with a single query and that a
+    registration racing for the same username retries with a free one.
+
+    Args:
+        django_assert_num_queries (fixture): Fixture to count the database queries.
+    """
+    for username in ("info", "info1", "info3", "infobox"):
+        User.objects.create_user(username=username, email=f"{username}@example.com")
+    with django_assert_num_queries(1):
+        assert get_unique_username("info@example.org") == "info2"
+
+    client = APIClient()
+    with mock.patch('users_app.api.views.get_unique_username', side_effect=["info", "info2"]):
+        response = client.post(reverse('registration'), {"email": "info@example.net", "password": "password123"},
+                               format='json')
+    assert response.data['username'] == "info2"
+
+
+@pytest.mark.django_db
+def test_cached_token_authentication(create_user, django_assert_num_queries,
+                                     django_capture_on_commit_callbacks):
+    """
+    Test that token authentication is served from the cache after the first
+    request, that deactivating the user or deleting the token takes effect
+    once committed, that queryset updates take effect when the cached flags
+    expire, and that cache entries in an older format are reloaded.
+
+    Args:
+        create_user (fixture): Fixture to create a new User instance with a
+            unique username and email.
+        django_assert_num_queries (fixture): Fixture to count the database queries.
+        django_capture_on_commit_callbacks (fixture): Fixture to run the
+            on_commit callbacks of the test transaction.
+    """
+    token = Token.objects.get_or_create(user=create_user)[0]
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+    url = reverse('userprofile-list')
+    assert client.get(url).status_code == status.HTTP_200_OK
+    with django_assert_num_queries(1):
+        response = client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+
+    response = APIClient().post(reverse('login'), HTTP_AUTHORIZATION=f"Token {token.key}")
+    assert response.data['user_id'] == create_user.id
+
+    create_user.is_active = False
+    with django_capture_on_commit_callbacks(execute=True):
+        create_user.save()
+    assert client.get(url).status_code == status.HTTP_401_UNAUTHORIZED
+    create_user.is_active = True
+    with django_capture_on_commit_callbacks(execute=True):
+        create_user.save()
+    assert client.get(url).status_code == status.HTTP_200_OK
+
+    User.objects.filter(pk=create_user.pk).update(is_active=False)
+    assert client.get(url).status_code == status.HTTP_200_OK
+    cache.delete(get_user_cache_key(create_user.pk))
+    assert client.get(url).status_code == status.HTTP_401_UNAUTHORIZED
+    User.objects.filter(pk=create_user.pk).update(is_active=True)
+    cache.delete(get_user_cache_key(create_user.pk))
+
+    cache.set(get_token_cache_key(token.key), {'id': create_user.id, 'is_active': True})
+    assert client.get(url).status_code == status.HTTP_200_OK
+    assert cache.get(get_token_cache_key(token.key))['user_id'] == create_user.id
+
+    with django_capture_on_commit_callbacks(execute=True):
+        token.delete()
+    assert client.get(url).status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+def test_login_rate_limit(create_user, django_assert_num_queries):
+    """
+    Test that login attempts beyond the limit per IP or failed attempts beyond
+    the limit per email are rejected with 429 before the database is touched,
+    and that rejected attempts are not logged.
+
+    Args:
+        create_user (fixture): Fixture to create a new User instance with a
+            unique username and email.
+        django_assert_num_queries (fixture): Fixture to count the database queries.
+    """
+    url = reverse('login')
+    rates = {'login_ip': '4/min', 'login_email': '2/min'}
+    with override_settings(REST_FRAMEWORK={'DEFAULT_THROTTLE_RATES': rates}):
+        client = APIClient(REMOTE_ADDR="10.0.0.1")
+        response = client.post(url, {"email": create_user.email, "password": "password123"}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        for _ in range(2):
+            response = client.post(url, {"email": create_user.email, "password": "wrong"}, format='json')
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+        for _ in range(3):
+            with django_assert_num_queries(0):
+                response = client.post(url, {"email": create_user.email.upper(), "password": "wrong"},
+                                       format='json')
+            assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert int(response['Retry-After']) > 0
+        response = client.post(url, {"email": "other@example.com", "password": "wrong"}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        response = client.post(url, {"email": "other@example.com", "password": "wrong"}, format='json')
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        other_client = APIClient(REMOTE_ADDR="10.1.0.1")
+        response = other_client.post(url, {"email": "free@example.com", "password": "wrong"}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert get_redis_connection('default').zcard(
+            f"throttle:login:ip:{hashlib.sha256(b'10.0.0.1').hexdigest()}") == 4
+
+
+@pytest.mark.django_db
+def test_rate_limit_ignores_spoofed_forwarded_for():
+    """
+    Test that a client can't avoid the limit per IP by sending a new
+    X-Forwarded-For address with every attempt while NUM_PROXIES is unset,
+    and that the header is used once NUM_PROXIES is set.
+    """
+    url = reverse('password-reset-request')
+    rates = {'password_reset_ip': '2/min'}
+    with override_settings(REST_FRAMEWORK={'DEFAULT_THROTTLE_RATES': rates}):
+        client = APIClient(REMOTE_ADDR="10.2.0.1")
+        for number in range(3):
+            response = client.post(url, {"email": f"spoof{number}@example.com"}, format='json',
+                                   HTTP_X_FORWARDED_FOR=f"203.0.113.{number}")
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    with override_settings(REST_FRAMEWORK={'DEFAULT_THROTTLE_RATES': rates, 'NUM_PROXIES': 1}):
+        response = client.post(url, {"email": "proxied@example.com"}, format='json',
+                               HTTP_X_FORWARDED_FOR="203.0.113.50")
+        assert response.status_code != status.HTTP_429_TOO_MANY_REQUESTS
+
+
+
+@pytest.mark.django_db
+def test_token_expiry_refresh_and_purge(create_user, django_capture_on_commit_callbacks):
+    """
+    Test that login issues an expiring token, that a refresh replaces it,
+    that expired tokens are rejected and replaced at the next login, and that
+    the purge job deletes only expired tokens.
+
+    Args:
+        create_user (fixture): Fixture to create a new User instance with a
+            unique username and email.
+        django_capture_on_commit_callbacks (fixture): Fixture to run the
+            on_commit callbacks of the test transaction.
+    """
+    assert not Token.objects.filter(user=create_user).exists()
+    response = APIClient().post(reverse('login'), {"email": create_user.email, "password": "password123"},
+                                format='json')
+    token = response.data['token']
+    assert response.data['expires_at'] > timezone.now() + timedelta(seconds=TOKEN_LIFETIME - 60)
+
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {token}")
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post(reverse('token-refresh'))
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['token'] != token
+    assert client.get(reverse('userprofile-list')).status_code == status.HTTP_401_UNAUTHORIZED
+    token = response.data['token']
+
+    Token.objects.filter(key=token).update(created=timezone.now() - timedelta(seconds=TOKEN_LIFETIME + 1))
+    cache.delete(get_token_cache_key(token))
+    client.credentials(HTTP_AUTHORIZATION=f"Token {token}")
+    assert client.get(reverse('userprofile-list')).status_code == status.HTTP_401_UNAUTHORIZED
+    other = User.objects.create_user(username=f"active{random.randint(1000, 9999)}", email="active@example.com")
+    Token.objects.create(user=other)
+    assert purge_expired_tokens() == 1
+    assert not Token.objects.filter(key=token).exists()
+    assert Token.objects.filter(user=other).exists()
+
+    response = APIClient().post(reverse('login'), {"email": create_user.email, "password": "password123"},
+                                format='json')
+    assert response.data['token'] != token
@@ -1,9 +1,18 @@
-from rest_framework.test import APITestCase
+from rest_framework.test import APITestCase, APIClient
+from django.test import override_settings
+from rest_framework.throttling import AnonRateThrottle
 from rest_framework import status
-from django.urls import reverse
-from video_app.models import Video
+from asgiref.sync import iscoroutinefunction
+from django.urls import resolve, reverse
+from video_app.models import Video, VideoRendition, TranscodeJob
+from video_app.jobs import get_progress_key
+from video_app.cache import get_video_card_key
+from django.core.cache import cache
 from django.contrib.auth.models import User
 from django.core.files.uploadedfile import SimpleUploadedFile
+from datetime import date
+from unittest import mock
+from video_app.signals import mark_renditions_failed
 
 
 class VideoAPITestCase(APITestCase):
@@ -12,8 +21,8 @@ class VideoAPITestCase(APITestCase):
         """
         Set up a test video and log in as admin user.
 
-        Set up a test video with title "Test Video", genre "Action" and video files in 480p and 720p resolutions.
-        The video thumbnail is set to the same as the video file.
+        Set up a test video with title "Test Video", genre "Action" and finished renditions in 480p and 720p
+        resolutions. The video thumbnail is set to the same as the video file.
         The admin user is logged in for authentication.
         """
         self.user = User.objects.create_superuser(username='admin', password='adminpass')
@@ -22,10 +31,11 @@ class VideoAPITestCase(APITestCase):
         self.video = Video.objects.create(
             title="Test Video",
             genre="Action",
-            video_480p=video_file,
-            video_720p=video_file,
             thumbnail=video_file
         )
+        for height in (480, 720):
+            VideoRendition.objects.create(video=self.video, height=height, status=VideoRendition.STATUS_DONE,
+                                          file=SimpleUploadedFile("test.mp4", b"file_content"))
 
     def test_list_videos(self):
         """
@@ -38,16 +48,103 @@ class VideoAPITestCase(APITestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_list_videos_paginated_by_cursor(self):
+        """
+        Test that the video list is returned in pages, newest first, and that the
+        next cursor continues without repeating or skipping videos.
+        """
+        for number in range(3):
+            Video.objects.create(title=f"Page Video {number}", genre="drama", created_at=date(2024, 1, 1))
+        url = reverse('video-list')
+        first = self.client.get(url, {'page_size': 2})
+        self.assertEqual(len(first.data['results']), 2)
+        second = self.client.get(first.data['next'])
+        titles = [video['title'] for video in first.data['results'] + second.data['results']]
+        self.assertEqual(titles, ["Test Video", "Page Video 2", "Page Video 1", "Page Video 0"])
+
+    def test_list_videos_keyset_on_shared_dates(self):
+        """
+        Test that paging through many videos created on the same date returns
+        every video exactly once, forwards and backwards, and that a malformed
+        cursor is rejected.
+        """
+        for number in range(7):
+            Video.objects.create(title=f"Same Day {number}", genre="drama", created_at=date(2024, 1, 1))
+        url = reverse('video-list')
+        expected = list(Video.objects.order_by('-created_at', '-id').values_list('title', flat=True))
+        pages = [self.client.get(url, {'page_size': 3})]
+        while pages[-1].data['next']:
+            pages.append(self.client.get(pages[-1].data['next']))
+        titles = [video['title'] for page in pages for video in page.data['results']]
+        self.assertEqual(titles, expected)
+        self.assertIsNone(pages[0].data['previous'])
+        previous = self.client.get(pages[-1].data['previous'])
+        self.assertEqual(previous.data['results'], pages[-2].data['results'])
+        self.assertEqual(self.client.get(url, {'cursor': 'invalid'}).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_videos_card_fields(self):
+        """
+        Test that the video list returns the lightweight card fields with one query
+        and that ?fields= restricts the output to the requested fields.
+        """
+        self.client.logout()
+        url = reverse('video-list')
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        card = response.data['results'][0]
+        self.assertEqual(card['available_resolutions'], ['144p', '240p', '360p', '480p', '720p', '1080p'])
+        self.assertNotIn('renditions', card)
+        self.assertTrue(card['thumbnail'].startswith('http://testserver/'))
+        response = self.client.get(url, {'fields': 'id,title'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'title'})
+        response = self.client.get(reverse('video-detail', args=[self.video.id]), {'fields': 'title,renditions'})
+        self.assertEqual(set(response.data), {'title', 'renditions'})
+
+    def test_catalog_conditional_request(self):
+        """
+        Test that the video list sends an ETag, answers a matching If-None-Match
+        with a 304 status code without touching the database, and changes its
+        ETag once a video is saved.
+        """
+        self.client.logout()
+        url = reverse('video-list')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.video.title = "Renamed"
+        self.video.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_video_detail_conditional_request(self):
+        """
+        Test that the video detail is revalidated with its ETag and Last-Modified
+        header and that a new rendition changes the ETag and the cached response.
+        """
+        url = reverse('video-detail', args=[self.video.id])
+        response = self.client.get(url)
+        etag = response['ETag']
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        VideoRendition.objects.create(video=self.video, height=360, status=VideoRendition.STATUS_DONE)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['renditions']), 3)
+
     def test_get_video_detail(self):
         """
         Test that the video detail endpoint returns a 200 status code.
 
         This test ensures that the video detail endpoint is working correctly and
-        returns the expected status code of 200.
+        returns the expected status code of 200 without internal columns.
         """
         url = reverse('video-detail', args=[self.video.id])
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('search_vector', response.data)
+        self.assertNotIn('content_hash', response.data)
 
     def test_get_video_with_resolution(self):
         """
@@ -62,6 +159,7 @@ class VideoAPITestCase(APITestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn('video_url', response.data)
+        self.assertTrue(response.data['video_url'].startswith('/media/s/'))
 
     def test_get_video_with_invalid_resolution(self):
         """
@@ -74,6 +172,43 @@ class VideoAPITestCase(APITestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_get_video_above_source_resolution(self):
+        """
+        Test that the video detail endpoint returns a 404 status code for a resolution above
+        the probed source resolution.
+        """
+        Video.objects.filter(id=self.video.id).update(width=854, height=480)
+        url = reverse('video-detail', args=[self.video.id]) + "?resolution=720p"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_get_video_resolution_not_converted(self):
+        """
+        Test that the video detail endpoint returns a 404 status code for a valid resolution
+        that has no finished rendition.
+        """
+        VideoRendition.objects.create(video=self.video, height=1080)
+        url = reverse('video-detail', args=[self.video.id]) + "?resolution=1080p"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_video_detail_lists_renditions(self):
+        """
+        Test that the video detail endpoint lists the renditions of the video.
+        """
+        url = reverse('video-detail', args=[self.video.id])
+        response = self.client.get(url)
+        self.assertEqual([rendition['resolution'] for rendition in response.data['renditions']], ['480p', '720p'])
+
+    def test_get_video_adaptive_stream_not_packaged(self):
+        """
+        Test that the video detail endpoint returns a 404 status code for the resolution 'auto'
+        as long as the video has not been packaged as HLS.
+        """
+        url = reverse('video-detail', args=[self.video.id]) + "?resolution=auto"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
     def test_delete_video(self):
         """
         Test that the video detail endpoint returns a 204 status code when a video is deleted.
@@ -114,6 +249,117 @@ class VideoAPITestCase(APITestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
+    def test_thumbnail_pending(self):
+        """
+        Test that the video thumbnail endpoint returns a 202 status code with the status 'pending'
+        while the thumbnail of an uploaded video has not been generated yet.
+        """
+        video = Video.objects.create(title="Pending Thumb", genre="Drama", video_file="videos/originals/pending.mp4")
+        url = reverse('video-thumbnail', args=[video.id])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], 'pending')
+
+    def test_thumbnail_failed(self):
+        """
+        Test that the thumbnail endpoints report 'failed' instead of 'pending' once the
+        latest thumbnail job of an uploaded video has failed.
+        """
+        video = Video.objects.create(title="Failed Thumb", genre="Drama", video_file="videos/originals/failed.mp4")
+        TranscodeJob.objects.create(video=video, stage=TranscodeJob.STAGE_THUMBNAIL,
+                                    status=TranscodeJob.STATUS_FAILED)
+        response = self.client.get(reverse('video-thumbnail', args=[video.id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.data['status'], 'failed')
+        response = self.client.get(reverse('video-thumbnails'), {'ids': video.id})
+        self.assertEqual(response.data['videos'][0]['thumbnail_status'], 'failed')
+
+    def test_video_progress(self):
+        """
+        Test that the progress endpoint lists the pipeline jobs of a video with the live
+        progress of running jobs and an overall status.
+        """
+        TranscodeJob.objects.filter(video=self.video).update(status=TranscodeJob.STATUS_DONE)
+        rendition = self.video.renditions.get(height=720)
+        job = TranscodeJob.objects.create(video=self.video, rendition=rendition, stage=TranscodeJob.STAGE_RENDITION,
+                                          status=TranscodeJob.STATUS_RUNNING, queue='default')
+        cache.set(get_progress_key(job.pk), {'seconds': 30.0, 'percent': 50.0})
+        response = self.client.get(reverse('video-progress', args=[self.video.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], TranscodeJob.STATUS_RUNNING)
+        running = next(item for item in response.data['jobs'] if item['id'] == job.pk)
+        self.assertEqual(running['resolution'], '720p')
+        self.assertEqual(running['progress']['percent'], 50.0)
+        cache.delete(get_progress_key(job.pk))
+
+    def test_thumbnail_batch(self):
+        """
+        Test that the batch endpoint returns the thumbnails of several videos in the
+        requested order with one query, serves repeated requests from the cache and
+        lists unknown ids as missing.
+        """
+        self.client.logout()
+        other = Video.objects.create(title="Other", genre="drama", video_file="videos/originals/other.mp4")
+        url = reverse('video-thumbnails')
+        ids = f"{other.id},{self.video.id},999999"
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'ids': ids})
+        self.assertEqual([video['id'] for video in response.data['videos']], [other.id, self.video.id])
+        self.assertEqual(response.data['videos'][0]['thumbnail_status'], 'pending')
+        self.assertIsNotNone(response.data['videos'][1]['thumbnail_url'])
+        self.assertEqual(response.data['missing'], [999999])
+        with self.assertNumQueries(1):
+            self.client.get(url, {'ids': ids})
+        with self.assertNumQueries(0):
+            self.client.get(url, {'ids': self.video.id})
+        other.title = "Renamed"
+        other.save()
+        response = self.client.get(url, {'ids': ids})
+        self.assertEqual(response.data['videos'][0]['title'], "Renamed")
+        self.assertEqual(self.client.get(url, {'ids': 'a,b'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_renditions_failed_only_without_retries(self):
+        """
+        Test that a failed conversion leaves its rendition queued while RQ retries
+        the job and marks it as failed after the last attempt.
+        """
+        rendition = VideoRendition.objects.create(video=self.video, height=360)
+        with mock.patch('video_app.jobs.get_current_job') as get_current_job:
+            get_current_job.return_value.retries_left = 2
+            mark_renditions_failed(self.video, ['360p'])
+            rendition.refresh_from_db()
+            self.assertEqual(rendition.status, VideoRendition.STATUS_QUEUED)
+            get_current_job.return_value.retries_left = 0
+            mark_renditions_failed(self.video, ['360p'])
+        rendition.refresh_from_db()
+        self.assertEqual(rendition.status, VideoRendition.STATUS_FAILED)
+
+    def test_packaging_skips_failed_resolutions(self):
+        """
+        Test that the HLS packaging is enqueued once the last pending resolution
+        has failed for good, so the converted resolutions are still streamed.
+        """
+        video = Video.objects.create(title="Partly Failed", genre="drama", width=854, height=480)
+        for height in (144, 240, 360):
+            VideoRendition.objects.create(video=video, height=height, status=VideoRendition.STATUS_DONE)
+        VideoRendition.objects.create(video=video, height=480)
+        packaging = TranscodeJob.objects.filter(video=video, stage=TranscodeJob.STAGE_PACKAGING)
+        mark_renditions_failed(video, ['480p'], retrying=True)
+        self.assertFalse(packaging.exists())
+        mark_renditions_failed(video, ['480p'], retrying=False)
+        self.assertTrue(packaging.exists())
+
+    def test_deleted_video_card_invalidated_after_commit(self):
+        """
+        Test that the card of a deleted video is removed from the cache again
+        after the commit, even if a reader cached it before the commit.
+        """
+        key = get_video_card_key(self.video.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.video.delete()
+            cache.set(key, {'id': 0})
+        self.assertIsNone(cache.get(key))
+
     def test_genre_grouped_videos(self):
         """
         Test that the genre grouped videos endpoint returns a 200 status code and contains 'New on Videoflix'
@@ -127,6 +373,72 @@ class VideoAPITestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(any("New on Videoflix" in group["name"] for group in response.data))
 
+    def test_genre_rows_limited_and_cached(self):
+        """
+        Test that every genre row contains at most 6 movies, newest first, that the
+        rows are loaded with a single query and served from the cache afterwards,
+        and that saving a video invalidates the cached rows.
+        """
+        for number in range(8):
+            Video.objects.create(title=f"Drama {number}", genre="drama", created_at=date(2024, 1, number + 1))
+        self.client.logout()
+        url = reverse('genres-grouped')
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        drama = next(group for group in response.data if group['name'] == 'Drama')
+        self.assertEqual([movie['title'] for movie in drama['movies']], [f"Drama {n}" for n in range(7, 1, -1)])
+        self.assertEqual(len(response.data[0]['movies']), 6)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        Video.objects.create(title="Drama new", genre="drama")
+        response = self.client.get(url)
+        self.assertEqual(response.data[0]['movies'][0]['title'], "Drama new")
+
+    async def test_async_read_views(self):
+        """
+        Test that the hot read views are async views and serve the catalog through the ASGI handler.
+        """
+        for url in (reverse('genres-grouped'), reverse('big-thumbnail'), reverse('video-detail', args=[self.video.id]),
+                    reverse('video-thumbnail', args=[self.video.id])):
+            self.assertTrue(iscoroutinefunction(resolve(url).func))
+        response = await self.async_client.get(reverse('genres-grouped'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()[0]['name'], 'New on Videoflix')
+        response = await self.async_client.get(reverse('video-detail', args=[self.video.id]))
+        self.assertEqual(response.json()['title'], self.video.title)
+        response = await self.async_client.get(reverse('video-detail', args=[self.video.id]),
+                                               headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_video_detail_writes_keep_drf_checks(self):
+        """
+        Test that writes on the video detail URL go through the DRF view, which
+        enforces CSRF for session-authenticated requests.
+        """
+        url = reverse('video-detail', args=[self.video.id])
+        client = APIClient(enforce_csrf_checks=True)
+        client.login(username='admin', password='adminpass')
+        response = client.patch(url, {'title': "Changed"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.patch(url, {'title': "Changed"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_async_read_views_throttled(self):
+        """
+        Test that the default throttle classes also apply to the async read views.
+        """
+        url = reverse('video-thumbnail', args=[self.video.id])
+        rest_framework = {'DEFAULT_THROTTLE_CLASSES': ['rest_framework.throttling.AnonRateThrottle']}
+        self.client.logout()
+        cache.delete('throttle_anon_127.0.0.1')
+        with override_settings(REST_FRAMEWORK=rest_framework), \
+                mock.patch.object(AnonRateThrottle, 'THROTTLE_RATES', {'anon': '1/min'}):
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+            response = self.client.get(url)
+        cache.delete('throttle_anon_127.0.0.1')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+
     def test_big_thumbnail_view(self):
         """
         Test that the big thumbnail view endpoint returns a 200 status code and contains 'title' in the response data.
@@ -138,3 +450,51 @@ class VideoAPITestCase(APITestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn('title', response.data)
+
+
+class VideoSearchTestCase(APITestCase):
+
+    def setUp(self):
+        """
+        Set up videos whose title or description mention the search terms.
+        """
+        self.title_match = Video.objects.create(title="Ocean Adventure", description="A film about the sea",
+                                                genre="documentary")
+        self.description_match = Video.objects.create(title="Deep Blue", description="An ocean documentary",
+                                                      genre="documentary")
+        Video.objects.create(title="Mountain Trip", description="Snow and rocks", genre="action")
+
+    def test_search_ranks_title_above_description(self):
+        """
+        Test that the search finds title and description matches, ranks title matches first and
+        paginates the results.
+        """
+        response = self.client.get(reverse('video-search'), {'q': 'ocean'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual([video['id'] for video in response.data['results']],
+                         [self.title_match.id, self.description_match.id])
+
+    def test_search_vector_follows_title_changes(self):
+        """
+        Test that the search vector is updated when the title of a video changes.
+        """
+        self.title_match.title = "River Story"
+        self.title_match.save()
+        response = self.client.get(reverse('video-search'), {'q': 'river'})
+        self.assertEqual([video['id'] for video in response.data['results']], [self.title_match.id])
+
+    def test_search_without_term(self):
+        """
+        Test that a search without term returns a 400 status code.
+        """
+        response = self.client.get(reverse('video-search'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_autocomplete_tolerates_typos(self):
+        """
+        Test that the autocomplete suggests titles for a misspelled beginning of a title.
+        """
+        response = self.client.get(reverse('video-autocomplete'), {'q': 'ocaen adven'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['title'], "Ocean Adventure")
@@ -0,0 +1,11 @@
+from rest_framework.pagination import CursorPagination
+
+
+class UserProfileCursorPagination(CursorPagination):
+    """
+    Cursor pagination of the profile list, newest first by primary key.
+    """
+    ordering = '-id'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
@@ -0,0 +1,176 @@
+import functools
+import hashlib
+import time
+import uuid
+from django_redis import get_redis_connection
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+# Trims the sorted set of every key to its window and rejects the attempt if
+# any key is full, returning the seconds to wait. Otherwise the attempt is
+# logged under the keys flagged for recording. ARGV: now, member, then limit,
+# window and record flag per key.
+CHECK_SCRIPT = """
+local now = tonumber(ARGV[1])
+local wait = nil
+for i, key in ipairs(KEYS) do
+    local limit = tonumber(ARGV[i * 3])
+    local duration = tonumber(ARGV[i * 3 + 1])
+    redis.call('ZREMRANGEBYSCORE', key, 0, now - duration)
+    if redis.call('ZCARD', key) >= limit then
+        local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+        local remaining = tonumber(oldest[2]) + duration - now
+        if wait == nil or remaining > wait then
+            wait = remaining
+        end
+    end
+end
+if wait ~= nil then
+    return tostring(math.max(wait, 1))
+end
+for i, key in ipairs(KEYS) do
+    if ARGV[i * 3 + 2] == '1' then
+        redis.call('ZADD', key, now, ARGV[2])
+        redis.call('EXPIRE', key, ARGV[i * 3 + 1])
+    end
+end
+return false
+"""
+
+
+@functools.cache
+def get_check_script():
+    """
+    Returns CHECK_SCRIPT registered on the django-redis connection. The Script
+    is created once per process and runs via EVALSHA, so requests don't resend
+    the script.
+
+    Returns:
+        Script: The callable Lua script.
+    """
+    return get_redis_connection('default').register_script(CHECK_SCRIPT)
+
+
+def parse_rate(rate):
+    """
+    Parses a rate like '10/min' into the number of requests and the window in seconds.
+
+    Args:
+        rate (str): The rate, requests per second, minute, hour or day.
+
+    Returns:
+        tuple: The (number of requests, window in seconds) pair.
+    """
+    num, period = rate.split('/')
+    return int(num), DURATIONS[period[0]]
+
+
+class SlidingWindowRateThrottle(BaseThrottle):
+    """
+    Sliding-window rate limit per client IP and per email address.
+
+    The view sets a throttle_scope; the rates are read from the
+    DEFAULT_THROTTLE_RATES setting under '<scope>_ip' and '<scope>_email'.
+    Allowed attempts are logged with their time in a Redis sorted set per key;
+    all keys of a request are checked and updated by one Lua script, i.e. one
+    round trip on the django-redis connection. Rejected attempts are not
+    logged, so a set never holds more entries than its limit. Kinds listed in
+    the throttle_failures_only attribute of the view are only checked here;
+    the view logs them with record_failure (e.g. failed logins per email, so
+    successful logins don't count). Throttles run before the handler of the
+    view, so a rejected request causes no password hashing, database query
+    or email.
+    """
+    key_prefix = 'throttle'
+
+    def get_ident(self, request):
+        """
+        Returns the client IP of the request. X-Forwarded-For is only trusted
+        if NUM_PROXIES is set; otherwise clients could send a new address with
+        every attempt and never reach the limit per IP.
+        """
+        if api_settings.NUM_PROXIES is None:
+            return request.META.get('REMOTE_ADDR')
+        return super().get_ident(request)
+
+    def get_email(self, request):
+        """
+        Returns the normalized email address of the request body, or None.
+        """
+        email = request.data.get('email') if hasattr(request.data, 'get') else None
+        return email.strip().lower() if isinstance(email, str) and email.strip() else None
+
+    def get_checks(self, request, view):
+        """
+        Returns the rate limits that apply to the request.
+
+        Args:
+            request (Request): The request.
+            view (APIView): The view, with its throttle_scope.
+
+        Returns:
+            list: (kind, key, number of requests, window in seconds) tuples.
+        """
+        scope = getattr(view, 'throttle_scope', None)
+        if not scope:
+            return []
+        rates = api_settings.DEFAULT_THROTTLE_RATES
+        checks = []
+        for kind, ident in (('ip', self.get_ident(request)), ('email', self.get_email(request))):
+            rate = rates.get(f"{scope}_{kind}")
+            if rate and ident:
+                digest = hashlib.sha256(ident.encode()).hexdigest()
+                checks.append((kind, f"{self.key_prefix}:{scope}:{kind}:{digest}", *parse_rate(rate)))
+        return checks
+
+    def allow_request(self, request, view):
+        """
+        Checks the attempt against the rate limits of the view and logs it if it is allowed.
+
+        Args:
+            request (Request): The request.
+            view (APIView): The view.
+
+        Returns:
+            bool: True if the request is within all limits.
+        """
+        self.wait_seconds = None
+        checks = self.get_checks(request, view)
+        if not checks:
+            return True
+        failures_only = getattr(view, 'throttle_failures_only', ())
+        args = [time.time(), uuid.uuid4().hex]
+        for kind, key, num_requests, duration in checks:
+            args += [num_requests, duration, '0' if kind in failures_only else '1']
+        wait = get_check_script()(keys=[key for _, key, _, _ in checks], args=args)
+        if wait is not None:
+            self.wait_seconds = float(wait)
+        return self.wait_seconds is None
+
+    def record_failure(self, request, view):
+        """
+        Logs a failed attempt under the keys of the kinds in throttle_failures_only of the view.
+
+        Args:
+            request (Request): The request.
+            view (APIView): The view.
+        """
+        failures_only = getattr(view, 'throttle_failures_only', ())
+        checks = [check for check in self.get_checks(request, view) if check[0] in failures_only]
+        if not checks:
+            return
+        now = time.time()
+        pipeline = get_redis_connection('default').pipeline()
+        for _, key, num_requests, duration in checks:
+            pipeline.zadd(key, {uuid.uuid4().hex: now})
+            pipeline.expire(key, duration)
+        pipeline.execute()
+
+    def wait(self):
+        """
+        Returns the seconds until the oldest logged attempt leaves the window, for the Retry-After header.
+        """
+        return self.wait_seconds
@@ -1,7 +1,7 @@
 from django.urls import path
 from .views import UserProfileList, UserProfileDetail, \
     RegistrationView, CustomLoginView, ActivateAccountView, \
-    PasswordResetRequestView, PasswordResetConfirmView
+    PasswordResetRequestView, PasswordResetConfirmView, TokenRefreshView
 
 
 urlpatterns = [
@@ -10,6 +10,7 @@ urlpatterns = [
     path('profiles/<int:pk>/', UserProfileDetail.as_view(), name='userprofile-detail'),
     path('registration/', RegistrationView.as_view(), name='registration'),
     path('login/', CustomLoginView.as_view(), name='login'),
+    path('auth/token/refresh/', TokenRefreshView.as_view(), name='token-refresh'),
     path('activate/<uidb64>/<token>/', ActivateAccountView.as_view(), name='activate-account'),
     path('auth/password-reset/', PasswordResetRequestView.as_view(), name='password-reset-request'),
     path('auth/password-reset-confirm/', PasswordResetConfirmView.as_view(), name='password-reset-confirm'),
@@ -1,6 +1,11 @@
 from django.conf import settings
+from django.db import IntegrityError, transaction
 from rest_framework import generics
 from users_app.models import UserProfile
+from users_app.tasks import queue_email
+from users_app.authentication import get_token_user, get_token_expiry, issue_token, rotate_token
+from .pagination import UserProfileCursorPagination
+from .throttling import SlidingWindowRateThrottle
 from .serializers import (
     UserProfileSerializer,
     PasswordResetRequestSerializer,
@@ -9,7 +14,6 @@ from .serializers import (
 )
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny, IsAuthenticated, IsAuthenticatedOrReadOnly
-from rest_framework.authtoken.models import Token
 from rest_framework.response import Response
 from rest_framework import status
 from django.core.cache.backends.base import DEFAULT_TIMEOUT
@@ -30,6 +34,7 @@ from django.template.loader import render_to_string
 
 
 CACHE_TTL = getattr(settings, 'CACHE_TTL', DEFAULT_TIMEOUT)
+USERNAME_ATTEMPTS = 5
 
 
 @cache_page(CACHE_TTL)
@@ -40,8 +45,9 @@ def index(request):
 
 class UserProfileList(generics.ListCreateAPIView):
     permission_classes = [IsAuthenticatedOrReadOnly]
-    queryset = UserProfile.objects.all()
+    queryset = UserProfile.objects.select_related('user')
     serializer_class = UserProfileSerializer
+    pagination_class = UserProfileCursorPagination
 
 
 class UserProfileDetail(generics.RetrieveUpdateDestroyAPIView):
@@ -51,17 +57,22 @@ class UserProfileDetail(generics.RetrieveUpdateDestroyAPIView):
 
 
 class RegistrationView(APIView):
+    authentication_classes = []
     permission_classes = [AllowAny]
+    throttle_classes = [SlidingWindowRateThrottle]
+    throttle_scope = 'registration'
 
-    def send_activation_email(self, user_email, user_name, activation_url):
+    def send_activation_email(self, user_id, user_email, user_name, activation_url):
         """
         Sends an activation email to the user.
 
-        This function composes and sends an email to the user
-        containing a link to activate their account. The email
-        is sent in both plain text and HTML formats.
+        This function composes an email to the user containing a
+        link to activate their account and queues it for the email
+        worker, which marks the profile with email_sent once it is
+        sent. The email is sent in both plain text and HTML formats.
 
         Args:
+            user_id (int): The id of the recipient.
             user_email (str): The email address of the recipient.
             user_name (str): The name of the user to personalize the email.
             activation_url (str): The URL for the user to activate their account.
@@ -82,7 +93,7 @@ class RegistrationView(APIView):
         msg = EmailMultiAlternatives(
             subject, text_content, from_email, recipient_list)
         msg.attach_alternative(html_content, "text/html")
-        msg.send()
+        queue_email(msg, user_id)
 
     def post(self, request):
         """
@@ -105,13 +116,11 @@ class RegistrationView(APIView):
             return Response(serializer.errors)
 
         user = self.create_inactive_user(serializer)
-        user_profile = self.get_or_create_user_profile(user)
+        self.get_or_create_user_profile(user)
         activation_url = self.build_activation_url(user)
 
         try:
-            self.send_activation_email(user.email, user.username, activation_url)
-            user_profile.email_sent = True
-            user_profile.save()
+            self.send_activation_email(user.id, user.email, user.username, activation_url)
         except Exception:
             return Response({"error": "E-Mail-Versand fehlgeschlagen."}, status=500)
 
@@ -126,8 +135,9 @@ class RegistrationView(APIView):
         Creates an inactive user account with the given email and password.
 
         This function creates a new inactive user account with the given email and
-        password. The username of the new user is generated as a random string
-        based on the given email.
+        password. The username of the new user is generated from the given email.
+        If a concurrent registration takes the same username first, the unique
+        constraint fails and a new username is picked, up to USERNAME_ATTEMPTS times.
 
         Args:
             serializer (RegistrationSerializer): The serializer containing the
@@ -135,15 +145,23 @@ class RegistrationView(APIView):
 
         Returns:
             User: The newly created user object.
+
+        Raises:
+            IntegrityError: If no free username could be taken.
         """
         email = serializer.validated_data['email']
-        username = get_unique_username(email)
-        return User.objects.create_user(
-            username=username,
-            email=email,
-            password=serializer.validated_data['password'],
-            is_active=False,
-        )
+        for attempt in range(USERNAME_ATTEMPTS):
+            try:
+                with transaction.atomic():
+                    return User.objects.create_user(
+                        username=get_unique_username(email),
+                        email=email,
+                        password=serializer.validated_data['password'],
+                        is_active=False,
+                    )
+            except IntegrityError:
+                if attempt == USERNAME_ATTEMPTS - 1:
+                    raise
 
     def get_or_create_user_profile(self, user):
         """
@@ -175,6 +193,10 @@ def get_unique_username(email):
     """
     Generate a unique username based on the given email address.
 
+    The local part of the email is used, followed by the lowest free number if
+    it is taken. All usernames starting with the local part are loaded with a
+    single query on the username index, the free one is picked in memory.
+
     Args:
         email (str): The email address from which to generate the username.
 
@@ -182,16 +204,21 @@ def get_unique_username(email):
         str: The unique username.
     """
     base_username = email.split('@')[0]
+    taken = set(User.objects.filter(username__startswith=base_username).values_list('username', flat=True))
     username = base_username
     counter = 1
-    while User.objects.filter(username=username).exists():
+    while username in taken:
         username = f"{base_username}{counter}"
         counter += 1
     return username
 
 
 class CustomLoginView(APIView):
+    authentication_classes = []
     permission_classes = [AllowAny]
+    throttle_classes = [SlidingWindowRateThrottle]
+    throttle_scope = 'login'
+    throttle_failures_only = ('email',)
 
     def post(self, request):
         """
@@ -233,6 +260,8 @@ class CustomLoginView(APIView):
     def login_with_token(self, token):
         """
         Logs in with a token, returning a 200 OK response with the user data.
+        The token is resolved through the token cache, see get_token_user;
+        expired tokens are rejected.
 
         Args:
             token (str): The token to use for login.
@@ -241,17 +270,16 @@ class CustomLoginView(APIView):
             Response: A 200 OK response with the user data, or a 400 Bad Request response
             with an appropriate error message.
         """
-        try:
-            token_obj = Token.objects.get(key=token)
-            user = token_obj.user
-            return self.build_login_response(user, token_obj.key)
-        except Token.DoesNotExist:
+        user, token_obj = get_token_user(token)
+        if user is None:
             return Response({'error': 'Invalid token'}, status=status.HTTP_400_BAD_REQUEST)
+        return build_login_response(user, token_obj)
 
     def login_with_credentials(self, email, password):
         """
         Authenticates a user using email and password, returning a 200 OK response
-        with the user data and token if successful.
+        with the user data and token if successful. An expired token is replaced
+        by a new one.
 
         Args:
             email (str): The user's email address.
@@ -260,35 +288,54 @@ class CustomLoginView(APIView):
         Returns:
             Response: A 200 OK response with the user data and token if authentication
             is successful, or a 400 Bad Request response with an error message if
-            authentication fails.
+            authentication fails. Failed attempts count against the rate limit per email.
         """
         try:
             user = User.objects.get(email=email)
             if user.check_password(password):
-                token, _ = Token.objects.get_or_create(user=user)
-                return self.build_login_response(user, token.key)
+                return build_login_response(user, issue_token(user))
         except User.DoesNotExist:
             pass
+        SlidingWindowRateThrottle().record_failure(self.request, self)
         return Response({'error': 'Invalid email or password'}, status=status.HTTP_400_BAD_REQUEST)
 
-    def build_login_response(self, user, token_key):
+
+class TokenRefreshView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
         """
-        Constructs a login response containing user information and authentication token.
+        Replaces the token of the authenticated user with a new one with a full
+        lifetime. The old token stops working immediately.
 
         Args:
-            user (User): The user object for which the response is being generated.
-            token_key (str): The authentication token key associated with the user.
+            request (Request): The request object of the authenticated user.
 
         Returns:
-            Response: A Response object containing the user's token, email, user ID, and
-            activation status.
+            Response: A 200 OK response with the user data and the new token.
         """
-        return Response({
-            'token': token_key,
-            'email': user.email,
-            'user_id': user.id,
-            'is_active': user.is_active
-        })
+        return build_login_response(request.user, rotate_token(request.user))
+
+
+def build_login_response(user, token):
+    """
+    Constructs a login response containing user information and authentication token.
+
+    Args:
+        user (User): The user object for which the response is being generated.
+        token (Token): The authentication token of the user.
+
+    Returns:
+        Response: A Response object containing the user's token, its expiry, email,
+        user ID, and activation status.
+    """
+    return Response({
+        'token': token.key,
+        'expires_at': get_token_expiry(token),
+        'email': user.email,
+        'user_id': user.id,
+        'is_active': user.is_active
+    })
 
 
 class ActivateAccountView(APIView):
@@ -324,6 +371,10 @@ class ActivateAccountView(APIView):
 
 
 class PasswordResetRequestView(APIView):
+    authentication_classes = []
+    throttle_classes = [SlidingWindowRateThrottle]
+    throttle_scope = 'password_reset'
+
     def post(self, request):
         """
         Handles the POST request to reset a user's password.
@@ -348,7 +399,7 @@ class PasswordResetRequestView(APIView):
 
     def send_password_reset_email(self, user):
         """
-        Sends a password reset email to the user.
+        Sends a password reset email to the user through the email queue.
 
         Args:
             user (User): The user to send the email to.
@@ -365,7 +416,7 @@ class PasswordResetRequestView(APIView):
         html_content = self.build_html_email(reset_url)
         email_message = EmailMultiAlternatives(subject, text_content, from_email, to_email)
         email_message.attach_alternative(html_content, "text/html")
-        email_message.send()
+        queue_email(email_message)
 
     def generate_and_cache_token(self, user):
         """
@@ -0,0 +1,216 @@
+import hashlib
+import time
+from datetime import datetime, timedelta, timezone
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+
+TOKEN_LIFETIME = getattr(settings, 'TOKEN_LIFETIME', 7 * 24 * 60 * 60)
+TOKEN_USER_CACHE_TIMEOUT = getattr(settings, 'TOKEN_USER_CACHE_TIMEOUT', 5 * 60)
+CACHED_USER_FIELDS = ('id', 'username', 'email', 'is_active', 'is_staff', 'is_superuser')
+
+
+def get_token_cache_key(key):
+    """
+    Returns the cache key of a token. The token itself is hashed, so it does not appear in Redis.
+
+    Args:
+        key (str): The token key.
+
+    Returns:
+        str: The cache key.
+    """
+    return f"auth_token:{hashlib.sha256(key.encode()).hexdigest()}"
+
+
+def get_user_cache_key(user_id):
+    """
+    Returns the cache key of the flags of a user, see cache_user.
+
+    Args:
+        user_id (int): The id of the user.
+
+    Returns:
+        str: The cache key.
+    """
+    return f"auth_user:{user_id}"
+
+
+def get_token_expiry(token):
+    """
+    Returns the time a token expires, TOKEN_LIFETIME seconds after it was created.
+
+    Args:
+        token (Token): The token.
+
+    Returns:
+        datetime: The expiry.
+    """
+    return token.created + timedelta(seconds=TOKEN_LIFETIME)
+
+
+def cache_token(token, user):
+    """
+    Mirrors an active token in the cache, with a timeout matching its expiry,
+    and caches the flags of its user (see cache_user).
+
+    Only the id of the user and the creation time of the token are cached with
+    the token; the flags of the user get their own short-lived entry, so
+    changes that bypass the signals (e.g. queryset updates) take effect after
+    TOKEN_USER_CACHE_TIMEOUT seconds at the latest.
+
+    Args:
+        token (Token): The token.
+        user (User): The user of the token.
+
+    Returns:
+        dict: The cached token data.
+    """
+    data = {'user_id': user.pk, 'created': token.created.timestamp()}
+    timeout = int(get_token_expiry(token).timestamp() - time.time())
+    if timeout > 0:
+        cache.set(get_token_cache_key(token.key), data, timeout)
+    cache_user(user)
+    return data
+
+
+def cache_user(user):
+    """
+    Caches the id and the flags of a user (CACHED_USER_FIELDS) for TOKEN_USER_CACHE_TIMEOUT seconds.
+
+    Args:
+        user (User): The user.
+
+    Returns:
+        dict: The cached flags.
+    """
+    flags = {name: getattr(user, name) for name in CACHED_USER_FIELDS}
+    cache.set(get_user_cache_key(user.pk), flags, TOKEN_USER_CACHE_TIMEOUT)
+    return flags
+
+
+def get_token_user(key):
+    """
+    Returns the user of an active token together with the token.
+
+    Tokens are read from the cache and only loaded from the database (and then
+    cached until they expire) on a miss; entries without the creation time of
+    the token (an older format) count as a miss. The flags of the user are read
+    from their own entry and reloaded when it has expired. The user is built
+    as a deferred instance, so cache hits need no query; other fields are
+    loaded on access, and saving the user only writes the cached fields.
+
+    Args:
+        key (str): The token key.
+
+    Returns:
+        tuple: The (user, token) pair, or (None, None) if the token does not exist or has expired.
+    """
+    data = cache.get(get_token_cache_key(key))
+    flags = None
+    if data is None or 'created' not in data or 'user_id' not in data:
+        token = Token.objects.select_related('user').filter(key=key).first()
+        if token is None:
+            return None, None
+        data = cache_token(token, token.user)
+        flags = {name: getattr(token.user, name) for name in CACHED_USER_FIELDS}
+    if data['created'] + TOKEN_LIFETIME <= time.time():
+        return None, None
+    if flags is None:
+        flags = cache.get(get_user_cache_key(data['user_id']))
+    if flags is None:
+        user = User.objects.filter(pk=data['user_id']).only(*CACHED_USER_FIELDS).first()
+        if user is None:
+            return None, None
+        flags = cache_user(user)
+    fields = [field.attname for field in User._meta.concrete_fields if field.attname in flags]
+    user = User.from_db('default', fields, [flags[name] for name in fields])
+    token = Token.from_db('default', ['key', 'user_id', 'created'],
+                          [key, user.id, datetime.fromtimestamp(data['created'], tz=timezone.utc)])
+    return user, token
+
+
+def issue_token(user):
+    """
+    Returns the active token of a user, replacing a missing or expired one.
+
+    Args:
+        user (User): The user.
+
+    Returns:
+        Token: The active token.
+    """
+    token = Token.objects.filter(user=user).first()
+    if token and get_token_expiry(token).timestamp() > time.time():
+        return token
+    return rotate_token(user)
+
+
+def rotate_token(user):
+    """
+    Replaces the token of a user with a new one with a full lifetime. The old
+    token stops working immediately; the new one is cached right away.
+
+    Args:
+        user (User): The user.
+
+    Returns:
+        Token: The new token.
+    """
+    try:
+        with transaction.atomic():
+            Token.objects.filter(user=user).delete()
+            token = Token.objects.create(user=user)
+    except IntegrityError:
+        return Token.objects.get(user=user)
+    cache_token(token, user)
+    return token
+
+
+def invalidate_cached_user(user_id):
+    """
+    Removes the cached flags of a user, e.g. after the user was deactivated.
+
+    Args:
+        user_id (int): The id of the user.
+
+    Returns:
+        None
+    """
+    cache.delete(get_user_cache_key(user_id))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication that resolves the token and the flags of its user
+    from the cache (Redis) instead of querying the database on every request.
+    Tokens expire TOKEN_LIFETIME seconds after they were issued. The cache
+    entries are removed by signals once a token deletion or a change of its
+    user is committed (see users_app.signals).
+    """
+
+    def authenticate_credentials(self, key):
+        """
+        Returns the user and the token of the given token key.
+
+        Args:
+            key (str): The token key from the Authorization header.
+
+        Returns:
+            tuple: The (user, token) pair.
+
+        Raises:
+            AuthenticationFailed: If the token does not exist, has expired or its user is inactive.
+        """
+        user, token = get_token_user(key)
+        if user is None:
+            raise AuthenticationFailed(_('Invalid token.'))
+        if not user.is_active:
+            raise AuthenticationFailed(_('User inactive or deleted.'))
+        return user, token
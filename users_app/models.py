@@ -1,7 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils.text import slugify
-from rest_framework.authtoken.models import Token
 
 
 class UserProfile(models.Model):
@@ -25,7 +24,7 @@ class UserProfile(models.Model):
         Save the UserProfile instance. Also save the associated User instance
         if its email has been changed to lowercase. If the slug is empty, set it
         to the slugified version of the User's email address.
-        Create a Token for the user if it does not already exist.
+        Auth tokens are issued at login, see users_app.authentication.issue_token.
         '''
         if self.user.email:
             email_lower = self.user.email.lower()
@@ -36,5 +35,3 @@ class UserProfile(models.Model):
             self.slug = slugify(self.user.email)
 
         super(UserProfile, self).save(*args, **kwargs)
-
-        token, created = Token.objects.get_or_create(user=self.user)
@@ -1,6 +1,10 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework.authtoken.models import Token
+from .authentication import get_token_cache_key, invalidate_cached_user
 from .models import UserProfile
 
 User = get_user_model()
@@ -47,3 +51,44 @@ def save_user_profile(sender, instance, **kwargs):
     if hasattr(instance, '_profile_created'):
         instance.userprofile.save()
         del instance._profile_created
+
+
+@receiver(post_save, sender=User)
+def invalidate_cached_user_flags(sender, instance, created, **kwargs):
+    """
+    Removes the cached flags of a changed user once the change is committed,
+    so a deactivated user (or changed flags like is_staff) takes effect on the
+    next request. Removing the entry earlier would let a concurrent request
+    cache the old flags again.
+
+    Args:
+        sender (User): The User model class that sent the post_save signal.
+        instance (User): The actual User instance that was saved.
+        created (bool): A boolean indicating whether the User instance was
+            created or updated.
+        **kwargs: Additional keyword arguments.
+
+    Returns:
+        None
+    """
+    if not created:
+        user_id = instance.pk
+        transaction.on_commit(lambda: invalidate_cached_user(user_id))
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """
+    Removes a deleted token from the cache once the deletion is committed, so
+    it is rejected immediately and a concurrent request can't cache it again.
+
+    Args:
+        sender (Token): The Token model class that sent the post_delete signal.
+        instance (Token): The deleted Token instance.
+        **kwargs: Additional keyword arguments.
+
+    Returns:
+        None
+    """
+    cache_key = get_token_cache_key(instance.key)
+    transaction.on_commit(lambda: cache.delete(cache_key))
@@ -0,0 +1,229 @@
+import logging
+import pickle
+import smtplib
+import time
+import uuid
+from datetime import timedelta
+import django_rq
+from django.conf import settings
+from django.core.mail import get_connection
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rq import Retry, get_current_job
+from .authentication import TOKEN_LIFETIME
+from .models import UserProfile
+
+
+logger = logging.getLogger(__name__)
+
+EMAIL_QUEUE = 'email'
+PENDING_EMAILS_KEY = 'emails:pending'
+BATCH_SCHEDULED_KEY = 'emails:batch_scheduled'
+BATCH_SCHEDULED_TIMEOUT = 5 * 60
+# Sorted set of the in-flight lists of running email jobs, scored by the end of their lease.
+INFLIGHT_EMAILS_KEY = 'emails:inflight'
+INFLIGHT_LEASE = 5 * 60
+EMAIL_BATCH_SIZE = getattr(settings, 'EMAIL_BATCH_SIZE', 50)
+EMAIL_MAX_ATTEMPTS = getattr(settings, 'EMAIL_MAX_ATTEMPTS', 10)
+DEAD_EMAILS_KEY = 'emails:dead'
+EMAIL_RETRY_INTERVALS = [10, 30, 60, 5 * 60, 15 * 60]
+TOKEN_PURGE_BATCH_SIZE = getattr(settings, 'TOKEN_PURGE_BATCH_SIZE', 1000)
+
+
+# Moves up to ARGV[1] emails from the pending list (KEYS[1]) to the in-flight
+# list of a job (KEYS[2]) and extends its lease in the in-flight set (KEYS[3])
+# to ARGV[2]. Returns the moved emails.
+TAKE_SCRIPT = """
+local items = redis.call('LRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+redis.call('ZADD', KEYS[3], ARGV[2], KEYS[2])
+if #items > 0 then
+    redis.call('LTRIM', KEYS[1], #items, -1)
+    redis.call('RPUSH', KEYS[2], unpack(items))
+end
+return items
+"""
+
+# Moves the emails of every in-flight list in the in-flight set (KEYS[1])
+# whose lease ended before ARGV[1] back to the pending list (KEYS[2]).
+# Returns the number of moved emails.
+RECOVER_SCRIPT = """
+local count = 0
+for _, list in ipairs(redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])) do
+    while redis.call('LMOVE', list, KEYS[2], 'LEFT', 'RIGHT') do
+        count = count + 1
+    end
+    redis.call('ZREM', KEYS[1], list)
+end
+return count
+"""
+
+
+class EmailDeliveryError(Exception):
+    """
+    Raised by the email job if messages could not be sent, so RQ retries the job.
+    """
+
+
+def queue_email(message, user_id=None):
+    """
+    Queues an email for delivery by the worker of the email queue.
+
+    The message is appended to a Redis list. A send_email_batch job is only
+    enqueued if none is scheduled yet, so a burst of emails is sent by a
+    single job over a single SMTP connection.
+
+    Args:
+        message (EmailMessage): The email to send.
+        user_id (int, optional): The user whose profile is marked with email_sent once the email is sent.
+
+    Returns:
+        None
+    """
+    connection = django_rq.get_connection(EMAIL_QUEUE)
+    connection.rpush(PENDING_EMAILS_KEY, pickle.dumps((message, user_id, 0)))
+    schedule_email_batch(connection)
+
+
+def schedule_email_batch(connection, delay=None):
+    """
+    Enqueues a send_email_batch job unless one is scheduled already.
+
+    Args:
+        connection (Redis): The Redis connection of the email queue.
+        delay (int, optional): Seconds to wait before the job runs. Defaults to running it right away.
+
+    Returns:
+        bool: True if a job was enqueued.
+    """
+    if not connection.set(BATCH_SCHEDULED_KEY, 1, nx=True, ex=BATCH_SCHEDULED_TIMEOUT + (delay or 0)):
+        return False
+    queue = django_rq.get_queue(EMAIL_QUEUE)
+    retry = Retry(max=len(EMAIL_RETRY_INTERVALS), interval=EMAIL_RETRY_INTERVALS)
+    if delay:
+        queue.enqueue_in(timedelta(seconds=delay), send_email_batch, retry=retry)
+    else:
+        queue.enqueue(send_email_batch, retry=retry)
+    return True
+
+
+def requeue_inflight_emails(redis, until):
+    """
+    Moves the emails of the in-flight lists whose lease ended by the given
+    time back to the pending list.
+
+    Args:
+        redis (Redis): The Redis connection of the email queue.
+        until (float): The Unix time the leases must have ended by.
+
+    Returns:
+        int: The number of moved emails.
+    """
+    return redis.register_script(RECOVER_SCRIPT)(keys=[INFLIGHT_EMAILS_KEY, PENDING_EMAILS_KEY], args=[until])
+
+
+def recover_stalled_emails():
+    """
+    Moves the emails of email jobs that died while sending (e.g. a killed
+    worker) back to the pending list, once the lease of their in-flight list
+    has ended, and schedules a send_email_batch job for pending emails. Runs
+    periodically via the RQ cron scheduler (videoflix_backend_hub/cron.py), so
+    no email is stranded when no new email is queued.
+
+    Returns:
+        int: The number of recovered emails.
+    """
+    redis = django_rq.get_connection(EMAIL_QUEUE)
+    count = requeue_inflight_emails(redis, time.time())
+    if count:
+        logger.warning(f"{count} E-Mail(s) eines abgebrochenen Jobs wieder eingereiht.")
+    if redis.llen(PENDING_EMAILS_KEY):
+        schedule_email_batch(redis)
+    return count
+
+
+def send_email_batch():
+    """
+    Sends all queued emails over one SMTP connection.
+
+    The emails are moved from the Redis list to an in-flight list of the job in
+    batches of EMAIL_BATCH_SIZE until it is empty, and removed from the
+    in-flight list once they are sent, so the emails of a job that dies while
+    sending are recovered by recover_stalled_emails. The profiles of the
+    recipients of sent emails are marked with email_sent, one update per batch.
+    Emails that fail are put back into the list with their attempt count and
+    EmailDeliveryError is raised, so RQ retries the job with increasing
+    intervals (EMAIL_RETRY_INTERVALS); after the last retry a new job is
+    scheduled. Emails that failed EMAIL_MAX_ATTEMPTS times are moved to the
+    dead-letter list (DEAD_EMAILS_KEY) instead.
+
+    Returns:
+        int: The number of sent emails.
+
+    Raises:
+        EmailDeliveryError: If any email could not be sent.
+    """
+    redis = django_rq.get_connection(EMAIL_QUEUE)
+    redis.delete(BATCH_SCHEDULED_KEY)
+    requeue_inflight_emails(redis, time.time())
+    take = redis.register_script(TAKE_SCRIPT)
+    inflight = f"{INFLIGHT_EMAILS_KEY}:{uuid.uuid4().hex}"
+    keys = [PENDING_EMAILS_KEY, inflight, INFLIGHT_EMAILS_KEY]
+    failed = 0
+    count = 0
+    with get_connection() as connection:
+        while items := take(keys=keys, args=[EMAIL_BATCH_SIZE, time.time() + INFLIGHT_LEASE]):
+            sent_to = []
+            for item in items:
+                message, user_id, *attempts = pickle.loads(item)
+                attempts = attempts[0] + 1 if attempts else 1
+                try:
+                    connection.send_messages([message])
+                except smtplib.SMTPRecipientsRefused as e:
+                    logger.error(f"E-Mail an {', '.join(message.to)} abgelehnt: {e}")
+                    redis.lrem(inflight, 1, item)
+                    continue
+                except Exception as e:
+                    pipeline = redis.pipeline()
+                    pipeline.lrem(inflight, 1, item)
+                    if attempts >= EMAIL_MAX_ATTEMPTS:
+                        logger.error(f"E-Mail an {', '.join(message.to)} nach {attempts} Versuchen verworfen: {e}")
+                        pipeline.rpush(DEAD_EMAILS_KEY, pickle.dumps((message, user_id, attempts)))
+                    else:
+                        logger.error(f"E-Mail an {', '.join(message.to)} fehlgeschlagen: {e}")
+                        pipeline.rpush(inflight, pickle.dumps((message, user_id, attempts)))
+                        failed += 1
+                    pipeline.execute()
+                    continue
+                redis.lrem(inflight, 1, item)
+                count += 1
+                if user_id:
+                    sent_to.append(user_id)
+            if sent_to:
+                UserProfile.objects.filter(user_id__in=sent_to).update(email_sent=True)
+    # Ends the lease right away, so the failed emails go back to the pending list.
+    redis.zadd(INFLIGHT_EMAILS_KEY, {inflight: 0})
+    requeue_inflight_emails(redis, 0)
+    if failed:
+        rq_job = get_current_job()
+        if not (rq_job and rq_job.retries_left):
+            schedule_email_batch(redis, delay=EMAIL_RETRY_INTERVALS[-1])
+        raise EmailDeliveryError(f"{failed} E-Mail(s) konnten nicht gesendet werden.")
+    logger.info(f"{count} E-Mail(s) gesendet.")
+    return count
+
+
+def purge_expired_tokens():
+    """
+    Deletes the expired auth tokens in batches of TOKEN_PURGE_BATCH_SIZE rows,
+    so the token table only holds active tokens and no delete locks many rows
+    at once. Runs periodically via the RQ cron scheduler (videoflix_backend_hub/cron.py).
+
+    Returns:
+        int: The number of deleted tokens.
+    """
+    expired = Token.objects.filter(created__lte=timezone.now() - timedelta(seconds=TOKEN_LIFETIME))
+    count = 0
+    while keys := list(expired.values_list('key', flat=True)[:TOKEN_PURGE_BATCH_SIZE]):
+        count += Token.objects.filter(key__in=keys).delete()[0]
+    logger.info(f"{count} abgelaufene Token gelöscht.")
+    return count
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from import_export import resources
 from import_export.admin import ImportExportModelAdmin
-from .models import Video
+from .models import Video, VideoRendition, UploadSession, TranscodeJob
 
 
 class VideoResource(resources.ModelResource):
@@ -9,9 +9,64 @@ class VideoResource(resources.ModelResource):
         model = Video
 
 
+class VideoRenditionInline(admin.TabularInline):
+    model = VideoRendition
+    extra = 0
+    can_delete = False
+    readonly_fields = ["height", "bitrate", "codec", "container", "file", "file_size", "status"]
+
+    def has_add_permission(self, request, obj=None):
+        """
+        Renditions are created by the conversion jobs only.
+        """
+        return False
+
+
 @admin.register(Video)
 class VideoAdmin(ImportExportModelAdmin):
     resource_class = VideoResource
+    list_display = ("id", "title", "genre", "created_at", "get_resolutions")
+
+    def get_queryset(self, request):
+        """
+        Returns the video queryset with the renditions prefetched in one query.
+
+        Parameters
+        ----------
+        request : django.http.HttpRequest
+            The request from the client for the current view.
+
+        Returns
+        -------
+        QuerySet
+            The videos with their renditions.
+        """
+        return super().get_queryset(request).prefetch_related('renditions')
+
+    def get_inlines(self, request, obj):
+        """
+        Shows the renditions only when changing an existing video.
+        """
+        return [VideoRenditionInline] if obj else []
+
+    def get_resolutions(self, obj):
+        """
+        Lists the finished resolutions of the given video.
+
+        Parameters
+        ----------
+        obj : Video
+            The video instance.
+
+        Returns
+        -------
+        str
+            The finished resolutions, separated by commas.
+        """
+        return ", ".join(rendition.resolution for rendition in obj.renditions.all()
+                         if rendition.status == VideoRendition.STATUS_DONE)
+
+    get_resolutions.short_description = "Auflösungen"
 
     def get_fields(self, request, obj=None):
         """
@@ -55,7 +110,24 @@ class VideoAdmin(ImportExportModelAdmin):
             The list of readonly field names to mark as readonly in the admin
             interface.
         """
-        readonly_fields = ["video_144p", "video_240p", "video_360p", "video_480p", "video_720p", "video_1080p"]
+        readonly_fields = ["hls_playlist", "duration", "width", "height", "video_codec", "audio_codec",
+                           "bitrate", "frame_rate"]
         if obj:
             readonly_fields.append('id')
         return readonly_fields
+
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ("id", "filename", "title", "offset", "size", "video", "updated_at")
+    readonly_fields = ("filename", "size", "offset", "checksum", "video")
+
+
+@admin.register(TranscodeJob)
+class TranscodeJobAdmin(admin.ModelAdmin):
+    list_display = ("video", "stage", "rendition", "chunk", "status", "queue", "attempts", "queued_at", "started_at",
+                    "finished_at")
+    list_filter = ("status", "stage", "queue")
+    list_select_related = ("video", "rendition")
+    readonly_fields = ("video", "rendition", "stage", "chunk", "status", "queue", "rq_job_id", "attempts", "error",
+                       "queued_at", "started_at", "finished_at")
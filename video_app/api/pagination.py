@@ -0,0 +1,134 @@
+from base64 import b64decode, b64encode
+from urllib import parse
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, PageNumberPagination
+from rest_framework.utils.urls import replace_query_param
+
+
+class VideoCursorPagination(CursorPagination):
+    """
+    Keyset pagination of the video list, newest first.
+
+    The cursor holds the (created_at, id) pair of the last video of a page and
+    the next page continues strictly after that pair, so videos sharing a
+    creation date are neither repeated nor skipped, and every page is a range
+    scan of the (created_at, id) index, however far the client has scrolled.
+    Works with model instances and with values() rows.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 24
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Returns the page of the queryset after (or, for a reverse cursor,
+        before) the position of the cursor.
+
+        :param queryset: The videos to paginate.
+        :param request: The request with the optional cursor and page size.
+        :param view: The view, unused.
+        :return: A list of the videos of the page, newest first.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.date_field = queryset.model._meta.get_field('created_at')
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        if self.cursor is not None:
+            created_at, pk = self.cursor.position
+            if reverse:
+                queryset = queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk))
+            else:
+                queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+        ordering = ('created_at', 'id') if reverse else self.ordering
+        results = list(queryset.order_by(*ordering)[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+        self.has_next = self.cursor is not None if reverse else has_more
+        self.has_previous = has_more if reverse else self.cursor is not None
+        self.display_page_controls = self.has_next or self.has_previous
+        return self.page
+
+    def get_next_link(self):
+        """
+        Returns the URL of the page after the last video of this page, or None.
+        """
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self.get_position(self.page[-1])))
+
+    def get_previous_link(self):
+        """
+        Returns the URL of the page before the first video of this page, or None.
+        """
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=self.get_position(self.page[0])))
+
+    def get_position(self, video):
+        """
+        Returns the (created_at, id) pair of a video.
+
+        :param video: A model instance or a values() row.
+        :return: A tuple of the creation date and the id.
+        """
+        if isinstance(video, dict):
+            return video['created_at'], video['id']
+        return video.created_at, video.id
+
+    def encode_cursor(self, cursor):
+        """
+        Returns the URL of the current request with the given cursor.
+
+        :param cursor: A Cursor whose position is a (created_at, id) pair.
+        :return: The URL.
+        """
+        created_at, pk = cursor.position
+        tokens = {'p': created_at.isoformat(), 'i': str(pk)}
+        if cursor.reverse:
+            tokens['r'] = '1'
+        querystring = parse.urlencode(tokens)
+        encoded = b64encode(querystring.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        """
+        Returns the Cursor of the request, or None on the first page.
+
+        :param request: The request.
+        :return: A Cursor whose position is a (created_at, id) pair, or None.
+        :raises NotFound: If the cursor is malformed.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            querystring = b64decode(encoded.encode('ascii')).decode('ascii')
+            tokens = parse.parse_qs(querystring, keep_blank_values=True)
+            reverse = bool(int(tokens.get('r', ['0'])[0]))
+            created_at = self.date_field.to_python(tokens['p'][0])
+            pk = int(tokens['i'][0])
+        except (KeyError, TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        if created_at is None:
+            raise NotFound(self.invalid_cursor_message)
+        return Cursor(offset=0, reverse=reverse, position=(created_at, pk))
+
+
+class VideoSearchPagination(PageNumberPagination):
+    """
+    Page number pagination of search results, which are ordered by rank
+    rather than by an indexed column.
+    """
+    page_size = 24
+    page_size_query_param = 'page_size'
+    max_page_size = 100
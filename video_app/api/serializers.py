@@ -1,35 +1,152 @@
+import copy
+from django.core.files.storage import default_storage
+from django.db import models
 from rest_framework import serializers
-from video_app.models import Video
+from video_app.signing import sign_media_url, sign_hls_url
+from video_app.tasks import select_resolutions
+from video_app.models import Video, VideoRendition, UploadSession, TranscodeJob
 
 
-class VideoSerializer(serializers.ModelSerializer):
+class SignedFileField(serializers.FileField):
+    """
+    File field whose URL is signed and expires (see video_app.signing), absolute
+    if the request is in the serializer context. With directory_scope, the
+    signature covers the directory of the file, as needed for HLS playlists.
+    """
+
+    def __init__(self, directory_scope=False, **kwargs):
+        self.directory_scope = directory_scope
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        """
+        Returns the signed URL of the file, or None for an empty file.
+        """
+        if not value:
+            return None
+        url = sign_hls_url(value.name) if self.directory_scope else sign_media_url(value.name)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+
+class SignedFileFieldsMixin:
+    """
+    Serializes the file fields of a model serializer with signed URLs.
+    """
+    serializer_field_mapping = {**serializers.ModelSerializer.serializer_field_mapping,
+                                models.FileField: SignedFileField}
+
+
+class VideoRenditionSerializer(SignedFileFieldsMixin, serializers.ModelSerializer):
+    resolution = serializers.CharField(read_only=True)
+
     class Meta:
-        model = Video
-        fields = '__all__'
-        read_only_fields = ['id', 'created_at', 'thumbnail', 'video_144p',
-                            'video_240p', 'video_360p', 'video_480p', 'video_720p', 'video_1080p']
+        model = VideoRendition
+        fields = ['resolution', 'height', 'bitrate', 'codec', 'container', 'file', 'file_size', 'status']
+
+
+class PrebuiltFieldsMixin:
+    """
+    Builds the fields of a serializer class once and copies them per instance,
+    instead of building them on every instantiation. The 'fields' entry of the
+    serializer context (see get_requested_fields) restricts the output to the
+    given field names; unknown names are ignored.
+    """
+
+    def get_fields(self):
+        """
+        Returns copies of the prebuilt fields that were requested.
+
+        :return: A dict of field names to unbound field instances.
+        """
+        cls = type(self)
+        if '_prebuilt_fields' not in cls.__dict__:
+            cls._prebuilt_fields = super().get_fields()
+        requested = self.context.get('fields')
+        return {name: copy.deepcopy(field) for name, field in cls._prebuilt_fields.items()
+                if not requested or name in requested}
+
+
+def get_requested_fields(request):
+    """
+    Returns the field names of the sparse fieldset requested with ?fields=.
+
+    :param request: The request, or None.
+    :return: A set of field names, or None if all fields are requested.
+    """
+    value = request.GET.get('fields') if request else None
+    if not value:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class MediaUrlField(serializers.Field):
+    """
+    Read-only field that turns the stored name of a media file into its URL,
+    absolute if the request is in the serializer context.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        """
+        Returns the URL of the media file with the given name, or None for an empty name.
+        """
+        if not value:
+            return None
+        url = default_storage.url(str(value))
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+
+class VideoListSerializer(PrebuiltFieldsMixin, serializers.Serializer):
+    """
+    Lightweight card representation of a video for the list endpoint.
+
+    Serializes the dict rows of a values() query, so no model instances are
+    created; get_columns returns the columns the requested fields need.
+    """
+    id = serializers.IntegerField(read_only=True)
+    created_at = serializers.DateField(read_only=True)
+    title = serializers.CharField(read_only=True)
+    description = serializers.CharField(read_only=True)
+    genre = serializers.CharField(read_only=True)
+    thumbnail = MediaUrlField()
+    duration = serializers.FloatField(read_only=True)
+    available_resolutions = serializers.SerializerMethodField()
+
+    COLUMNS = {
+        'available_resolutions': ('width', 'height'),
+    }
 
-    def __init__(self, *args, **kwargs):
+    @classmethod
+    def get_columns(cls, fields=None):
         """
-        Initializes the VideoSerializer instance and customizes the fields based on the request method.
+        Returns the database columns needed for the given field names.
 
-        If the request method is 'POST', only the 'title', 'description', and 'video_file' fields
-        are retained in the serializer. Other fields are removed to restrict the input fields
-        available during video creation.
+        The columns of the list ordering (created_at, id) are always included,
+        as the cursor pagination reads its position from them.
 
-        :param args: Additional positional arguments passed to the parent's __init__ method.
-        :param kwargs: Additional keyword arguments passed to the parent's __init__ method.
+        :param fields: The requested field names, or None for all fields.
+        :return: A list of column names for values().
         """
-        super().__init__(*args, **kwargs)
+        columns = ['id', 'created_at']
+        for name in cls._declared_fields:
+            if fields and name not in fields:
+                continue
+            columns += [column for column in cls.COLUMNS.get(name, (name,)) if column not in columns]
+        return columns
 
-        request = self.context.get('request', None)
-        if request and request.method == 'POST':
-            allowed = ['title', 'description', 'video_file']
-            existing = list(self.fields.keys())
-            for field_name in existing:
-                if field_name not in allowed:
-                    self.fields.pop(field_name)
+    def get_available_resolutions(self, row):
+        """
+        Returns the resolutions that do not exceed the source resolution of the video.
+        """
+        return select_resolutions(row['width'], row['height'])
 
+
+class VideoFileValidationMixin:
     def validate_video_file(self, value):
         """
         Validates the video_file field.
@@ -43,6 +160,25 @@ class VideoSerializer(serializers.ModelSerializer):
         return value
 
 
+class VideoSerializer(PrebuiltFieldsMixin, SignedFileFieldsMixin, VideoFileValidationMixin,
+                      serializers.ModelSerializer):
+    available_resolutions = serializers.ListField(source='get_available_resolutions', read_only=True)
+    hls_playlist = SignedFileField(directory_scope=True, read_only=True)
+    renditions = VideoRenditionSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Video
+        exclude = ['search_vector', 'content_hash']
+        read_only_fields = ['id', 'created_at', 'thumbnail', 'hls_playlist', 'duration', 'width', 'height',
+                            'video_codec', 'audio_codec', 'bitrate', 'frame_rate']
+
+
+class VideoCreateSerializer(SignedFileFieldsMixin, VideoFileValidationMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Video
+        fields = ['title', 'description', 'video_file']
+
+
 class VideoThumbnailSerializer(serializers.ModelSerializer):
     class Meta:
         model = Video
@@ -53,3 +189,46 @@ class VideoBigThumbnailSerializer(serializers.ModelSerializer):
     class Meta:
         model = Video
         fields = ['thumbnail', 'title', 'description']
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'title', 'description', 'genre', 'filename', 'size', 'offset', 'checksum', 'video']
+        read_only_fields = ['id', 'offset', 'checksum', 'video']
+
+    def validate_filename(self, value):
+        """
+        Validates the filename field.
+
+        :param value: The name of the file to be uploaded.
+        :return: The validated file name.
+        :raises serializers.ValidationError: If the file name is not valid.
+        """
+        if not value.endswith(('.mp4', '.mov', '.avi')):
+            raise serializers.ValidationError("Nur Videodateien sind erlaubt.")
+        return value
+
+
+class TranscodeJobSerializer(serializers.ModelSerializer):
+    resolution = serializers.CharField(source='rendition.resolution', default=None, read_only=True)
+    queue_latency = serializers.DurationField(read_only=True)
+    run_time = serializers.DurationField(read_only=True)
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = TranscodeJob
+        fields = ['id', 'stage', 'resolution', 'chunk', 'status', 'queue', 'attempts', 'error', 'queued_at', 'started_at',
+                  'finished_at', 'queue_latency', 'run_time', 'progress']
+
+    def get_progress(self, obj):
+        """
+        Returns the live progress of a running job from the 'progress' context,
+        which maps job ids to the progress read from the cache.
+
+        :param obj: The TranscodeJob instance.
+        :return: The progress ({'seconds', 'percent'}), 100 percent for finished jobs, otherwise None.
+        """
+        if obj.status == TranscodeJob.STATUS_DONE:
+            return {'seconds': None, 'percent': 100.0}
+        return self.context.get('progress', {}).get(obj.pk)
@@ -1,12 +1,20 @@
 from django.urls import path
-from .views import VideoList, VideoDetail, VideoThumbnail, GenreGroupedVideosView, BigThumbnailView
+from .views import VideoList, VideoDetail, VideoThumbnail, GenreGroupedVideosView, BigThumbnailView, \
+    UploadSessionCreate, UploadSessionDetail, VideoProgress, VideoThumbnailBatch, VideoSearch, VideoAutocomplete, \
+    VideoUpdate, read_write_view
 
 
 urlpatterns = [
     path('', VideoList.as_view(), name='video-list'),
     path('videos/', VideoList.as_view(), name='video-list'),
-    path('videos/<int:pk>/', VideoDetail.as_view(), name='video-detail'),
+    path('videos/thumbnails/', VideoThumbnailBatch.as_view(), name='video-thumbnails'),
+    path('videos/search/', VideoSearch.as_view(), name='video-search'),
+    path('videos/autocomplete/', VideoAutocomplete.as_view(), name='video-autocomplete'),
+    path('videos/<int:pk>/', read_write_view(VideoDetail.as_view(), VideoUpdate.as_view()), name='video-detail'),
     path('videos/<int:pk>/thumbnail/', VideoThumbnail.as_view(), name='video-thumbnail'),
+    path('videos/<int:pk>/progress/', VideoProgress.as_view(), name='video-progress'),
     path('genres/', GenreGroupedVideosView.as_view(), name='genres-grouped'),
     path('big-thumbnail/', BigThumbnailView.as_view(), name='big-thumbnail'),
+    path('uploads/', UploadSessionCreate.as_view(), name='upload-create'),
+    path('uploads/<uuid:pk>/', UploadSessionDetail.as_view(), name='upload-detail'),
 ]
@@ -1,103 +1,751 @@
+import os
+import base64
+import binascii
+import functools
+import hashlib
+import math
+from datetime import datetime, timezone
+from asgiref.sync import sync_to_async
 from rest_framework import generics
-from video_app.models import Video
-from .serializers import VideoSerializer, VideoThumbnailSerializer, VideoBigThumbnailSerializer
+from rest_framework.exceptions import Throttled
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db.models import F, OuterRef, Subquery, Window
+from django.db.models.functions import RowNumber
+from django.utils.cache import get_conditional_response
+from django.utils.decorators import method_decorator
+from django.utils.http import http_date, quote_etag
+from django.views import View
+from django.views.decorators.http import condition
+from django.shortcuts import get_object_or_404
+from video_app.models import Video, UploadSession, TranscodeJob, get_search_config
+from video_app.jobs import get_progress
+from video_app.cache import get_catalog_version, get_catalog_modified, get_video_card_key, cached_catalog_response, \
+    aget_catalog_version, aget_catalog_modified, acached_catalog_response
+from video_app.signing import get_url_expiry, get_url_window_start, sign_media_url, sign_hls_url
+from video_app.tasks import LADDER
+from .serializers import VideoSerializer, VideoListSerializer, VideoCreateSerializer, VideoBigThumbnailSerializer, \
+    UploadSessionSerializer, TranscodeJobSerializer, get_requested_fields
 from rest_framework.response import Response
 from rest_framework import status
 from .permissions import IsAdminOrReadOnly
+from .pagination import VideoCursorPagination, VideoSearchPagination
 from rest_framework.views import APIView
+from rest_framework.reverse import reverse
 
 
-class VideoList(generics.ListCreateAPIView):
-    queryset = Video.objects.all()
-    serializer_class = VideoSerializer
+GENRE_ROW_SIZE = 6
+MAX_BATCH_IDS = 200
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_THRESHOLD = 0.3
+VIDEO_CARD_TIMEOUT = 24 * 60 * 60
+
+
+def get_representation_etag(request, version):
+    """
+    Builds a strong ETag for the response to a request from a version of the
+    underlying data. The path with its query string and the Accept header are
+    part of the tag, as they select the representation.
+
+    Args:
+        request (Request): The request.
+        version: The version of the data, e.g. the catalog version.
+
+    Returns:
+        str: The ETag (unquoted).
+    """
+    key = f"{version}:{request.get_full_path()}:{request.META.get('HTTP_ACCEPT', '')}"
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def catalog_etag(request, *args, **kwargs):
+    """
+    Returns the ETag of a catalog response, built from the catalog version.
+    """
+    return get_representation_etag(request, get_catalog_version())
+
+
+def catalog_last_modified(request, *args, **kwargs):
+    """
+    Returns the time of the last change of the catalog, if it is known.
+    """
+    return get_catalog_modified()
+
+
+async def acatalog_etag(request, *args, **kwargs):
+    """
+    Async version of catalog_etag.
+    """
+    return get_representation_etag(request, await aget_catalog_version())
+
+
+async def acatalog_last_modified(request, *args, **kwargs):
+    """
+    Async version of catalog_last_modified.
+    """
+    return await aget_catalog_modified()
+
+
+async def get_video_updated_at(request, pk):
+    """
+    Returns updated_at of a video with a single query per request, or None if the video does not exist.
+    """
+    if not hasattr(request, '_video_updated_at'):
+        request._video_updated_at = await Video.objects.filter(pk=pk).values_list('updated_at', flat=True).afirst()
+    return request._video_updated_at
+
+
+async def video_etag(request, pk, *args, **kwargs):
+    """
+    Returns the ETag of a video detail response, built from updated_at of the
+    video and the expiry of the signed media URLs it contains.
+    """
+    updated_at = await get_video_updated_at(request, pk)
+    return get_representation_etag(request, f"{updated_at.isoformat()}:{get_url_expiry()}") if updated_at else None
+
+
+async def video_last_modified(request, pk, *args, **kwargs):
+    """
+    Returns updated_at of the video of a detail response, or the start of the
+    current signing window if it is later, so a 304 never keeps expired URLs.
+    """
+    updated_at = await get_video_updated_at(request, pk)
+    if not updated_at:
+        return None
+    return max(updated_at, datetime.fromtimestamp(get_url_window_start(), tz=timezone.utc))
+
+
+def async_condition(etag_func=None, last_modified_func=None):
+    """
+    Conditional retrieval for async view methods, like Django's condition
+    decorator, but with coroutine functions for the ETag and Last-Modified, so
+    they can use the async ORM and cache API.
+
+    Args:
+        etag_func (callable): Coroutine function returning the ETag, or None if the resource does not exist.
+        last_modified_func (callable): Coroutine function returning the time of the last change, or None.
+
+    Returns:
+        callable: The decorator for the async view method.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        async def wrapper(view, request, *args, **kwargs):
+            etag = await etag_func(request, *args, **kwargs) if etag_func else None
+            etag = quote_etag(etag) if etag is not None else None
+            last_modified = await last_modified_func(request, *args, **kwargs) if last_modified_func else None
+            last_modified = int(last_modified.timestamp()) if last_modified else None
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = await method(view, request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD'):
+                if last_modified and not response.has_header('Last-Modified'):
+                    response.headers['Last-Modified'] = http_date(last_modified)
+                if etag:
+                    response.headers.setdefault('ETag', etag)
+            return response
+        return wrapper
+    return decorator
+
+
+catalog_condition = method_decorator(condition(etag_func=catalog_etag, last_modified_func=catalog_last_modified))
+async_catalog_condition = async_condition(etag_func=acatalog_etag, last_modified_func=acatalog_last_modified)
+
+
+class AsyncReadView(View):
+    """
+    Base class of the async read views of the catalog.
+
+    DRF views are sync, so under ASGI every request holds a thread of the
+    thread-sensitive adapter. These views run on the event loop and use the
+    async ORM and cache API, so one worker serves many concurrent requests
+    while they wait for the database or Redis. Their handlers return DRF
+    Responses, which are rendered as JSON. They only serve public reads;
+    writes stay on DRF views, see read_write_view. The throttles of DRF
+    (throttle_classes, by default DEFAULT_THROTTLE_CLASSES) are checked like
+    in a DRF view, authenticating the request with the default
+    authentication classes if a throttle needs the user.
+    """
+    http_method_names = ['get', 'head']
+    throttle_classes = None
+
+    def get_throttles(self):
+        """
+        Returns the throttle instances of the view.
+        """
+        classes = api_settings.DEFAULT_THROTTLE_CLASSES if self.throttle_classes is None else self.throttle_classes
+        return [throttle() for throttle in classes]
+
+    def check_throttles(self, request, throttles):
+        """
+        Checks the throttles of the view like DRF's APIView.check_throttles.
+
+        Args:
+            request (HttpRequest): The request.
+            throttles (list): The throttle instances, see get_throttles.
+
+        Returns:
+            Response or None: A 429 response with Retry-After if a throttle rejects the request.
+        """
+        drf_request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+        waits = [throttle.wait() for throttle in throttles if not throttle.allow_request(drf_request, self)]
+        if not waits:
+            return None
+        wait = max((value for value in waits if value is not None), default=None)
+        headers = {'Retry-After': str(math.ceil(wait))} if wait is not None else None
+        return Response({'detail': Throttled(wait).detail}, status=status.HTTP_429_TOO_MANY_REQUESTS,
+                        headers=headers)
+
+    async def dispatch(self, request, *args, **kwargs):
+        """
+        Checks the throttles, calls the handler of the request method and sets
+        the JSON renderer on DRF Responses.
+        """
+        throttles = self.get_throttles()
+        response = await sync_to_async(self.check_throttles)(request, throttles) if throttles else None
+        if response is None:
+            response = await super().dispatch(request, *args, **kwargs)
+        if isinstance(response, Response) and not hasattr(response, 'accepted_renderer'):
+            response.accepted_renderer = JSONRenderer()
+            response.accepted_media_type = response.accepted_renderer.media_type
+            response.renderer_context = {'request': request, 'view': self}
+        return response
+
+
+def read_write_view(read_view, write_view):
+    """
+    Returns a view for a URL that serves GET and HEAD with an async read view
+    and every other method with a sync DRF view, which runs in a thread with
+    its own authentication, permissions and CSRF checks. Like DRF's views, the
+    returned view is exempt from the CSRF middleware; DRF enforces CSRF for
+    session-authenticated writes.
+
+    Args:
+        read_view (callable): The async view for reads, e.g. AsyncReadView.as_view().
+        write_view (callable): The DRF view for writes, e.g. APIView.as_view().
+
+    Returns:
+        callable: The async view.
+    """
+    write_view_async = sync_to_async(write_view)
+
+    async def view(request, *args, **kwargs):
+        if request.method in ('GET', 'HEAD'):
+            return await read_view(request, *args, **kwargs)
+        return await write_view_async(request, *args, **kwargs)
+
+    view.csrf_exempt = write_view.csrf_exempt
+    return view
+
+
+class RequestedFieldsMixin:
+    def get_serializer_context(self):
+        """
+        Adds the sparse fieldset requested with ?fields= to the serializer context.
+        """
+        context = super().get_serializer_context()
+        context['fields'] = get_requested_fields(self.request)
+        return context
+
+
+class VideoList(RequestedFieldsMixin, generics.ListCreateAPIView):
     permission_classes = [IsAdminOrReadOnly]
+    pagination_class = VideoCursorPagination
+
+    def get_queryset(self):
+        """
+        Returns the videos of the list as values() rows with only the columns
+        the requested fields need. Videos are created from model instances.
+        """
+        if self.request.method == 'POST':
+            return Video.objects.all()
+        fields = get_requested_fields(self.request)
+        return Video.objects.values(*VideoListSerializer.get_columns(fields))
 
+    def get_serializer_class(self):
+        """
+        Returns the serializer for creating a video on POST, otherwise the
+        lightweight list serializer.
+        """
+        if self.request.method == 'POST':
+            return VideoCreateSerializer
+        return VideoListSerializer
 
-class VideoDetail(generics.RetrieveUpdateDestroyAPIView):
+    @catalog_condition
+    @cached_catalog_response('video_list')
+    def get(self, request, *args, **kwargs):
+        """
+        Returns a page of the video list. Requests whose If-None-Match or
+        If-Modified-Since still match the catalog get a 304 status code
+        before any query or serialization runs; other pages are served from
+        the response cache of the current catalog version.
+        """
+        return super().get(request, *args, **kwargs)
+
+
+class VideoUpdate(generics.UpdateAPIView, generics.DestroyAPIView):
     queryset = Video.objects.all()
     serializer_class = VideoSerializer
 
-    def get(self, request, *args, **kwargs):
+
+class VideoDetail(AsyncReadView):
+    @async_condition(etag_func=video_etag, last_modified_func=video_last_modified)
+    @acached_catalog_response('video_detail')
+    async def get(self, request, pk):
         """
         If a resolution is provided in the query parameters, return the video URL for this
-        resolution. If the video does not exist in the given resolution, return a 404 status code.
+        resolution. The resolution 'auto' returns the URL of the HLS master playlist.
+        Resolutions above the source resolution are reported as unavailable with a 404 status code. If the video does not exist in the given resolution, return a 404 status code.
         If the resolution is invalid, return a 400 status code. If no resolution is provided, return
         the video object as JSON, serialized by the VideoSerializer.
+        The ETag and Last-Modified headers are derived from updated_at of the
+        video; a matching conditional request gets a 304 status code. Responses
+        are cached under the catalog version.
         """
-        video = self.get_object()
+        try:
+            video = await Video.objects.prefetch_related('renditions').aget(pk=pk)
+        except Video.DoesNotExist:
+            return Response({"error": "Video nicht gefunden."}, status=status.HTTP_404_NOT_FOUND)
         resolution = request.GET.get('resolution', None)
+        if resolution == 'auto':
+            if video.hls_playlist:
+                return Response({"video_url": sign_hls_url(video.hls_playlist.name)}, status=status.HTTP_200_OK)
+            return Response({"error": "Adaptiver Stream noch nicht verfügbar."},
+                            status=status.HTTP_404_NOT_FOUND)
         if resolution:
-            video_field = f"video_{resolution}"
-            if hasattr(video, video_field):
-                video_url = getattr(video, video_field).url if getattr(video, video_field) else None
-                if video_url:
-                    return Response({"video_url": video_url}, status=status.HTTP_200_OK)
-                return Response({"error": "Video in dieser Auflösung nicht verfügbar."},
+            if resolution not in dict(LADDER):
+                return Response({"error": "Ungültige Auflösung."}, status=status.HTTP_400_BAD_REQUEST)
+            if resolution not in video.get_available_resolutions():
+                return Response({"error": "Auflösung übersteigt die Quellauflösung."},
                                 status=status.HTTP_404_NOT_FOUND)
-            return Response({"error": "Ungültige Auflösung."}, status=status.HTTP_400_BAD_REQUEST)
-        serializer = self.get_serializer(video)
+            rendition = video.get_rendition(resolution)
+            if rendition and rendition.file:
+                return Response({"video_url": sign_media_url(rendition.file.name)}, status=status.HTTP_200_OK)
+            return Response({"error": "Video in dieser Auflösung nicht verfügbar."},
+                            status=status.HTTP_404_NOT_FOUND)
+        serializer = VideoSerializer(video, context={'request': request, 'fields': get_requested_fields(request)})
         return Response(serializer.data)
 
 
-class VideoThumbnail(APIView):
-    def get(self, request, pk, *args, **kwargs):
+class VideoSearch(RequestedFieldsMixin, generics.ListAPIView):
+    serializer_class = VideoListSerializer
+    pagination_class = VideoSearchPagination
+
+    def list(self, request, *args, **kwargs):
+        """
+        Searches the titles and descriptions of the videos with the term of the
+        'q' query parameter (web search syntax, e.g. quoted phrases and -word).
+
+        The results are ranked with title matches above description matches and
+        returned in pages, as cards of the video list. If the term is missing,
+        a 400 status code is returned.
+        """
+        if not request.query_params.get('q', '').strip():
+            return Response({"error": "Suchbegriff fehlt."}, status=status.HTTP_400_BAD_REQUEST)
+        return super().list(request, *args, **kwargs)
+
+    def get_queryset(self):
+        """
+        Returns the matching videos, best match first, as values() rows for the
+        list serializer. The stored search vector is matched via its GIN index.
+        """
+        query = SearchQuery(self.request.query_params['q'].strip(), search_type='websearch',
+                            config=get_search_config())
+        columns = VideoListSerializer.get_columns(get_requested_fields(self.request))
+        return Video.objects.filter(search_vector=query) \
+            .annotate(rank=SearchRank(F('search_vector'), query)) \
+            .order_by('-rank', '-created_at', '-id') \
+            .values(*columns)
+
+
+class VideoAutocomplete(APIView):
+    def get(self, request):
+        """
+        Returns title suggestions for the beginning of a search term in the 'q'
+        query parameter.
+
+        Titles are matched by trigram word similarity, so typos and incomplete
+        words still find the title. The similarity threshold is lowered to
+        AUTOCOMPLETE_THRESHOLD for the query, so the trigram index still serves
+        the match. At most AUTOCOMPLETE_LIMIT suggestions are returned, most
+        similar first; terms shorter than 2 characters return none.
+        """
+        term = request.query_params.get('q', '').strip()
+        if len(term) < 2:
+            return Response([])
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("SET LOCAL pg_trgm.word_similarity_threshold = %s", [AUTOCOMPLETE_THRESHOLD])
+            suggestions = list(Video.objects.filter(title__trigram_word_similar=term)
+                               .annotate(similarity=TrigramWordSimilarity(term, 'title'))
+                               .order_by('-similarity', 'title')
+                               .values('id', 'title')[:AUTOCOMPLETE_LIMIT])
+        return Response(suggestions)
+
+
+class VideoThumbnail(AsyncReadView):
+    async def get(self, request, pk, *args, **kwargs):
         """
         Returns the thumbnail URL for a given video id.
 
         If the video does not exist, a 404 status code is returned with the error message "Video nicht gefunden.".
+        If the thumbnail of an uploaded video is still being generated, a 202 status code is returned with the
+        status "pending"; if its thumbnail job has failed, a 404 status code is returned with the status "failed".
         If the video does not have a thumbnail associated with it, a 404 status code is returned with the error message "Thumbnail nicht verfügbar.".
         If the thumbnail is successfully retrieved, a 200 status code is returned with the thumbnail URL as JSON data.
         """
         try:
-            video = Video.objects.get(pk=pk)
+            video = await Video.objects.only('thumbnail', 'video_file') \
+                .annotate(thumbnail_job_status=get_thumbnail_job_status()).aget(pk=pk)
             if video.thumbnail:
                 return Response({
                     "thumbnail_url": video.thumbnail.url
                 }, status=status.HTTP_200_OK)
+            if video.video_file and video.thumbnail_job_status == TranscodeJob.STATUS_FAILED:
+                return Response({"status": "failed", "error": "Thumbnail konnte nicht erstellt werden."},
+                                status=status.HTTP_404_NOT_FOUND)
+            if video.video_file:
+                return Response({"status": "pending"}, status=status.HTTP_202_ACCEPTED)
             return Response({"error": "Thumbnail nicht verfügbar."}, status=status.HTTP_404_NOT_FOUND)
 
         except Video.DoesNotExist:
             return Response({"error": "Video nicht gefunden."}, status=status.HTTP_404_NOT_FOUND)
 
 
-class GenreGroupedVideosView(APIView):
+class VideoThumbnailBatch(APIView):
     def get(self, request):
+        """
+        Returns the thumbnail URLs and basic metadata of several videos at once.
+
+        Expects the video ids as comma-separated 'ids' query parameter, at most
+        MAX_BATCH_IDS. The videos are returned in the requested order; ids of
+        videos that do not exist are listed under 'missing'. The data of every
+        video is cached per id; all cached ids are read with one get_many and
+        the rest are loaded with one query and written with one set_many.
+        If the ids are missing, invalid or too many, a 400 status code is returned.
+        """
+        try:
+            ids = list(dict.fromkeys(int(value) for value in request.query_params.get('ids', '').split(',') if value))
+        except ValueError:
+            return Response({"error": "Ungültige Video-IDs."}, status=status.HTTP_400_BAD_REQUEST)
+        if not ids or len(ids) > MAX_BATCH_IDS:
+            return Response({"error": f"Es werden 1 bis {MAX_BATCH_IDS} Video-IDs erwartet."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        cards = get_video_cards(ids)
+        return Response({
+            'videos': [cards[video_id] for video_id in ids if video_id in cards],
+            'missing': [video_id for video_id in ids if video_id not in cards],
+        })
+
+
+def get_video_cards(ids):
+    """
+    Returns the card data of the given videos, cache-aside per id. Cards of
+    videos whose thumbnail is still pending are not cached, as the thumbnail
+    job does not invalidate them when it fails.
+
+    Args:
+        ids (list): The video ids.
+
+    Returns:
+        dict: Mapping of video id to its card data; ids of missing videos are left out.
+    """
+    keys = {get_video_card_key(video_id): video_id for video_id in ids}
+    cards = {keys[key]: card for key, card in cache.get_many(list(keys)).items()}
+    missing = [video_id for video_id in ids if video_id not in cards]
+    if missing:
+        loaded = {
+            video['id']: get_video_card(video)
+            for video in Video.objects.filter(id__in=missing).annotate(
+                thumbnail_job_status=get_thumbnail_job_status()).values(
+                'id', 'title', 'description', 'genre', 'duration', 'thumbnail', 'video_file', 'thumbnail_job_status')}
+        cache.set_many({get_video_card_key(video_id): card for video_id, card in loaded.items()
+                        if card['thumbnail_status'] != 'pending'}, VIDEO_CARD_TIMEOUT)
+        cards.update(loaded)
+    return cards
+
+
+def get_thumbnail_job_status():
+    """
+    Returns a subquery of the status of the latest thumbnail job of a video,
+    to annotate videos with.
+
+    Returns:
+        Subquery: The status, None if the video has no thumbnail job.
+    """
+    return Subquery(TranscodeJob.objects.filter(video=OuterRef('pk'), stage=TranscodeJob.STAGE_THUMBNAIL)
+                    .order_by('-queued_at', '-id').values('status')[:1])
+
+
+def get_video_card(video):
+    """
+    Returns the card data of a video loaded with values(). The thumbnail
+    status follows VideoThumbnail: 'pending' while an uploaded video has no
+    thumbnail yet, 'failed' once its latest thumbnail job has failed,
+    'missing' without video file.
+
+    Args:
+        video (dict): The video row, annotated with thumbnail_job_status.
+
+    Returns:
+        dict: id, title, description, genre, duration, thumbnail_url and thumbnail_status.
+    """
+    thumbnail = video['thumbnail']
+    if thumbnail:
+        thumbnail_status = 'ready'
+    elif not video['video_file']:
+        thumbnail_status = 'missing'
+    elif video['thumbnail_job_status'] == TranscodeJob.STATUS_FAILED:
+        thumbnail_status = 'failed'
+    else:
+        thumbnail_status = 'pending'
+    return {
+        'id': video['id'],
+        'title': video['title'],
+        'description': video['description'],
+        'genre': video['genre'],
+        'duration': video['duration'],
+        'thumbnail_url': Video._meta.get_field('thumbnail').storage.url(thumbnail) if thumbnail else None,
+        'thumbnail_status': thumbnail_status,
+    }
+
+
+class VideoProgress(APIView):
+    def get(self, request, pk):
+        """
+        Returns the state of the transcode pipeline of a video.
+
+        Every job (probe, thumbnail, one per rendition, packaging) is listed with its
+        status, attempts, timings and error. Running jobs include their live progress
+        from the cache. The overall status is 'failed' if any job failed, otherwise
+        'running' or 'queued' while jobs are pending, and 'done' when all are finished.
+        If the video does not exist, a 404 status code is returned.
+        """
+        video = get_object_or_404(Video, pk=pk)
+        jobs = list(video.jobs.select_related('rendition'))
+        serializer = TranscodeJobSerializer(jobs, many=True, context={'progress': get_progress(jobs)})
+        return Response({
+            'video_id': video.id,
+            'status': get_pipeline_status(jobs),
+            'jobs': serializer.data,
+        })
+
+
+def get_pipeline_status(jobs):
+    """
+    Returns the overall status of the given transcode jobs of a video.
+
+    Args:
+        jobs (list): The TranscodeJob instances of the video.
+
+    Returns:
+        str: 'failed', 'running', 'queued' or 'done'.
+    """
+    statuses = {job.status for job in jobs}
+    for job_status in (TranscodeJob.STATUS_FAILED, TranscodeJob.STATUS_RUNNING, TranscodeJob.STATUS_QUEUED):
+        if job_status in statuses:
+            return job_status
+    return TranscodeJob.STATUS_DONE
+
+
+class GenreGroupedVideosView(AsyncReadView):
+    @async_catalog_condition
+    @acached_catalog_response('genre_rows')
+    async def get(self, request):
         """
         Returns a list of objects containing the genre name and a list of up to 6 movies in that genre.
         The first object in the list is a special 'New on Videoflix' group, which contains the latest 6 movies.
         The rest of the objects are grouped by genre, and contain up to 6 movies in that genre.
+
+        The rows are cached under the current catalog version, which is bumped
+        whenever a video is saved or deleted. The ETag is built from the same
+        version, so a client with current rows gets a 304 status code.
         """
-        genres = Video.objects.values_list('genre', flat=True).distinct()
-        result = []
-        latest_videos = Video.objects.order_by('-created_at')[:6]
-        serialized_latest = VideoThumbnailSerializer(latest_videos, many=True)
-        result.append({
-            'name': 'New on Videoflix',
-            'movies': [{'thumbnailUrl': vid['thumbnail'], 'title': vid['title'], 'description': vid['description']} for vid in serialized_latest.data]
-        })
-        for genre in genres:
-            videos = Video.objects.filter(genre=genre).order_by('-created_at')
-            serialized = VideoThumbnailSerializer(videos, many=True)
-            result.append({
-                'name': genre.title(),
-                'movies': [{'thumbnailUrl': vid['thumbnail'], 'title': vid['title'], 'description': vid['description']} for vid in serialized.data]
-            })
-        return Response(result)
+        return Response(await get_genre_rows())
 
 
-class BigThumbnailView(APIView):
-    def get(self, request):
+async def get_genre_rows():
+    """
+    Builds the genre rows of the home page with a single query.
+
+    A window function numbers the videos of every genre from newest to oldest,
+    so only the newest GENRE_ROW_SIZE videos per genre and only the displayed
+    columns are loaded. The latest videos overall are always among them, so the
+    'New on Videoflix' row is taken from the same result.
+
+    Returns:
+        list: The 'New on Videoflix' row followed by one row per genre, each a dict with 'name' and 'movies'.
+    """
+    ordering = [F('created_at').desc(), F('id').desc()]
+    videos = [video async for video in
+              Video.objects.annotate(row=Window(RowNumber(), partition_by=[F('genre')], order_by=ordering))
+              .filter(row__lte=GENRE_ROW_SIZE)
+              .order_by('genre', 'row')
+              .values('id', 'genre', 'created_at', 'thumbnail', 'title', 'description')]
+    latest = sorted(videos, key=lambda video: (video['created_at'], video['id']), reverse=True)[:GENRE_ROW_SIZE]
+    result = [{'name': 'New on Videoflix', 'movies': [get_movie(video) for video in latest]}]
+    genres = {}
+    for video in videos:
+        genres.setdefault(video['genre'], []).append(get_movie(video))
+    result += [{'name': genre.title(), 'movies': movies} for genre, movies in genres.items()]
+    return result
+
+
+def get_movie(video):
+    """
+    Returns the movie entry of a genre row for a video loaded with values().
+
+    Args:
+        video (dict): The video with 'thumbnail', 'title' and 'description'.
+
+    Returns:
+        dict: The movie with 'thumbnailUrl', 'title' and 'description'.
+    """
+    thumbnail = video['thumbnail']
+    return {
+        'thumbnailUrl': Video._meta.get_field('thumbnail').storage.url(thumbnail) if thumbnail else None,
+        'title': video['title'],
+        'description': video['description'],
+    }
+
+
+class BigThumbnailView(AsyncReadView):
+    @async_catalog_condition
+    @acached_catalog_response('big_thumbnail')
+    async def get(self, request):
         """
         Returns the latest video's big thumbnail and title.
 
         Returns a JSON object with 'thumbnailUrl' and 'title' keys.
 
         If no videos are available, returns a 404 response with a message.
+        Conditional requests and the response cache use the catalog version, see GenreGroupedVideosView.
         """
-        latest_video = Video.objects.order_by('-created_at').first()
+        latest_video = await Video.objects.order_by('-created_at').afirst()
 
         if latest_video:
             serialized_video = VideoBigThumbnailSerializer(latest_video)
             return Response(serialized_video.data)
         else:
             return Response({'message': 'No videos available'}, status=404)
+
+
+class UploadSessionCreate(APIView):
+    permission_classes = [IsAdminOrReadOnly]
+
+    def post(self, request):
+        """
+        Starts a resumable upload.
+
+        Expects the metadata of the video (title, description, genre) together with
+        the file name and the total size in bytes. Returns the upload session with a
+        201 status code; its URL is sent in the Location header. The file itself is
+        sent in chunks with PATCH requests to that URL.
+        """
+        serializer = UploadSessionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = serializer.save()
+        location = reverse('upload-detail', args=[upload.id], request=request)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers={'Location': location})
+
+
+class UploadSessionDetail(APIView):
+    permission_classes = [IsAdminOrReadOnly]
+
+    def get(self, request, pk):
+        """
+        Returns the upload session; the offset tells the client where to resume.
+        """
+        upload = get_object_or_404(UploadSession, pk=pk)
+        return upload_response(upload)
+
+    def head(self, request, pk):
+        """
+        Returns the offset of the upload session in the Upload-Offset header only.
+        """
+        upload = get_object_or_404(UploadSession, pk=pk)
+        return Response(headers=upload_headers(upload))
+
+    def patch(self, request, pk):
+        """
+        Appends a chunk to the upload.
+
+        The raw request body is the chunk, the Upload-Offset header has to match the
+        current offset of the upload, otherwise a 409 status code is returned. An
+        optional Upload-Checksum header ('sha256 <base64 digest>') is verified against
+        the chunk; on a mismatch the chunk is discarded and a 460 status code is
+        returned. Once the last byte has arrived the video is created and its
+        conversion enqueued.
+        """
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.headers.get('Content-Length') or 0)
+            digest = parse_upload_checksum(request.headers.get('Upload-Checksum'))
+        except (KeyError, ValueError):
+            return Response({"error": "Ungültige Upload-Header."}, status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            upload = get_object_or_404(UploadSession.objects.select_for_update(), pk=pk)
+            if upload.is_complete or offset != upload.offset:
+                return Response({"error": "Offset stimmt nicht überein.", "offset": upload.offset},
+                                status=status.HTTP_409_CONFLICT, headers=upload_headers(upload))
+            if offset + length > upload.size:
+                return Response({"error": "Chunk überschreitet die Dateigröße."},
+                                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+            if not upload.append(request.stream, length, digest):
+                return Response({"error": "Prüfsumme stimmt nicht überein."}, status=460,
+                                headers=upload_headers(upload))
+            upload.save(update_fields=['offset', 'checksum', 'updated_at'])
+            if upload.is_complete:
+                upload.complete()
+        return upload_response(upload)
+
+    def delete(self, request, pk):
+        """
+        Aborts an unfinished upload and removes its staging file.
+        """
+        upload = get_object_or_404(UploadSession, pk=pk, video__isnull=True)
+        if os.path.isfile(upload.staging_path):
+            os.remove(upload.staging_path)
+        upload.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+def parse_upload_checksum(header):
+    """
+    Parses an Upload-Checksum header of the form 'sha256 <base64 digest>'.
+
+    Args:
+        header (str or None): The value of the header.
+
+    Returns:
+        bytes or None: The SHA-256 digest, or None if no header was sent.
+
+    Raises:
+        ValueError: If the header is malformed or uses another algorithm.
+    """
+    if not header:
+        return None
+    algorithm, _, encoded = header.partition(' ')
+    if algorithm != 'sha256':
+        raise ValueError(algorithm)
+    try:
+        return base64.b64decode(encoded, validate=True)
+    except binascii.Error as e:
+        raise ValueError(encoded) from e
+
+
+def upload_headers(upload):
+    """
+    Returns the headers that describe the progress of an upload session.
+    """
+    return {'Upload-Offset': str(upload.offset), 'Upload-Length': str(upload.size), 'Cache-Control': 'no-store'}
+
+
+def upload_response(upload):
+    """
+    Returns the serialized upload session with its progress headers.
+    """
+    return Response(UploadSessionSerializer(upload).data, headers=upload_headers(upload))
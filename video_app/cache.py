@@ -0,0 +1,344 @@
+import asyncio
+import functools
+import hashlib
+import time
+from datetime import datetime, timezone
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+from .signing import get_url_expiry
+
+
+CATALOG_VERSION_KEY = 'catalog_version'
+CATALOG_MODIFIED_KEY = 'catalog_modified'
+CACHE_TTL = getattr(settings, 'CACHE_TTL', 15 * 60)
+STALE_GRACE = 60 * 60
+LOCK_TIMEOUT = 30
+LOCK_WAIT = 5
+LOCK_POLL_INTERVAL = 0.05
+
+
+def get_catalog_version():
+    """
+    Returns the current version of the video catalog.
+
+    Cached data derived from the catalog is stored under keys that contain the
+    version, so bumping the version invalidates all of it at once. If the
+    version key is missing (e.g. after an eviction), it is seeded with the
+    current time, so it never falls back to a version that is still cached.
+
+    Returns
+    -------
+    int
+        The catalog version.
+    """
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+async def aget_catalog_version():
+    """
+    Async version of get_catalog_version.
+
+    Returns
+    -------
+    int
+        The catalog version.
+    """
+    version = await cache.aget(CATALOG_VERSION_KEY)
+    if version is None:
+        await cache.aadd(CATALOG_VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = await cache.aget(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    """
+    Increments the catalog version, which invalidates all cached catalog data.
+
+    Returns
+    -------
+    None
+    """
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        get_catalog_version()
+    cache.set(CATALOG_MODIFIED_KEY, time.time(), timeout=None)
+
+
+def get_catalog_modified():
+    """
+    Returns the time the catalog version was last bumped.
+
+    Returns
+    -------
+    datetime or None
+        The time of the last change (UTC), None if it is not known.
+    """
+    modified = cache.get(CATALOG_MODIFIED_KEY)
+    return datetime.fromtimestamp(modified, tz=timezone.utc) if modified is not None else None
+
+
+async def aget_catalog_modified():
+    """
+    Async version of get_catalog_modified.
+
+    Returns
+    -------
+    datetime or None
+        The time of the last change (UTC), None if it is not known.
+    """
+    modified = await cache.aget(CATALOG_MODIFIED_KEY)
+    return datetime.fromtimestamp(modified, tz=timezone.utc) if modified is not None else None
+
+
+def get_catalog_key(name):
+    """
+    Returns the cache key of catalog data for the current catalog version.
+
+    Parameters
+    ----------
+    name : str
+        The name of the cached data, e.g. 'genre_rows'.
+
+    Returns
+    -------
+    str
+        The versioned cache key.
+    """
+    return f"{name}:v{get_catalog_version()}"
+
+
+async def aget_catalog_key(name):
+    """
+    Async version of get_catalog_key.
+
+    Parameters
+    ----------
+    name : str
+        The name of the cached data, e.g. 'genre_rows'.
+
+    Returns
+    -------
+    str
+        The versioned cache key.
+    """
+    return f"{name}:v{await aget_catalog_version()}"
+
+
+def get_video_card_key(video_id):
+    """
+    Returns the cache key of the card data (thumbnail and metadata) of a video.
+
+    Parameters
+    ----------
+    video_id : int
+        The id of the video.
+
+    Returns
+    -------
+    str
+        The cache key.
+    """
+    return f"video_card:{video_id}"
+
+
+def invalidate_video_card(video_id):
+    """
+    Deletes the cached card data of a video.
+
+    Parameters
+    ----------
+    video_id : int
+        The id of the video.
+
+    Returns
+    -------
+    None
+    """
+    cache.delete(get_video_card_key(video_id))
+
+
+def get_or_compute(key, compute, timeout=CACHE_TTL):
+    """
+    Returns the cached value of a key, computing it on a miss with a guard
+    against cache stampedes.
+
+    Values are stored with a soft expiry of timeout seconds and kept for
+    STALE_GRACE seconds longer. Only the request that acquires the lock of the
+    key recomputes it: after the soft expiry, the others keep getting the
+    previous value meanwhile; on a miss, they wait up to LOCK_WAIT seconds for
+    the value. Keys from get_catalog_key change with the catalog version, so a
+    value served after its soft expiry is still current.
+
+    Parameters
+    ----------
+    key : str
+        The cache key.
+    compute : callable
+        Called without arguments to compute the value.
+    timeout : int, optional
+        The soft expiry in seconds. Defaults to CACHE_TTL.
+
+    Returns
+    -------
+    object
+        The cached or computed value.
+    """
+    entry = cache.get(key)
+    if entry is not None and entry['expires'] > time.time():
+        return entry['value']
+    lock_key = f"{key}:lock"
+    if not cache.add(lock_key, 1, LOCK_TIMEOUT):
+        if entry is not None:
+            return entry['value']
+        deadline = time.monotonic() + LOCK_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL_INTERVAL)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry['value']
+        return compute()
+    try:
+        value = compute()
+        cache.set(key, {'value': value, 'expires': time.time() + timeout}, timeout + STALE_GRACE)
+        return value
+    finally:
+        cache.delete(lock_key)
+
+
+async def aget_or_compute(key, compute, timeout=CACHE_TTL):
+    """
+    Async version of get_or_compute; waiting for the lock of another request
+    does not block the event loop.
+
+    Parameters
+    ----------
+    key : str
+        The cache key.
+    compute : callable
+        Coroutine function called without arguments to compute the value.
+    timeout : int, optional
+        The soft expiry in seconds. Defaults to CACHE_TTL.
+
+    Returns
+    -------
+    object
+        The cached or computed value.
+    """
+    entry = await cache.aget(key)
+    if entry is not None and entry['expires'] > time.time():
+        return entry['value']
+    lock_key = f"{key}:lock"
+    if not await cache.aadd(lock_key, 1, LOCK_TIMEOUT):
+        if entry is not None:
+            return entry['value']
+        deadline = time.monotonic() + LOCK_WAIT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+            entry = await cache.aget(key)
+            if entry is not None:
+                return entry['value']
+        return await compute()
+    try:
+        value = await compute()
+        await cache.aset(key, {'value': value, 'expires': time.time() + timeout}, timeout + STALE_GRACE)
+        return value
+    finally:
+        await cache.adelete(lock_key)
+
+
+def get_response_key(name, request):
+    """
+    Returns the unversioned cache key of the response to a request, see cached_catalog_response.
+
+    Parameters
+    ----------
+    name : str
+        The name of the cached responses, e.g. 'video_list'.
+    request : HttpRequest
+        The request.
+
+    Returns
+    -------
+    str
+        The cache key, without the catalog version.
+    """
+    representation = f"{get_url_expiry()}:{request.get_host()}:{request.get_full_path()}:" \
+                     f"{request.META.get('HTTP_ACCEPT', '')}"
+    return f"response:{name}:{hashlib.sha256(representation.encode()).hexdigest()}"
+
+
+def cached_catalog_response(name, timeout=CACHE_TTL):
+    """
+    Caches the responses of a DRF view method under the catalog version.
+
+    The key is built from the catalog version, the given name, the host, the
+    path with its query string and the Accept header, so every representation
+    is cached on its own and a catalog change (see bump_catalog_version)
+    invalidates all of them at once. The expiry of signed media URLs is part of
+    the key as well, so cached responses never hand out URLs of an old window.
+    Exceptions raised by the view (e.g. Http404) are not cached. Computation is
+    guarded against stampedes, see get_or_compute.
+
+    Parameters
+    ----------
+    name : str
+        The name of the cached responses, e.g. 'video_list'.
+    timeout : int, optional
+        The soft expiry in seconds. Defaults to CACHE_TTL.
+
+    Returns
+    -------
+    callable
+        The decorator for the view method.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            key = get_catalog_key(get_response_key(name, request))
+
+            def compute():
+                response = method(view, request, *args, **kwargs)
+                return {'status': response.status_code, 'data': response.data}
+
+            cached = get_or_compute(key, compute, timeout)
+            return Response(cached['data'], status=cached['status'])
+        return wrapper
+    return decorator
+
+
+def acached_catalog_response(name, timeout=CACHE_TTL):
+    """
+    Async version of cached_catalog_response for the async views of the
+    catalog, whose methods return DRF Responses.
+
+    Parameters
+    ----------
+    name : str
+        The name of the cached responses, e.g. 'genre_rows'.
+    timeout : int, optional
+        The soft expiry in seconds. Defaults to CACHE_TTL.
+
+    Returns
+    -------
+    callable
+        The decorator for the async view method.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        async def wrapper(view, request, *args, **kwargs):
+            key = await aget_catalog_key(get_response_key(name, request))
+
+            async def compute():
+                response = await method(view, request, *args, **kwargs)
+                return {'status': response.status_code, 'data': response.data}
+
+            cached = await aget_or_compute(key, compute, timeout)
+            return Response(cached['data'], status=cached['status'])
+        return wrapper
+    return decorator
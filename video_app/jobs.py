@@ -0,0 +1,179 @@
+import functools
+import logging
+import time
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+from rq import get_current_job
+from .models import TranscodeJob
+
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_INTERVAL = getattr(settings, 'TRANSCODE_PROGRESS_INTERVAL', 2)
+PROGRESS_TIMEOUT = 24 * 60 * 60
+
+
+class TranscodeError(Exception):
+    """
+    Raised by a pipeline job whose FFmpeg run failed, so RQ retries the job
+    and its TranscodeJob rows are marked as failed.
+    """
+
+
+def enqueue_tracked(queue, func, video_id, *args, stage, renditions=(), chunk=None, **kwargs):
+    """
+    Enqueues a pipeline job and records its state as TranscodeJob rows.
+
+    A job that converts several renditions at once gets one row per rendition.
+    The rows are created before the job is enqueued, under the RQ job id the
+    job is enqueued with, so a fast worker always finds them.
+
+    Parameters
+    ----------
+    queue : rq.Queue
+        The queue to enqueue the job on.
+    func : callable
+        The job function; it is called with video_id and args.
+    video_id : int
+        The id of the video the job belongs to.
+    stage : str
+        The pipeline stage of the job, one of TranscodeJob.STAGE_CHOICES.
+    renditions : iterable, optional
+        The VideoRendition instances the job produces.
+    chunk : int, optional
+        The index of the source chunk the job encodes in chunked mode.
+    **kwargs
+        Additional keyword arguments passed to queue.enqueue.
+
+    Returns
+    -------
+    rq.job.Job
+        The enqueued job.
+    """
+    job_id = str(uuid.uuid4())
+    rows = [TranscodeJob(video_id=video_id, rendition=rendition, stage=stage, chunk=chunk, queue=queue.name,
+                         rq_job_id=job_id)
+            for rendition in renditions]
+    TranscodeJob.objects.bulk_create(rows or [
+        TranscodeJob(video_id=video_id, stage=stage, chunk=chunk, queue=queue.name, rq_job_id=job_id)])
+    return queue.enqueue(func, video_id, *args, job_id=job_id, **kwargs)
+
+
+def get_current_rows():
+    """
+    Returns the TranscodeJob rows of the RQ job that is currently running.
+
+    Returns
+    -------
+    QuerySet
+        The rows, empty if the code does not run inside an RQ job.
+    """
+    rq_job = get_current_job()
+    if not rq_job:
+        return TranscodeJob.objects.none()
+    return TranscodeJob.objects.filter(rq_job_id=rq_job.id)
+
+
+def has_retries_left():
+    """
+    Returns whether RQ retries the currently running job if it fails.
+
+    Returns
+    -------
+    bool
+        True if the job has retries left, False outside an RQ job.
+    """
+    rq_job = get_current_job()
+    return bool(rq_job and rq_job.retries_left)
+
+
+def tracked_job(func):
+    """
+    Decorates a pipeline job function so its TranscodeJob rows follow its state.
+
+    The rows are set to running with an increased attempt count when the job
+    starts and to done when it returns. If the job raises, the rows are set
+    back to queued while RQ has retries left, otherwise to failed with the
+    error message; the exception is re-raised for RQ.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        rows = get_current_rows()
+        rows.update(status=TranscodeJob.STATUS_RUNNING, started_at=timezone.now(), finished_at=None,
+                    attempts=F('attempts') + 1, error='')
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            retrying = has_retries_left()
+            rows.update(status=TranscodeJob.STATUS_QUEUED if retrying else TranscodeJob.STATUS_FAILED,
+                        finished_at=timezone.now(), error=str(e)[:2000])
+            logger.error(f"Job {func.__name__} fehlgeschlagen: {e}")
+            raise
+        finally:
+            cache.delete_many([get_progress_key(pk) for pk in rows.values_list('pk', flat=True)])
+        rows.update(status=TranscodeJob.STATUS_DONE, finished_at=timezone.now())
+        return result
+    return wrapper
+
+
+def get_progress_key(job_pk):
+    """
+    Returns the cache key of the live progress of a TranscodeJob row.
+    """
+    return f"transcode_progress:{job_pk}"
+
+
+class ProgressReporter:
+    """
+    Writes the progress of the running FFmpeg job to the cache (Redis).
+
+    Called with the encoded seconds of the source, it stores the progress in
+    percent for every TranscodeJob row of the current RQ job with a single
+    set_many. Writes are throttled to one per PROGRESS_INTERVAL seconds.
+    """
+
+    def __init__(self, duration):
+        """
+        Initializes the reporter for a source of the given duration.
+
+        :param duration: The duration of the source in seconds, None if unknown.
+        """
+        self.duration = duration
+        self.keys = [get_progress_key(pk) for pk in get_current_rows().values_list('pk', flat=True)]
+        self.last_write = 0
+
+    def __call__(self, seconds):
+        """
+        Stores the progress if the throttle interval has passed.
+
+        :param seconds: The encoded seconds of the source.
+        """
+        now = time.monotonic()
+        if not self.keys or now - self.last_write < PROGRESS_INTERVAL:
+            return
+        self.last_write = now
+        percent = min(round(seconds / self.duration * 100, 1), 100.0) if self.duration else None
+        cache.set_many({key: {'seconds': round(seconds, 1), 'percent': percent} for key in self.keys},
+                       timeout=PROGRESS_TIMEOUT)
+
+
+def get_progress(jobs):
+    """
+    Reads the live progress of the given TranscodeJob rows with a single cache call.
+
+    Parameters
+    ----------
+    jobs : iterable
+        The TranscodeJob instances.
+
+    Returns
+    -------
+    dict
+        Mapping of job primary key to its progress ({'seconds', 'percent'}); jobs
+        without a stored progress are left out.
+    """
+    keys = {get_progress_key(job.pk): job.pk for job in jobs}
+    return {keys[key]: value for key, value in cache.get_many(list(keys)).items()}
@@ -0,0 +1,213 @@
+import mimetypes
+import os
+import re
+import time
+from urllib.parse import quote
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+from django.views.static import was_modified_since
+from .signing import verify_media_signature
+
+
+PRIVATE_MEDIA_DIRS = ('uploads', os.path.join('videos', 'chunks'))
+SIGNED_MEDIA_DIRS = ('videos',)
+
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class FileRange:
+    """
+    File-like view of a byte range of an open file.
+
+    Reads stop at the end of the range. fileno() exposes the underlying file,
+    which is positioned at the start of the range, so a WSGI server with a
+    sendfile-capable wsgi.file_wrapper (e.g. gunicorn) sends the range with
+    os.sendfile, bounded by the Content-Length header.
+    """
+
+    def __init__(self, file, start, length):
+        """
+        Positions the file at the start of the range.
+
+        :param file: The open file.
+        :param start: The first byte of the range.
+        :param length: The number of bytes of the range.
+        """
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        """
+        Reads up to size bytes, but not beyond the end of the range.
+        """
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        """
+        Returns the file descriptor of the underlying file.
+        """
+        return self.file.fileno()
+
+    def close(self):
+        """
+        Closes the underlying file.
+        """
+        self.file.close()
+
+
+def get_media_path(path):
+    """
+    Resolves a media path to a file below MEDIA_ROOT that may be delivered.
+
+    :param path: The path relative to MEDIA_URL.
+    :return: The absolute path of the file.
+    :raises Http404: If the path leaves MEDIA_ROOT, points into a private
+        directory (staging files of uploads, chunks of conversions) or is not a file.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except Exception:
+        raise Http404("Datei nicht gefunden.")
+    relative_path = os.path.relpath(full_path, os.path.abspath(settings.MEDIA_ROOT))
+    if any(relative_path == directory or relative_path.startswith(directory + os.sep)
+           for directory in PRIVATE_MEDIA_DIRS):
+        raise Http404("Datei nicht gefunden.")
+    if not os.path.isfile(full_path):
+        raise Http404("Datei nicht gefunden.")
+    return full_path
+
+
+def is_signed_path(path):
+    """
+    Checks whether a media path lies in a directory that is only delivered with a signed URL.
+
+    :param path: The path relative to MEDIA_URL.
+    :return: True if the path needs a signature.
+    """
+    path = os.path.normpath(path).lstrip(os.sep)
+    return any(path == directory or path.startswith(directory + os.sep) for directory in SIGNED_MEDIA_DIRS)
+
+
+def parse_range(header, size):
+    """
+    Parses a single byte range of a Range header.
+
+    :param header: The value of the Range header.
+    :param size: The size of the file in bytes.
+    :return: The (start, end) tuple with inclusive end, None if the header is
+        missing or not a single byte range (the whole file is sent), or False
+        if the range can't be satisfied.
+    """
+    match = RANGE_PATTERN.match(header.strip()) if header else None
+    if not match or match.groups() == ('', ''):
+        return None
+    start, end = match.groups()
+    if not start:
+        length = int(end)
+        if not length:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or end < start:
+        return False
+    return start, end
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Delivers a public file below MEDIA_ROOT, e.g. a thumbnail. Videos are only
+    delivered with a signed URL (see serve_signed_media).
+
+    :param request: The request.
+    :param path: The path of the file relative to MEDIA_URL.
+    :return: The response.
+    :raises PermissionDenied: If the file needs a signed URL.
+    """
+    if is_signed_path(path):
+        raise PermissionDenied("Signierte URL erforderlich.")
+    return deliver_media(request, path)
+
+
+@require_safe
+def serve_signed_media(request, expires, signature, path):
+    """
+    Delivers a file below MEDIA_ROOT with a signed, expiring URL.
+
+    The signature is verified without a database query, so the view can sit
+    behind a CDN; the response may be cached until the URL expires.
+
+    :param request: The request.
+    :param expires: The expiry of the URL as Unix timestamp.
+    :param signature: The HMAC signature of the URL.
+    :param path: The path of the file relative to MEDIA_URL.
+    :return: The response.
+    :raises PermissionDenied: If the URL has expired or the signature is invalid.
+    """
+    if not verify_media_signature(path, expires, signature):
+        raise PermissionDenied("Ungültige oder abgelaufene URL.")
+    response = deliver_media(request, path)
+    patch_cache_control(response, public=True, max_age=max(int(expires - time.time()), 0))
+    return response
+
+
+def deliver_media(request, path):
+    """
+    Delivers a file below MEDIA_ROOT after the access check of the calling view.
+
+    The transfer is handed off to the web server with X-Accel-Redirect (nginx,
+    MEDIA_ACCEL_REDIRECT_PREFIX) or X-Sendfile (Apache/lighttpd,
+    MEDIA_USE_SENDFILE), which also handle Range requests.
+    Without a proxy, a FileResponse with Range support is returned: a single
+    byte range is answered with 206 Partial Content, an unsatisfiable one with
+    416, and a matching If-Modified-Since with 304.
+
+    :param request: The request.
+    :param path: The path of the file relative to MEDIA_URL.
+    :return: The response.
+    """
+    full_path = get_media_path(path)
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+    accel_prefix = getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', None)
+    if accel_prefix or getattr(settings, 'MEDIA_USE_SENDFILE', False):
+        response = HttpResponse(content_type=content_type)
+        if accel_prefix:
+            response['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + quote(path)
+        else:
+            response['X-Sendfile'] = full_path
+        return response
+    stat = os.stat(full_path)
+    if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime):
+        return HttpResponseNotModified()
+    byte_range = parse_range(request.META.get('HTTP_RANGE'), stat.st_size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f"bytes */{stat.st_size}"
+        return response
+    file = open(full_path, 'rb')
+    if byte_range:
+        start, end = byte_range
+        response = FileResponse(FileRange(file, start, end - start + 1), status=206, content_type=content_type)
+        response['Content-Range'] = f"bytes {start}-{end}/{stat.st_size}"
+        response['Content-Length'] = end - start + 1
+    else:
+        response = FileResponse(file, content_type=content_type)
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['Accept-Ranges'] = 'bytes'
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    return response
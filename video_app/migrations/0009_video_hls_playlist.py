@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video_app', '0008_alter_video_genre'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='hls_playlist',
+            field=models.FileField(blank=True, null=True, upload_to='videos/hls'),
+        ),
+    ]
@@ -0,0 +1,99 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:22
+
+import os
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+RESOLUTION_FIELDS = {
+    144: 'video_144p',
+    240: 'video_240p',
+    360: 'video_360p',
+    480: 'video_480p',
+    720: 'video_720p',
+    1080: 'video_1080p',
+}
+
+
+def copy_files_to_renditions(apps, schema_editor):
+    """
+    Creates a finished rendition for every converted file of the old resolution fields.
+    """
+    Video = apps.get_model('video_app', 'Video')
+    VideoRendition = apps.get_model('video_app', 'VideoRendition')
+    renditions = []
+    for video in Video.objects.all().iterator():
+        for height, field_name in RESOLUTION_FIELDS.items():
+            file_field = getattr(video, field_name)
+            if not file_field or not file_field.name:
+                continue
+            file_size = os.path.getsize(file_field.path) if os.path.isfile(file_field.path) else None
+            renditions.append(VideoRendition(video=video, height=height, file=file_field.name,
+                                             file_size=file_size, status='done'))
+    VideoRendition.objects.bulk_create(renditions, batch_size=500)
+
+
+def copy_renditions_to_files(apps, schema_editor):
+    """
+    Writes the finished h264/mp4 renditions back to the old resolution fields.
+    """
+    Video = apps.get_model('video_app', 'Video')
+    VideoRendition = apps.get_model('video_app', 'VideoRendition')
+    renditions = VideoRendition.objects.filter(status='done', codec='h264', container='mp4',
+                                               height__in=RESOLUTION_FIELDS)
+    for rendition in renditions.iterator():
+        Video.objects.filter(id=rendition.video_id).update(**{RESOLUTION_FIELDS[rendition.height]: rendition.file})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video_app', '0010_video_source_metadata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VideoRendition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('height', models.PositiveSmallIntegerField()),
+                ('bitrate', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('codec', models.CharField(default='h264', max_length=30)),
+                ('container', models.CharField(default='mp4', max_length=10)),
+                ('file', models.FileField(blank=True, null=True, upload_to='videos/renditions')),
+                ('file_size', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('video', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='renditions', to='video_app.video')),
+            ],
+            options={
+                'ordering': ['height'],
+                'indexes': [models.Index(fields=['height', 'status', 'video'], name='rendition_height_status_idx')],
+                'constraints': [models.UniqueConstraint(fields=('video', 'height', 'codec', 'container'), name='unique_video_rendition')],
+            },
+        ),
+        migrations.RunPython(copy_files_to_renditions, copy_renditions_to_files),
+        migrations.RemoveField(
+            model_name='video',
+            name='video_1080p',
+        ),
+        migrations.RemoveField(
+            model_name='video',
+            name='video_144p',
+        ),
+        migrations.RemoveField(
+            model_name='video',
+            name='video_240p',
+        ),
+        migrations.RemoveField(
+            model_name='video',
+            name='video_360p',
+        ),
+        migrations.RemoveField(
+            model_name='video',
+            name='video_480p',
+        ),
+        migrations.RemoveField(
+            model_name='video',
+            name='video_720p',
+        ),
+    ]
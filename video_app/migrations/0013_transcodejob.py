@@ -0,0 +1,36 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:29
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video_app', '0012_uploadsession'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TranscodeJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stage', models.CharField(choices=[('probe', 'Probe'), ('thumbnail', 'Thumbnail'), ('rendition', 'Rendition'), ('packaging', 'Packaging')], max_length=20)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('queue', models.CharField(blank=True, default='', max_length=50)),
+                ('rq_job_id', models.CharField(db_index=True, max_length=64)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('queued_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('rendition', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='video_app.videorendition')),
+                ('video', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='video_app.video')),
+            ],
+            options={
+                'ordering': ['queued_at', 'id'],
+                'indexes': [models.Index(fields=['status', 'queued_at'], name='transcodejob_status_idx')],
+            },
+        ),
+    ]
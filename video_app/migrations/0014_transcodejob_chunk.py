@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video_app', '0013_transcodejob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transcodejob',
+            name='chunk',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='transcodejob',
+            name='stage',
+            field=models.CharField(choices=[('probe', 'Probe'), ('thumbnail', 'Thumbnail'), ('split', 'Split'), ('rendition', 'Rendition'), ('concat', 'Concat'), ('packaging', 'Packaging')], max_length=20),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video_app', '0014_transcodejob_chunk'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='videorendition',
+            name='file',
+            field=models.FileField(blank=True, db_index=True, null=True, upload_to='videos/renditions'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video_app', '0016_video_created_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:50
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+
+def fill_search_vectors(apps, schema_editor):
+    """
+    Computes the search vector of all existing videos.
+    """
+    Video = apps.get_model('video_app', 'Video')
+    config = getattr(settings, 'VIDEO_SEARCH_CONFIG', 'german')
+    Video.objects.update(search_vector=SearchVector('title', weight='A', config=config)
+                         + SearchVector('description', weight='B', config=config))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video_app', '0017_video_updated_at'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='video',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(fill_search_vectors, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='video',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='video_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='video_title_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -1,10 +1,17 @@
 import os
+import uuid
+import zlib
+import hashlib
 import ffmpeg
 from datetime import date
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.core.files import File
 from django.conf import settings
+from django.utils import timezone
 from django.utils.text import slugify
+from .tasks import select_resolutions
 
 
 def get_unique_filename(target_dir, base_name, resolution, ext):
@@ -41,6 +48,39 @@ def get_unique_filename(target_dir, base_name, resolution, ext):
     return file_path
 
 
+def get_content_hash(file):
+    """
+    Computes the SHA-256 hash of a file while streaming it in chunks.
+
+    :param file: A Django File object, e.g. an uploaded file.
+    :return: The hex digest of the file content.
+    """
+    content_hash = hashlib.sha256()
+    for chunk in file.chunks():
+        content_hash.update(chunk)
+    file.seek(0)
+    return content_hash.hexdigest()
+
+
+def get_search_vector():
+    """
+    Returns the expression of the search vector of a video: the title weighted
+    above the description, in the text search configuration of the
+    VIDEO_SEARCH_CONFIG setting.
+
+    :return: A SearchVector expression.
+    """
+    config = get_search_config()
+    return SearchVector('title', weight='A', config=config) + SearchVector('description', weight='B', config=config)
+
+
+def get_search_config():
+    """
+    Returns the PostgreSQL text search configuration of the VIDEO_SEARCH_CONFIG setting, 'german' by default.
+    """
+    return getattr(settings, 'VIDEO_SEARCH_CONFIG', 'german')
+
+
 GENRE_CHOICES = [
     ('action', 'Action'),
     ('drama', 'Drama'),
@@ -51,37 +91,71 @@ GENRE_CHOICES = [
 
 class Video(models.Model):
     created_at = models.DateField(default=date.today)
+    updated_at = models.DateTimeField(auto_now=True)
     title = models.CharField(max_length=80)
     description = models.CharField(max_length=500)
     video_file = models.FileField(
         upload_to='videos/originals', blank=True, null=True)
-    video_144p = models.FileField(
-        upload_to='videos/144p', blank=True, null=True)
-    video_240p = models.FileField(
-        upload_to='videos/240p', blank=True, null=True)
-    video_360p = models.FileField(
-        upload_to='videos/360p', blank=True, null=True)
-    video_480p = models.FileField(
-        upload_to='videos/480p', blank=True, null=True)
-    video_720p = models.FileField(
-        upload_to='videos/720p', blank=True, null=True)
-    video_1080p = models.FileField(
-        upload_to='videos/1080p', blank=True, null=True)
+    hls_playlist = models.FileField(
+        upload_to='videos/hls', blank=True, null=True)
     thumbnail = models.ImageField(
         upload_to='thumbnails/', blank=True, null=True)
     genre = models.CharField(
         max_length=30, choices=GENRE_CHOICES, default='action')
+    duration = models.FloatField(blank=True, null=True)
+    width = models.PositiveIntegerField(blank=True, null=True)
+    height = models.PositiveIntegerField(blank=True, null=True)
+    video_codec = models.CharField(max_length=30, blank=True, default='')
+    audio_codec = models.CharField(max_length=30, blank=True, default='')
+    bitrate = models.PositiveBigIntegerField(blank=True, null=True)
+    frame_rate = models.FloatField(blank=True, null=True)
+    content_hash = models.CharField(max_length=64, blank=True, default='', db_index=True, editable=False)
+    search_vector = SearchVectorField(blank=True, null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='video_created_idx'),
+            GinIndex(fields=['search_vector'], name='video_search_idx'),
+            GinIndex(fields=['title'], name='video_title_trgm_idx', opclasses=['gin_trgm_ops']),
+        ]
+
+    def get_available_resolutions(self):
+        """
+        Returns the resolutions that are converted for this video.
+
+        Resolutions above the probed source resolution are left out, since
+        upscaling does not improve the quality.
+
+        :return: A list of resolutions, e.g. ['144p', '240p', '360p'].
+        """
+        return select_resolutions(self.width, self.height)
+
+    def get_rendition(self, resolution):
+        """
+        Returns the finished rendition of this video in the given resolution.
+
+        The renditions are read through self.renditions.all(), so a queryset
+        with prefetch_related('renditions') needs no additional query.
+
+        :param resolution: The resolution of the rendition, e.g. '720p'.
+        :return: The VideoRendition instance, or None if it is not available.
+        """
+        for rendition in self.renditions.all():
+            if rendition.resolution == resolution and rendition.status == VideoRendition.STATUS_DONE:
+                return rendition
+        return None
 
     def generate_thumbnail(self):
         """
         Generates a thumbnail for the video.
 
-        If the video file or the thumbnail already exists, this method does nothing.
+        If the video file is missing or the thumbnail already exists, this method does nothing.
+        Runs in the job pipeline, see video_app.signals.thumbnail_and_save.
 
-        :raises ffmpeg.Error: If an error occurs while generating the thumbnail.
+        :return: True if a thumbnail was generated, otherwise False.
         """
         if not self.video_file or not self.id or self.thumbnail:
-            return
+            return False
         output_filename = f"{self.id}.jpg"
         output_path = os.path.join(settings.MEDIA_ROOT, "thumbnails", output_filename)
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
@@ -92,33 +166,44 @@ class Video(models.Model):
                 .run(overwrite_output=True, capture_stdout=True, capture_stderr=True)
             )
             self.thumbnail.name = f"thumbnails/{output_filename}"
+            return True
         except ffmpeg.Error as e:
             print(f"⚠️ ffmpeg stderr:\n{e.stderr.decode()}")
             print(f"⚠️ Fehler beim Erstellen des Thumbnails: {e}")
+            return False
 
     def save(self, *args, **kwargs):
         """
         Saves the video instance and its associated files.
 
-        If the instance is being created and a video file is provided, this method
+        If the instance is being created and a video file is uploaded, this method
         renames the video file to ensure uniqueness by appending a counter to the
-        slugified title. The thumbnail is generated after the instance is saved.
+        slugified title. Files that are already in storage (e.g. finished chunked
+        uploads) keep their name. The SHA-256 content hash used for deduplication
+        is computed by the probe job, so the request does not read the whole
+        upload, see video_app.signals.probe_and_enqueue. The thumbnail is generated by a queued job, see
+        video_app.signals.thumbnail_and_save. Saves restricted to update_fields
+        also update updated_at, which the ETag of the video detail is built from.
+        The search vector is updated in the database whenever the title or the
+        description may have changed.
 
         :param args: Additional positional arguments passed to the parent's save method.
         :param kwargs: Additional keyword arguments passed to the parent's save method.
         """
         creating = self._state.adding and not self.pk
-        if creating and self.video_file:
+        if creating and self.video_file and not self.video_file._committed:
             safe_title = slugify(self.title)
             ext = os.path.splitext(self.video_file.name)[1]
             target_dir = os.path.join(settings.MEDIA_ROOT)
             os.makedirs(target_dir, exist_ok=True)
             unique_filename = get_unique_filename(target_dir, safe_title, 'original', ext)
             self.video_file.name = os.path.relpath(unique_filename, settings.MEDIA_ROOT)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'updated_at'}
         super().save(*args, **kwargs)
-        if not self.thumbnail and self.video_file:
-            self.generate_thumbnail()
-            super().save(update_fields=["thumbnail"])
+        if update_fields is None or {'title', 'description'} & set(update_fields):
+            Video.objects.filter(pk=self.pk).update(search_vector=get_search_vector())
 
     def __str__(self):
         """
@@ -129,3 +214,214 @@ class Video(models.Model):
         :return: A string representation of the video instance.
         """
         return f"{self.id} - {self.title}"
+
+
+class VideoRendition(models.Model):
+    STATUS_QUEUED = 'queued'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name='renditions')
+    height = models.PositiveSmallIntegerField()
+    bitrate = models.PositiveBigIntegerField(blank=True, null=True)
+    codec = models.CharField(max_length=30, default='h264')
+    container = models.CharField(max_length=10, default='mp4')
+    file = models.FileField(upload_to='videos/renditions', blank=True, null=True, db_index=True)
+    file_size = models.PositiveBigIntegerField(blank=True, null=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+
+    class Meta:
+        ordering = ['height']
+        constraints = [
+            models.UniqueConstraint(fields=['video', 'height', 'codec', 'container'], name='unique_video_rendition'),
+        ]
+        indexes = [
+            models.Index(fields=['height', 'status', 'video'], name='rendition_height_status_idx'),
+        ]
+
+    @property
+    def resolution(self):
+        """
+        Returns the resolution of the rendition as used in the API, e.g. '720p'.
+        """
+        return f"{self.height}p"
+
+    def __str__(self):
+        """
+        Returns a string representation of the rendition instance.
+
+        The string representation includes the video, the resolution and the codec.
+
+        :return: A string representation of the rendition instance.
+        """
+        return f"{self.video_id} - {self.resolution} {self.codec}"
+
+
+class TranscodeJob(models.Model):
+    STAGE_PROBE = 'probe'
+    STAGE_THUMBNAIL = 'thumbnail'
+    STAGE_SPLIT = 'split'
+    STAGE_RENDITION = 'rendition'
+    STAGE_CONCAT = 'concat'
+    STAGE_PACKAGING = 'packaging'
+    STAGE_CHOICES = [
+        (STAGE_PROBE, 'Probe'),
+        (STAGE_THUMBNAIL, 'Thumbnail'),
+        (STAGE_SPLIT, 'Split'),
+        (STAGE_RENDITION, 'Rendition'),
+        (STAGE_CONCAT, 'Concat'),
+        (STAGE_PACKAGING, 'Packaging'),
+    ]
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name='jobs')
+    rendition = models.ForeignKey(VideoRendition, on_delete=models.CASCADE, blank=True, null=True,
+                                  related_name='jobs')
+    stage = models.CharField(max_length=20, choices=STAGE_CHOICES)
+    chunk = models.PositiveIntegerField(blank=True, null=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    queue = models.CharField(max_length=50, blank=True, default='')
+    rq_job_id = models.CharField(max_length=64, db_index=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+    queued_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['queued_at', 'id']
+        indexes = [
+            models.Index(fields=['status', 'queued_at'], name='transcodejob_status_idx'),
+        ]
+
+    @property
+    def queue_latency(self):
+        """
+        Returns the time the job waited in its queue before it started, or None if it has not started.
+        """
+        return self.started_at - self.queued_at if self.started_at else None
+
+    @property
+    def run_time(self):
+        """
+        Returns the time the last attempt of the job ran, or None if it has not finished.
+        """
+        return self.finished_at - self.started_at if self.started_at and self.finished_at else None
+
+    def __str__(self):
+        """
+        Returns a string representation of the job instance.
+
+        :return: The video, the stage and the status of the job.
+        """
+        return f"{self.video_id} - {self.stage} ({self.status})"
+
+
+class UploadSession(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    title = models.CharField(max_length=80)
+    description = models.CharField(max_length=500)
+    genre = models.CharField(
+        max_length=30, choices=GENRE_CHOICES, default='action')
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    checksum = models.PositiveBigIntegerField(default=0)
+    video = models.OneToOneField(Video, on_delete=models.SET_NULL, blank=True, null=True,
+                                 related_name='upload_session')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    CHUNK_READ_SIZE = 1024 * 1024
+
+    @property
+    def staging_path(self):
+        """
+        Returns the path of the staging file the chunks are appended to.
+        """
+        return os.path.join(settings.MEDIA_ROOT, 'uploads', f"{self.id}.part")
+
+    @property
+    def is_complete(self):
+        """
+        Returns True once all bytes of the upload have been received.
+        """
+        return self.offset >= self.size
+
+    def append(self, stream, length, digest=None):
+        """
+        Appends a chunk read from the given stream to the staging file.
+
+        The chunk is written at the current offset, so bytes of an interrupted
+        earlier request beyond the offset are overwritten. The running CRC-32
+        checksum of the upload and the offset are updated in memory; the caller
+        saves the instance.
+
+        :param stream: A file-like object to read the chunk from.
+        :param length: The number of bytes of the chunk.
+        :param digest: The expected SHA-256 digest of the chunk, if the client sent one.
+        :return: True if the chunk was written, False if its digest did not match.
+        """
+        os.makedirs(os.path.dirname(self.staging_path), exist_ok=True)
+        checksum = self.checksum
+        chunk_hash = hashlib.sha256()
+        with open(self.staging_path, 'ab') as staging:
+            staging.truncate(self.offset)
+            remaining = length
+            while remaining > 0:
+                data = stream.read(min(self.CHUNK_READ_SIZE, remaining))
+                if not data:
+                    break
+                staging.write(data)
+                checksum = zlib.crc32(data, checksum)
+                chunk_hash.update(data)
+                remaining -= len(data)
+        if digest is not None and chunk_hash.digest() != digest:
+            with open(self.staging_path, 'ab') as staging:
+                staging.truncate(self.offset)
+            return False
+        self.offset += length - remaining
+        self.checksum = checksum
+        return True
+
+    def complete(self):
+        """
+        Moves the finished staging file into the originals directory and creates
+        the video instance for it. Creating the video enqueues its probe job,
+        which hashes the file and links it to an already converted video with
+        the same content instead of converting it again.
+
+        :return: The created video instance.
+        """
+        target_dir = os.path.join(settings.MEDIA_ROOT, 'videos', 'originals')
+        os.makedirs(target_dir, exist_ok=True)
+        ext = os.path.splitext(self.filename)[1]
+        target_path = get_unique_filename(target_dir, slugify(self.title), 'original', ext)
+        os.rename(self.staging_path, target_path)
+        self.video = Video.objects.create(
+            title=self.title, description=self.description, genre=self.genre,
+            video_file=os.path.relpath(target_path, settings.MEDIA_ROOT))
+        self.save(update_fields=['video', 'updated_at'])
+        return self.video
+
+    def __str__(self):
+        """
+        Returns a string representation of the upload session.
+
+        :return: The file name and the progress of the upload.
+        """
+        return f"{self.filename} ({self.offset}/{self.size})"
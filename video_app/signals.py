@@ -1,14 +1,21 @@
 from django.dispatch import receiver
 from django.db.models.signals import post_save, post_delete
-from .models import Video
+from .models import Video, VideoRendition, TranscodeJob, get_content_hash
+from .cache import bump_catalog_version, invalidate_video_card
+from .jobs import TranscodeError, ProgressReporter, enqueue_tracked, has_retries_left, tracked_job
 import os
-from .tasks import convert_144p, convert_240p, convert_360p, convert_480p, convert_720p, convert_1080p
+from .tasks import convert_144p, convert_240p, convert_360p, convert_480p, convert_720p, convert_1080p, convert_ladder, \
+    package_hls, probe_video, get_rungs, get_profile, get_profile_name, get_codec_name, group_by_profile, split_source, \
+    encode_chunk, concat_chunks, encode_audio, has_audio, LADDER, DEFAULT_PROFILE
 import django_rq
 from django.db import transaction
 from django.conf import settings
 import time
 from rq import Retry
+from rq.job import Dependency
 import logging
+import shutil
+from django.utils import timezone
 from django.utils.text import slugify
 
 
@@ -131,10 +138,11 @@ def create_target_directory(resolution, output_path):
     base_ext = os.path.splitext(output_path)[1]
     return target_dir, base_ext
 
-def process_and_save(instance_id, conversion_func, field_name):
+@tracked_job
+def process_and_save(instance_id, conversion_func, resolution):
     """
     Processes a video by calling the given conversion function and saves the
-    result to the given field name of the video instance.
+    result as rendition of the given resolution.
 
     Parameters
     ----------
@@ -143,42 +151,604 @@ def process_and_save(instance_id, conversion_func, field_name):
     conversion_func : callable
         A function that takes a video file path as an argument and returns a
         converted video file path.
-    field_name : str
-        The name of the field in the video model where the converted video file
-        will be stored.
+    resolution : str
+        The resolution of the converted video (e.g. '144p', '720p').
 
     Returns
     -------
     None
+
+    Raises
+    ------
+    TranscodeError
+        If the conversion failed, so the job is retried.
     """
-    try:
-        instance = wait_for_video(instance_id)
-        if not instance: return
-        instance.refresh_from_db()
-        output_path = conversion_func(instance.video_file.path)
-        if not output_path:
-            logger.error(f"Fehlgeschlagen: {field_name}")
+    instance = wait_for_video(instance_id)
+    if not instance: return
+    instance.refresh_from_db()
+    output_path = conversion_func(instance.video_file.path)
+    if not output_path:
+        mark_renditions_failed(instance, [resolution])
+        raise TranscodeError(f"Fehlgeschlagen: {resolution} für Video {instance_id}")
+    rendition = save_rendition(instance, resolution, output_path)
+    logger.info(f"Gespeichert: {resolution} -> {rendition.file.name}")
+    enqueue_packaging_if_complete(instance)
+
+
+def save_rendition(instance, resolution, output_path):
+    """
+    Moves a converted video file into place and stores it as finished
+    rendition of the video instance.
+
+    Parameters
+    ----------
+    instance : Video
+        The video instance the file belongs to.
+    resolution : str
+        The resolution of the converted file (e.g. '144p', '720p').
+    output_path : str
+        The path of the converted file as written by FFmpeg.
+
+    Returns
+    -------
+    VideoRendition
+        The saved rendition.
+    """
+    url = move_converted_file(instance, resolution, output_path)
+    file_size = os.path.getsize(os.path.join(settings.MEDIA_ROOT, url))
+    bitrate = int(file_size * 8 / instance.duration) if instance.duration else None
+    rendition, _ = VideoRendition.objects.update_or_create(
+        video=instance, height=int(resolution.rstrip('p')), codec=get_rendition_codec(resolution), container='mp4',
+        defaults={'file': url, 'file_size': file_size, 'bitrate': bitrate, 'status': VideoRendition.STATUS_DONE})
+    return rendition
+
+
+def mark_renditions_failed(instance, resolutions, retrying=None):
+    """
+    Marks the renditions of the given resolutions of a video as failed,
+    unless the failed job is retried; the renditions then stay queued. The
+    remaining renditions are packaged once no other conversion is pending.
+
+    Parameters
+    ----------
+    instance : Video
+        The video instance.
+    resolutions : list
+        The resolutions whose conversion failed.
+    retrying : bool, optional
+        Whether the failed job is retried. Defaults to whether the current RQ
+        job has retries left, for jobs that raise after the call.
+
+    Returns
+    -------
+    None
+    """
+    if has_retries_left() if retrying is None else retrying:
+        return
+    heights = [int(resolution.rstrip('p')) for resolution in resolutions]
+    VideoRendition.objects.filter(video=instance, height__in=heights, status=VideoRendition.STATUS_QUEUED).update(
+        status=VideoRendition.STATUS_FAILED)
+    Video.objects.filter(id=instance.id).update(updated_at=timezone.now())
+    bump_catalog_version()
+    enqueue_packaging_if_complete(instance)
+
+
+def get_rendition_codec(resolution):
+    """
+    Returns the codec name the encoding profile of a resolution produces.
+
+    Parameters
+    ----------
+    resolution : str
+        The resolution (e.g. '144p', '720p').
+
+    Returns
+    -------
+    str
+        The codec name, e.g. 'h264'.
+    """
+    return get_codec_name(get_profile(get_profile_name(resolution)))
+
+
+def move_converted_file(instance, resolution, output_path):
+    """
+    Moves a converted video file into the target directory of its resolution
+    and returns its path relative to MEDIA_ROOT.
+
+    Parameters
+    ----------
+    instance : Video
+        The video instance the file belongs to.
+    resolution : str
+        The resolution of the converted file (e.g. '144p', '720p').
+    output_path : str
+        The path of the converted file as written by FFmpeg.
+
+    Returns
+    -------
+    str
+        The path of the moved file relative to MEDIA_ROOT.
+    """
+    target_dir, base_ext = create_target_directory(resolution, output_path)
+    safe_title = slugify(instance.title)
+    final_output_path = get_unique_filename(target_dir, safe_title, resolution, base_ext)
+    os.rename(output_path, final_output_path)
+    return final_output_path.replace(settings.MEDIA_ROOT, '').lstrip(os.sep)
+
+
+@tracked_job
+def process_ladder_and_save(instance_id, resolutions=None, profile_name=None):
+    """
+    Converts a video into the resolutions of the ladder with a single FFmpeg
+    run and saves every result as rendition of the video instance.
+
+    Parameters
+    ----------
+    instance_id : int
+        The id of the video instance.
+    resolutions : list, optional
+        The resolutions to convert. Defaults to the whole ladder.
+    profile_name : str, optional
+        The encoding profile of the resolutions. Defaults to DEFAULT_PROFILE.
+
+    Returns
+    -------
+    None
+
+    Raises
+    ------
+    TranscodeError
+        If the conversion failed, so the job is retried.
+    """
+    instance = wait_for_video(instance_id)
+    if not instance: return
+    instance.refresh_from_db()
+    rungs = get_rungs(resolutions)
+    outputs = convert_ladder(instance.video_file.path, rungs, get_profile(profile_name),
+                             on_progress=ProgressReporter(instance.duration))
+    if not outputs:
+        mark_renditions_failed(instance, [resolution for resolution, _ in rungs])
+        raise TranscodeError(f"Fehlgeschlagen: Auflösungsleiter für Video {instance_id}")
+    with transaction.atomic():
+        for resolution, output_path in outputs.items():
+            save_rendition(instance, resolution, output_path)
+    logger.info(f"Gespeichert: {', '.join(outputs)} für Video {instance_id}")
+    enqueue_packaging_if_complete(instance)
+
+
+def get_chunk_dir(instance_id):
+    """
+    Returns the working directory of the chunked conversion of a video.
+
+    Parameters
+    ----------
+    instance_id : int
+        The id of the video instance.
+
+    Returns
+    -------
+    str
+        The directory, below MEDIA_ROOT so all workers can reach it.
+    """
+    return os.path.join(settings.MEDIA_ROOT, 'videos', 'chunks', str(instance_id))
+
+
+def use_chunked_mode(instance):
+    """
+    Returns whether a video is converted in chunks, i.e. whether its duration
+    reaches the VIDEO_CHUNKED_MIN_DURATION setting.
+
+    Parameters
+    ----------
+    instance : Video
+        The probed video instance.
+
+    Returns
+    -------
+    bool
+        True if the video is split into chunks that are converted in parallel.
+    """
+    min_duration = getattr(settings, 'VIDEO_CHUNKED_MIN_DURATION', None)
+    return bool(min_duration and instance.duration and instance.duration >= min_duration)
+
+
+@tracked_job
+def split_and_enqueue(instance_id, resolutions):
+    """
+    Splits the source of a video into keyframe-aligned chunks and enqueues
+    one conversion job per chunk and encoding profile. Per profile, a concat
+    job depends on all of its chunk jobs and runs once they are finished or
+    have failed, so the renditions of a failed chunk are marked as failed.
+
+    Parameters
+    ----------
+    instance_id : int
+        The id of the video instance.
+    resolutions : list
+        The resolutions to convert.
+
+    Returns
+    -------
+    None
+
+    Raises
+    ------
+    TranscodeError
+        If the source could not be split, so the job is retried.
+    """
+    instance = wait_for_video(instance_id)
+    if not instance: return
+    chunk_dir = get_chunk_dir(instance.id)
+    shutil.rmtree(chunk_dir, ignore_errors=True)
+    chunks = split_source(instance.video_file.path, os.path.join(chunk_dir, 'source'),
+                          getattr(settings, 'VIDEO_CHUNK_SECONDS', 120))
+    if not chunks:
+        mark_renditions_failed(instance, resolutions)
+        raise TranscodeError(f"Fehlgeschlagen: Aufteilen von Video {instance_id}")
+    logger.info(f"Video {instance_id}: {len(chunks)} Teile werden parallel konvertiert.")
+    renditions = {rendition.resolution: rendition for rendition in instance.renditions.all()}
+    for profile_name, profile_resolutions in group_by_profile(resolutions).items():
+        profile = get_profile(profile_name)
+        queue = django_rq.get_queue(profile['queue'], autocommit=True)
+        profile_renditions = [renditions[resolution] for resolution in profile_resolutions]
+        chunk_jobs = [
+            enqueue_tracked(queue, encode_chunk_and_save, instance.id, chunk, profile_resolutions, profile_name,
+                            stage=TranscodeJob.STAGE_RENDITION, renditions=profile_renditions, chunk=index,
+                            retry=Retry(max=3, interval=5), job_timeout=profile['timeout'])
+            for index, chunk in enumerate(chunks)]
+        enqueue_tracked(queue, concat_and_save, instance.id, len(chunks), profile_resolutions, profile_name,
+                        stage=TranscodeJob.STAGE_CONCAT, renditions=profile_renditions,
+                        depends_on=Dependency(jobs=chunk_jobs, allow_failure=True),
+                        retry=Retry(max=3, interval=5), job_timeout=profile['timeout'])
+
+
+@tracked_job
+def encode_chunk_and_save(instance_id, chunk, resolutions, profile_name):
+    """
+    Converts one chunk of a video into the resolutions of an encoding profile.
+    The encoded chunks are kept in the working directory of the profile until
+    the concat job joins them.
+
+    Parameters
+    ----------
+    instance_id : int
+        The id of the video instance.
+    chunk : str
+        The path of the chunk, see split_source.
+    resolutions : list
+        The resolutions to convert.
+    profile_name : str
+        The encoding profile of the resolutions.
+
+    Returns
+    -------
+    None
+
+    Raises
+    ------
+    TranscodeError
+        If the conversion failed, so the job is retried.
+    """
+    instance = wait_for_video(instance_id)
+    if not instance: return
+    metadata = probe_video(chunk) or {}
+    outputs = encode_chunk(chunk, get_rungs(resolutions), os.path.join(get_chunk_dir(instance.id), profile_name),
+                           get_profile(profile_name), on_progress=ProgressReporter(metadata.get('duration')))
+    if not outputs:
+        mark_renditions_failed(instance, resolutions)
+        raise TranscodeError(f"Fehlgeschlagen: {os.path.basename(chunk)} für Video {instance_id}")
+
+
+@tracked_job
+def concat_and_save(instance_id, chunk_count, resolutions, profile_name):
+    """
+    Joins the converted chunks of a video per resolution, adds the audio of
+    the source and saves every result as rendition of the video instance.
+    If a chunk is missing because its job failed, the renditions are marked
+    as failed instead, as retrying the concatenation cannot recover it.
+
+    Parameters
+    ----------
+    instance_id : int
+        The id of the video instance.
+    chunk_count : int
+        The number of chunks the source was split into.
+    resolutions : list
+        The resolutions to join.
+    profile_name : str
+        The encoding profile of the resolutions.
+
+    Returns
+    -------
+    None
+
+    Raises
+    ------
+    TranscodeError
+        If the concatenation failed, so the job is retried.
+    """
+    instance = wait_for_video(instance_id)
+    if not instance: return
+    instance.refresh_from_db()
+    profile_dir = os.path.join(get_chunk_dir(instance.id), profile_name)
+    chunks = {resolution: [os.path.join(profile_dir, resolution, f"chunk_{index:05d}.mp4")
+                           for index in range(chunk_count)] for resolution in resolutions}
+    if not all(os.path.exists(chunk) for paths in chunks.values() for chunk in paths):
+        mark_renditions_failed(instance, resolutions, retrying=False)
+        shutil.rmtree(profile_dir, ignore_errors=True)
+        logger.error(f"Fehlgeschlagen: Teile von {', '.join(resolutions)} für Video {instance_id} fehlen")
+        return
+    audio = None
+    if has_audio(instance.video_file.path):
+        audio = encode_audio(instance.video_file.path, os.path.join(profile_dir, 'audio.mka'), get_profile(profile_name))
+        if not audio:
+            mark_renditions_failed(instance, resolutions)
+            raise TranscodeError(f"Fehlgeschlagen: Audio von {', '.join(resolutions)} für Video {instance_id}")
+    outputs = {}
+    for resolution in resolutions:
+        target = concat_chunks(chunks[resolution], audio, os.path.join(profile_dir, f"{resolution}.mp4"))
+        if not target:
+            mark_renditions_failed(instance, resolutions)
+            raise TranscodeError(f"Fehlgeschlagen: Zusammenfügen von {resolution} für Video {instance_id}")
+        outputs[resolution] = target
+    with transaction.atomic():
+        for resolution, output_path in outputs.items():
+            save_rendition(instance, resolution, output_path)
+    shutil.rmtree(profile_dir, ignore_errors=True)
+    logger.info(f"Gespeichert: {', '.join(outputs)} für Video {instance_id}")
+    enqueue_packaging_if_complete(instance)
+
+
+def enqueue_packaging_if_complete(instance):
+    """
+    Enqueues the HLS packaging of a video once none of its available
+    resolutions is still being converted and at least one has been converted.
+    Resolutions that failed for good are left out of the packaging, so one
+    failed rung does not keep the video from being streamed. The video row is
+    locked, so jobs finishing at the same time enqueue the packaging only once.
+
+    Parameters
+    ----------
+    instance : Video
+        The video instance whose conversions have been saved.
+
+    Returns
+    -------
+    None
+    """
+    with transaction.atomic():
+        Video.objects.select_for_update().filter(id=instance.id).first()
+        statuses = {}
+        for rendition in instance.renditions.all():
+            statuses.setdefault(rendition.status, set()).add(rendition.resolution)
+        done = statuses.get(VideoRendition.STATUS_DONE, set())
+        settled = done | statuses.get(VideoRendition.STATUS_FAILED, set())
+        available = set(instance.get_available_resolutions())
+        if not done or available & statuses.get(VideoRendition.STATUS_QUEUED, set()) or \
+                not settled.issuperset(available):
             return
-        resolution = field_name.split('_', 1)[1]
-        target_dir, base_ext = create_target_directory(resolution, output_path)
-        safe_title = slugify(instance.title)
-        final_output_path = get_unique_filename(target_dir, safe_title, resolution, base_ext)
-        os.rename(output_path, final_output_path)
-        url = final_output_path.replace(settings.MEDIA_ROOT, '').lstrip(os.sep)
-        setattr(instance, field_name, url)
-        instance.save(update_fields=[field_name])
-        logger.info(f"Gespeichert: {field_name} -> {url}")
-    except Exception as e:
-        logger.error(f"Fehler bei der Verarbeitung des Videos {instance_id}: {str(e)}")
+        pending = instance.jobs.filter(stage=TranscodeJob.STAGE_PACKAGING,
+                                       status__in=[TranscodeJob.STATUS_QUEUED, TranscodeJob.STATUS_RUNNING])
+        if pending.exists():
+            return
+        queue = django_rq.get_queue('default', autocommit=True)
+        enqueue_tracked(queue, package_and_save, instance.id, stage=TranscodeJob.STAGE_PACKAGING,
+                        retry=Retry(max=3, interval=5))
 
 
+@tracked_job
+def package_and_save(instance_id):
+    """
+    Packages the converted resolutions of a video as HLS segments and saves
+    the master playlist to the hls_playlist field of the video instance.
+
+    Parameters
+    ----------
+    instance_id : int
+        The id of the video instance.
+
+    Returns
+    -------
+    None
+
+    Raises
+    ------
+    TranscodeError
+        If the packaging failed, so the job is retried.
+    """
+    instance = Video.objects.filter(id=instance_id).first()
+    if not instance: return
+    sizes = dict(LADDER)
+    renditions = [(rendition.resolution, sizes[rendition.resolution], rendition.file.path)
+                  for rendition in instance.renditions.filter(status=VideoRendition.STATUS_DONE)
+                  if rendition.resolution in sizes]
+    target_dir = os.path.join(settings.MEDIA_ROOT, 'videos', 'hls', str(instance.id))
+    shutil.rmtree(target_dir, ignore_errors=True)
+    master_path = package_hls(renditions, target_dir)
+    if not master_path:
+        raise TranscodeError(f"Fehlgeschlagen: HLS-Packaging für Video {instance_id}")
+    shutil.rmtree(get_chunk_dir(instance.id), ignore_errors=True)
+    instance.hls_playlist = os.path.relpath(master_path, settings.MEDIA_ROOT)
+    instance.save(update_fields=["hls_playlist"])
+    logger.info(f"Gespeichert: hls_playlist -> {instance.hls_playlist.name}")
+
+
+CONVERSIONS = {
+    '144p': convert_144p,
+    '240p': convert_240p,
+    '360p': convert_360p,
+    '480p': convert_480p,
+    '720p': convert_720p,
+    '1080p': convert_1080p,
+}
+
+
+@tracked_job
+def probe_and_enqueue(instance_id):
+    """
+    Probes the source of a video, saves its technical metadata and enqueues
+    the conversion of all resolutions that do not exceed the source resolution.
+    The resolutions are grouped by encoding profile; each group is enqueued on
+    the queue of its profile. Videos that reach VIDEO_CHUNKED_MIN_DURATION are
+    split into chunks first, see split_and_enqueue. Before that, the content
+    hash of the source is computed; a video with the same content as an
+    already converted video is linked to its files instead, see
+    link_to_original.
+
+    If the source can't be probed, all resolutions are converted.
+
+    Parameters
+    ----------
+    instance_id : int
+        The id of the video instance.
+
+    Returns
+    -------
+    None
+    """
+    instance = wait_for_video(instance_id)
+    if not instance or not instance.video_file: return
+    if not instance.content_hash:
+        with instance.video_file.open('rb'):
+            instance.content_hash = get_content_hash(instance.video_file)
+        instance.save(update_fields=['content_hash'])
+        original = find_original(instance)
+        if original:
+            link_to_original(instance, original)
+            logger.info(f"Video {instance.id} ist ein Duplikat von Video {original.id} und wird nicht konvertiert.")
+            return
+    metadata = probe_video(instance.video_file.path)
+    if metadata:
+        for field_name, value in metadata.items():
+            setattr(instance, field_name, value)
+        instance.save(update_fields=list(metadata))
+    resolutions = instance.get_available_resolutions()
+    logger.info(f"Video {instance_id}: Auflösungen {', '.join(resolutions)} werden erstellt.")
+    VideoRendition.objects.bulk_create(
+        [VideoRendition(video=instance, height=int(resolution.rstrip('p')), codec=get_rendition_codec(resolution))
+         for resolution in resolutions],
+        ignore_conflicts=True)
+    if use_chunked_mode(instance):
+        queue = django_rq.get_queue('default', autocommit=True)
+        enqueue_tracked(queue, split_and_enqueue, instance.id, resolutions, stage=TranscodeJob.STAGE_SPLIT,
+                        retry=Retry(max=3, interval=5), job_timeout=DEFAULT_PROFILE['timeout'])
+        return
+    renditions = {rendition.resolution: rendition for rendition in instance.renditions.all()}
+    for profile_name, profile_resolutions in group_by_profile(resolutions).items():
+        profile = get_profile(profile_name)
+        queue = django_rq.get_queue(profile['queue'], autocommit=True)
+        if getattr(settings, 'VIDEO_LADDER_MODE', True):
+            enqueue_tracked(queue, process_ladder_and_save, instance.id, profile_resolutions, profile_name,
+                            stage=TranscodeJob.STAGE_RENDITION,
+                            renditions=[renditions[resolution] for resolution in profile_resolutions],
+                            retry=Retry(max=3, interval=5), job_timeout=profile['timeout'])
+            continue
+        for resolution in profile_resolutions:
+            enqueue_tracked(queue, process_and_save, instance.id, CONVERSIONS[resolution], resolution,
+                            stage=TranscodeJob.STAGE_RENDITION, renditions=[renditions[resolution]],
+                            retry=Retry(max=3, interval=5), job_timeout=profile['timeout'])
+
+
+@tracked_job
+def thumbnail_and_save(instance_id):
+    """
+    Generates the thumbnail of a video and saves it to the thumbnail field of
+    the video instance.
+
+    Parameters
+    ----------
+    instance_id : int
+        The id of the video instance.
+
+    Returns
+    -------
+    None
+
+    Raises
+    ------
+    TranscodeError
+        If the thumbnail could not be generated, so the job is retried.
+    """
+    instance = wait_for_video(instance_id)
+    if not instance: return
+    if instance.generate_thumbnail():
+        instance.save(update_fields=["thumbnail"])
+        logger.info(f"Gespeichert: thumbnail -> {instance.thumbnail.name}")
+    elif not instance.thumbnail:
+        raise TranscodeError(f"Fehlgeschlagen: Thumbnail für Video {instance_id}")
+
+
+def find_original(instance):
+    """
+    Returns the earliest fully converted video with the same content hash as
+    the given video instance.
+
+    Parameters
+    ----------
+    instance : Video
+        The newly created video instance.
+
+    Returns
+    -------
+    Video or None
+        The converted video with the same source, otherwise None.
+    """
+    if not instance.content_hash:
+        return None
+    return Video.objects.filter(content_hash=instance.content_hash).exclude(id=instance.id) \
+        .exclude(hls_playlist__isnull=True).exclude(hls_playlist='').order_by('id').first()
+
+
+def link_to_original(instance, original):
+    """
+    Links a duplicate upload to the files of an already converted video with
+    the same source instead of converting it again. The uploaded file is
+    replaced by the original source; the renditions, the HLS packaging and
+    the thumbnail share the files of the original. Shared files are only
+    deleted from disk once no video or rendition references them anymore.
+
+    Parameters
+    ----------
+    instance : Video
+        The newly created duplicate video instance.
+    original : Video
+        The converted video with the same content hash.
+
+    Returns
+    -------
+    None
+    """
+    if instance.video_file and instance.video_file.name != original.video_file.name:
+        delete_media_file(instance.video_file)
+    instance.video_file = original.video_file.name
+    instance.hls_playlist = original.hls_playlist.name
+    if not instance.thumbnail:
+        instance.thumbnail = original.thumbnail.name
+    update_fields = ['video_file', 'hls_playlist', 'thumbnail']
+    for field_name in ('duration', 'width', 'height', 'video_codec', 'audio_codec', 'bitrate', 'frame_rate'):
+        setattr(instance, field_name, getattr(original, field_name))
+        update_fields.append(field_name)
+    with transaction.atomic():
+        instance.save(update_fields=update_fields)
+        VideoRendition.objects.bulk_create([
+            VideoRendition(video=instance, height=rendition.height, bitrate=rendition.bitrate, codec=rendition.codec,
+                           container=rendition.container, file=rendition.file.name, file_size=rendition.file_size,
+                           status=rendition.status)
+            for rendition in original.renditions.filter(status=VideoRendition.STATUS_DONE)])
+
 
 @receiver(post_save, sender=Video)
 def video_post_save(sender, instance, created, **kwargs):
     """
     When a video instance is created, this function is called to process and save
     the converted video files. It is connected to the post_save signal of the
-    Video model.
+    Video model. The first job probes the source and then enqueues only the
+    resolutions that do not exceed it: in ladder mode (VIDEO_LADDER_MODE) a
+    single job that decodes the source once, otherwise one job per resolution.
+    The thumbnail is generated by a job of its own. A video created with a
+    content hash that matches an already converted video is linked to its
+    files instead, see link_to_original; other videos are hashed and checked
+    by the probe job.
 
     Parameters
     ----------
@@ -196,43 +766,103 @@ def video_post_save(sender, instance, created, **kwargs):
     None
     """
     if created:
+        original = find_original(instance)
+        if original:
+            link_to_original(instance, original)
+            logger.info(f"Video {instance.id} ist ein Duplikat von Video {original.id} und wird nicht konvertiert.")
+            return
         queue = django_rq.get_queue('default', autocommit=True)
         logger.info(f"Video {instance.id} wurde erstellt und wird in die Queue aufgenommen.")
-        queue.enqueue(process_and_save, instance.id,
-                      convert_144p, "video_144p", retry=Retry(max=3, interval=5))
-        queue.enqueue(process_and_save, instance.id,
-                      convert_240p, "video_240p", retry=Retry(max=3, interval=5))
-        queue.enqueue(process_and_save, instance.id,
-                      convert_360p, "video_360p", retry=Retry(max=3, interval=5))
-        queue.enqueue(process_and_save, instance.id,
-                      convert_480p, "video_480p", retry=Retry(max=3, interval=5))
-        queue.enqueue(process_and_save, instance.id,
-                      convert_720p, "video_720p", retry=Retry(max=3, interval=5))
-        queue.enqueue(process_and_save, instance.id,
-                      convert_1080p, "video_1080p", retry=Retry(max=3, interval=5))
+        enqueue_tracked(queue, probe_and_enqueue, instance.id, stage=TranscodeJob.STAGE_PROBE,
+                        retry=Retry(max=3, interval=5))
+        if not instance.thumbnail:
+            enqueue_tracked(queue, thumbnail_and_save, instance.id, stage=TranscodeJob.STAGE_THUMBNAIL,
+                            retry=Retry(max=3, interval=5))
+
+
+@receiver(post_save, sender=Video)
+@receiver(post_delete, sender=Video)
+def video_catalog_changed(sender, instance, **kwargs):
+    """
+    Bumps the catalog version when a video is saved or deleted, which
+    invalidates all cached catalog data such as the genre rows, and deletes
+    the cached card data of the video. Both happen again after the commit, so
+    a reader that cached the old data in between does not keep it.
+    """
+    video_id = instance.id
+    bump_catalog_version()
+    invalidate_video_card(video_id)
+    transaction.on_commit(bump_catalog_version)
+    transaction.on_commit(lambda: invalidate_video_card(video_id))
 
 
 @receiver(post_delete, sender=Video)
 def auto_delete_file_on_delete(sender, instance, **kwargs):
     """
-    Automatically deletes the video files when a Video instance is deleted.
+    Automatically deletes the original video file, the HLS packaging and any
+    leftover chunks of a chunked conversion when a Video instance is deleted.
+    Files shared with a duplicate of the video are kept. The rendition files
+    are deleted by rendition_post_delete as the renditions are cascaded.
     Connected to the post_delete signal of the Video model.
     """
-    video_fields = [
-        instance.video_file,
-        instance.video_144p,
-        instance.video_240p,
-        instance.video_360p,
-        instance.video_480p,
-        instance.video_720p,
-        instance.video_1080p,
-    ]
-    for file_field in video_fields:
-        if file_field and file_field.name:
-            file_path = file_field.path
-            if os.path.isfile(file_path):
-                os.remove(file_path)
-                print(f"Deleted: {file_path}")
-            else:
-                print(f"File not found: {file_path}")
-    print("Alle zugehörigen Videodateien wurden gelöscht.")
+    duplicates = Video.objects.filter(content_hash=instance.content_hash).exclude(id=instance.id) \
+        if instance.content_hash else Video.objects.none()
+    file_field = instance.video_file
+    if file_field and file_field.name and not duplicates.filter(video_file=file_field.name).exists():
+        delete_media_file(file_field)
+    if instance.hls_playlist and instance.hls_playlist.name and \
+            not duplicates.filter(hls_playlist=instance.hls_playlist.name).exists():
+        shutil.rmtree(os.path.dirname(instance.hls_playlist.path), ignore_errors=True)
+    shutil.rmtree(get_chunk_dir(instance.id), ignore_errors=True)
+    logger.info(f"Alle zugehörigen Videodateien von Video {instance.id} wurden gelöscht.")
+
+
+@receiver(post_save, sender=VideoRendition)
+@receiver(post_delete, sender=VideoRendition)
+def rendition_changed(sender, instance, **kwargs):
+    """
+    Updates updated_at of the video when one of its renditions is saved or
+    deleted, so the ETag of the video detail changes with its renditions, and
+    bumps the catalog version, which invalidates the cached responses.
+    """
+    Video.objects.filter(id=instance.video_id).update(updated_at=timezone.now())
+    bump_catalog_version()
+    transaction.on_commit(bump_catalog_version)
+
+
+@receiver(post_delete, sender=VideoRendition)
+def rendition_post_delete(sender, instance, **kwargs):
+    """
+    Automatically deletes the file of a rendition when the VideoRendition
+    instance is deleted, either directly or cascaded from its video, unless
+    another rendition still references the file.
+    Connected to the post_delete signal of the VideoRendition model.
+    """
+    if instance.file and instance.file.name and \
+            not VideoRendition.objects.filter(file=instance.file.name).exclude(id=instance.id).exists():
+        delete_media_file(instance.file)
+
+
+def delete_media_file(file_field):
+    """
+    Deletes the file of the given file field from disk, if it exists.
+
+    Parameters
+    ----------
+    file_field : FieldFile
+        The file field whose file is deleted.
+
+    Returns
+    -------
+    None
+    """
+    file_path = file_field.path
+    if not os.path.isfile(file_path):
+        logger.error(f"Datei nicht gefunden: {file_path}")
+        return
+    try:
+        os.remove(file_path)
+    except OSError:
+        logger.exception(f"Datei konnte nicht gelöscht werden: {file_path}")
+        return
+    logger.info(f"Gelöscht: {file_path}")
@@ -0,0 +1,193 @@
+import base64
+import hashlib
+import hmac
+import math
+import posixpath
+import time
+from urllib.parse import quote
+from django.conf import settings
+
+
+SIGNED_URL_PREFIX = 's'
+
+
+def get_signing_keys():
+    """
+    Returns the keys for signing media URLs.
+
+    The first key of the MEDIA_SIGNING_KEYS setting signs new URLs; all keys
+    are accepted when verifying, so a new key can be put in front while URLs
+    signed with the previous one are still valid. Defaults to SECRET_KEY.
+
+    Returns
+    -------
+    list
+        The keys as bytes.
+    """
+    keys = getattr(settings, 'MEDIA_SIGNING_KEYS', None) or [settings.SECRET_KEY]
+    return [key.encode() if isinstance(key, str) else key for key in keys]
+
+
+def get_url_expiry(now=None):
+    """
+    Returns the expiry of media URLs signed now.
+
+    The expiry is at least MEDIA_URL_LIFETIME seconds ahead and rounded up to a
+    multiple of MEDIA_URL_WINDOW seconds, so all URLs of a file signed within
+    one window are identical and a CDN can cache them.
+
+    Parameters
+    ----------
+    now : float, optional
+        The current time as Unix timestamp. Defaults to time.time().
+
+    Returns
+    -------
+    int
+        The expiry as Unix timestamp.
+    """
+    now = time.time() if now is None else now
+    window = getattr(settings, 'MEDIA_URL_WINDOW', 60 * 60)
+    lifetime = getattr(settings, 'MEDIA_URL_LIFETIME', 6 * 60 * 60)
+    return int(math.ceil((now + lifetime) / window) * window)
+
+
+def get_url_window_start(now=None):
+    """
+    Returns the time from which URLs are signed with the current expiry.
+
+    Parameters
+    ----------
+    now : float, optional
+        The current time as Unix timestamp. Defaults to time.time().
+
+    Returns
+    -------
+    int
+        The start of the signing window as Unix timestamp.
+    """
+    window = getattr(settings, 'MEDIA_URL_WINDOW', 60 * 60)
+    lifetime = getattr(settings, 'MEDIA_URL_LIFETIME', 6 * 60 * 60)
+    return get_url_expiry(now) - window - lifetime
+
+
+def get_signature(scope, expires, key):
+    """
+    Computes the HMAC-SHA256 signature of a media scope and expiry.
+
+    Parameters
+    ----------
+    scope : str
+        The signed path relative to MEDIA_URL: a file, or a directory ending
+        with '/' that covers every file below it.
+    expires : int
+        The expiry as Unix timestamp.
+    key : bytes
+        The signing key.
+
+    Returns
+    -------
+    str
+        The URL-safe base64 signature without padding.
+    """
+    digest = hmac.new(key, f"{scope}:{expires}".encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b'=').decode()
+
+
+def sign_media_url(name, scope=None):
+    """
+    Returns the signed URL of a media file.
+
+    The signature and the expiry are path segments in front of the file path,
+    so relative references resolve below the same signature; with a directory
+    scope, an HLS playlist can reference its variant playlists and segments.
+
+    Parameters
+    ----------
+    name : str
+        The name of the file relative to MEDIA_ROOT.
+    scope : str, optional
+        The signed scope, the file itself by default. A directory scope must
+        end with '/' and contain the file.
+
+    Returns
+    -------
+    str
+        The signed URL below MEDIA_URL.
+    """
+    expires = get_url_expiry()
+    signature = get_signature(scope or name, expires, get_signing_keys()[0])
+    return f"{settings.MEDIA_URL}{SIGNED_URL_PREFIX}/{expires}/{signature}/{quote(name)}"
+
+
+def sign_hls_url(name):
+    """
+    Returns the signed URL of an HLS master playlist, valid for every file of its directory.
+
+    Parameters
+    ----------
+    name : str
+        The name of the master playlist relative to MEDIA_ROOT.
+
+    Returns
+    -------
+    str
+        The signed URL below MEDIA_URL.
+    """
+    return sign_media_url(name, scope=posixpath.dirname(name) + '/')
+
+
+def get_scopes(path):
+    """
+    Returns the scopes a signature of the given path may have been issued for:
+    the path itself and each of its parent directories.
+
+    Parameters
+    ----------
+    path : str
+        The requested path relative to MEDIA_URL.
+
+    Returns
+    -------
+    list
+        The scopes, most specific first.
+    """
+    scopes = [path]
+    directory = posixpath.dirname(path)
+    while directory:
+        scopes.append(directory + '/')
+        directory = posixpath.dirname(directory)
+    return scopes
+
+
+def verify_media_signature(path, expires, signature, now=None):
+    """
+    Verifies the signature of a signed media URL without any database access.
+
+    The path is normalized first, so '..' segments can't step out of a signed
+    directory. Signatures are compared in constant time against every accepted key.
+
+    Parameters
+    ----------
+    path : str
+        The requested path relative to MEDIA_URL.
+    expires : int
+        The expiry from the URL.
+    signature : str
+        The signature from the URL.
+    now : float, optional
+        The current time as Unix timestamp. Defaults to time.time().
+
+    Returns
+    -------
+    bool
+        True if the URL has not expired and the signature matches.
+    """
+    path = posixpath.normpath(path)
+    if expires < (time.time() if now is None else now) or path.startswith(('/', '..')):
+        return False
+    valid = False
+    for key in get_signing_keys():
+        for scope in get_scopes(path):
+            valid |= hmac.compare_digest(get_signature(scope, expires, key), signature)
+    return valid
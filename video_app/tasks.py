@@ -1,14 +1,257 @@
 import os
 import subprocess
+import tempfile
 import logging
+import ffmpeg
+from django.conf import settings
 
 
 logger = logging.getLogger(__name__)
 
+LADDER = [
+    ("144p", "256x144"),
+    ("240p", "426x240"),
+    ("360p", "640x360"),
+    ("480p", "852x480"),
+    ("720p", "1280x720"),
+    ("1080p", "1920x1080"),
+]
+
+HLS_SEGMENT_SECONDS = 6
+
+DEFAULT_PROFILE = {
+    "codec": "libx264",
+    "preset": "medium",
+    "crf": 23,
+    "maxrate": None,
+    "audio_codec": "aac",
+    "audio_bitrate": None,
+    "audio_channels": 2,
+    "audio_rate": 44100,
+    "queue": "default",
+    "timeout": 4 * 60 * 60,
+}
+
+CODEC_NAMES = {
+    "libx264": "h264",
+    "libx265": "hevc",
+    "libsvtav1": "av1",
+    "libaom-av1": "av1",
+}
+
+
+def get_profile(name):
+    """
+    Returns an encoding profile from the VIDEO_ENCODING_PROFILES setting.
+
+    Missing keys are filled from DEFAULT_PROFILE, which matches the original
+    hard-coded encoding settings; an unknown name returns DEFAULT_PROFILE itself.
+
+    Args:
+        name (str): Name of the profile, e.g. 'preview'.
+
+    Returns:
+        dict: codec, preset, crf, maxrate, audio settings, queue and job timeout of the profile.
+    """
+    profiles = getattr(settings, 'VIDEO_ENCODING_PROFILES', {})
+    return {**DEFAULT_PROFILE, **profiles.get(name, {})}
+
+
+def get_profile_name(resolution):
+    """
+    Returns the name of the encoding profile of a resolution from the VIDEO_RUNG_PROFILES setting.
+
+    Args:
+        resolution (str): The resolution, e.g. '720p'.
+
+    Returns:
+        str: The profile name, 'standard' if the resolution has no profile assigned.
+    """
+    return getattr(settings, 'VIDEO_RUNG_PROFILES', {}).get(resolution, 'standard')
+
+
+def group_by_profile(resolutions):
+    """
+    Groups resolutions by their encoding profile.
+
+    Args:
+        resolutions (list): The resolutions, e.g. ['144p', '720p'].
+
+    Returns:
+        dict: Mapping of profile name to its resolutions, in the order given.
+    """
+    groups = {}
+    for resolution in resolutions:
+        groups.setdefault(get_profile_name(resolution), []).append(resolution)
+    return groups
+
+
+def get_codec_name(profile):
+    """
+    Returns the codec name of the video stream an encoding profile produces, e.g. 'h264' for libx264.
+    """
+    return CODEC_NAMES.get(profile["codec"], profile["codec"])
+
+
+def get_encoding_args(profile):
+    """
+    Builds the FFmpeg video and audio encoding options of an encoding profile.
+
+    Args:
+        profile (dict): The encoding profile, see get_profile.
+
+    Returns:
+        list: The FFmpeg options as argument list.
+    """
+    return get_video_args(profile) + get_audio_args(profile)
+
+
+def get_video_args(profile):
+    """
+    Builds the FFmpeg video encoding options of an encoding profile.
+
+    Args:
+        profile (dict): The encoding profile, see get_profile.
+
+    Returns:
+        list: The FFmpeg options as argument list.
+    """
+    args = ['-c:v', profile["codec"], '-preset', profile["preset"], '-crf', str(profile["crf"])]
+    if profile["maxrate"]:
+        args += ['-maxrate', profile["maxrate"], '-bufsize', profile.get("bufsize") or profile["maxrate"]]
+    return args
+
+
+def get_keyframe_args():
+    """
+    Builds the FFmpeg options that force a keyframe every HLS_SEGMENT_SECONDS,
+    so every rendition can be cut into HLS segments at the same timestamps.
+
+    Returns:
+        list: The FFmpeg options as argument list.
+    """
+    return ['-force_key_frames', f"expr:gte(t,n_forced*{HLS_SEGMENT_SECONDS})"]
+
+
+def get_audio_args(profile):
+    """
+    Builds the FFmpeg audio encoding options of an encoding profile.
+
+    Args:
+        profile (dict): The encoding profile, see get_profile.
+
+    Returns:
+        list: The FFmpeg options as argument list.
+    """
+    args = ['-c:a', profile["audio_codec"], '-ac', str(profile["audio_channels"]), '-ar', str(profile["audio_rate"])]
+    if profile["audio_bitrate"]:
+        args += ['-b:a', profile["audio_bitrate"]]
+    return args
+
+
+def probe_video(source):
+    """
+    Reads the technical metadata of a video file with ffprobe.
+
+    Args:
+        source (str): Path to the video file.
+
+    Returns:
+        dict or None: duration, width, height, video_codec, audio_codec, bitrate and
+        frame_rate of the video, or None if the file could not be probed.
+    """
+    try:
+        probe = ffmpeg.probe(source)
+    except (ffmpeg.Error, OSError) as e:
+        logger.error(f"Fehler beim Auslesen der Videodaten von {source}: {e}")
+        return None
+    video = next((s for s in probe.get('streams', []) if s.get('codec_type') == 'video'), {})
+    audio = next((s for s in probe.get('streams', []) if s.get('codec_type') == 'audio'), {})
+    format_info = probe.get('format', {})
+    return {
+        'duration': to_number(format_info.get('duration'), float),
+        'width': video.get('width'),
+        'height': video.get('height'),
+        'video_codec': video.get('codec_name', ''),
+        'audio_codec': audio.get('codec_name', ''),
+        'bitrate': to_number(format_info.get('bit_rate'), int),
+        'frame_rate': parse_frame_rate(video.get('avg_frame_rate')),
+    }
+
+
+def to_number(value, cast):
+    """
+    Converts a value reported by ffprobe to a number.
+
+    Args:
+        value (str or None): The value as reported by ffprobe.
+        cast (type): The number type to convert to (int or float).
+
+    Returns:
+        int or float or None: The converted value, or None if it is missing or invalid.
+    """
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_frame_rate(value):
+    """
+    Converts an ffprobe frame rate fraction (e.g. '30000/1001') to frames per second.
+
+    Args:
+        value (str or None): The frame rate fraction.
+
+    Returns:
+        float or None: The frame rate, or None if it is missing or invalid.
+    """
+    try:
+        numerator, denominator = value.split('/')
+        return round(int(numerator) / int(denominator), 3) if int(denominator) else None
+    except (AttributeError, ValueError):
+        return None
+
+
+def get_rungs(resolutions=None):
+    """
+    Returns the rungs of the ladder for the given resolutions.
+
+    Args:
+        resolutions (list, optional): Resolutions to keep (e.g. ['144p', '720p']). Defaults to all.
+
+    Returns:
+        list: (resolution, size) tuples in ladder order.
+    """
+    return [(resolution, size) for resolution, size in LADDER if resolutions is None or resolution in resolutions]
+
+
+def select_resolutions(width, height):
+    """
+    Selects the resolutions of the ladder that do not exceed the source resolution.
+
+    The shorter side of the source is compared, so portrait videos are treated
+    like their landscape counterparts. If the source size is unknown, all
+    resolutions are selected; if it is smaller than every rung, the lowest one is.
+
+    Args:
+        width (int or None): Width of the source video.
+        height (int or None): Height of the source video.
+
+    Returns:
+        list: The selected resolutions in ladder order.
+    """
+    if not width or not height:
+        return [resolution for resolution, _ in LADDER]
+    source_height = min(width, height)
+    selected = [resolution for resolution, _ in LADDER if int(resolution.rstrip('p')) <= source_height]
+    return selected or [LADDER[0][0]]
+
 
 def convert_video(source, resolution, size, folder):
     """
     Converts a video to a specified resolution and size, saving it to a designated folder.
+    The video is encoded with the encoding profile of the resolution.
 
     Args:
         source (str): Path to the source video file.
@@ -24,7 +267,8 @@ def convert_video(source, resolution, size, folder):
         return None
     source_linux, target_linux = get_paths(source, resolution, folder)
     os.makedirs(os.path.dirname(target_linux), exist_ok=True)
-    return run_ffmpeg_conversion(source_linux, size, target_linux, folder)
+    profile = get_profile(get_profile_name(resolution))
+    return run_ffmpeg_conversion(source_linux, size, target_linux, folder, profile)
 
 def get_paths(source, resolution, folder):
     """
@@ -52,7 +296,7 @@ def get_paths(source, resolution, folder):
     target_linux = os.path.join(target_dir, target)
     return source_linux, target_linux
 
-def run_ffmpeg_conversion(source, size, target, folder):
+def run_ffmpeg_conversion(source, size, target, folder, profile=None):
     """
     Executes an FFmpeg command to convert a video file to a specified size and format.
 
@@ -61,19 +305,18 @@ def run_ffmpeg_conversion(source, size, target, folder):
         size (str): Target video dimensions (e.g., '1280x720').
         target (str): Path for the output converted video file.
         folder (str): Destination folder for the converted video.
+        profile (dict, optional): The encoding profile. Defaults to DEFAULT_PROFILE.
 
     Returns:
         str or None: Path to the converted video file if successful, otherwise None.
     """
-    if os.name == 'nt': 
-        cmd = ['ffmpeg', '-i', source, '-s', size, '-c:v', 'libx264', '-crf', '23',
-               '-c:a', 'aac', '-strict', '-2', '-ac', '2', '-ar', '44100', '-preset', 'medium', target]
-    # elif os.name == 'posix': 
-    #     cmd = ['wsl.exe', 'ffmpeg', '-i', source, '-s', size, '-c:v', 'libx264', '-crf', '23',
-    #            '-c:a', 'aac', '-strict', '-2', '-ac', '2', '-ar', '44100', '-preset', 'medium', target]
+    encoding_args = get_encoding_args(profile or DEFAULT_PROFILE) + get_keyframe_args()
+    if os.name == 'nt':
+        cmd = ['ffmpeg', '-i', source, '-s', size, *encoding_args, '-strict', '-2', target]
+    # elif os.name == 'posix':
+    #     cmd = ['wsl.exe', 'ffmpeg', '-i', source, '-s', size, *encoding_args, '-strict', '-2', target]
     elif os.name == 'posix':
-        cmd = ['ffmpeg', '-i', source, '-s', size, '-c:v', 'libx264', '-crf', '23',
-            '-c:a', 'aac', '-strict', '-2', '-ac', '2', '-ar', '44100', '-preset', 'medium', target]
+        cmd = ['ffmpeg', '-i', source, '-s', size, *encoding_args, '-strict', '-2', target]
     else:
         raise EnvironmentError("Unbekanntes Betriebssystem.")
     logger.info(f"FFmpeg Befehl: {' '.join(cmd)}")
@@ -88,6 +331,378 @@ def run_ffmpeg_conversion(source, size, target, folder):
     return None
 
 
+def convert_ladder(source, rungs=None, profile=None, on_progress=None):
+    """
+    Converts a video into several resolutions with a single FFmpeg run.
+
+    The source is demuxed and decoded only once; a split/scale filter graph
+    feeds one encoder per resolution. The audio is encoded once beforehand and
+    copied into every resolution.
+
+    Args:
+        source (str): Path to the source video file.
+        rungs (list, optional): (resolution, size) tuples to produce. Defaults to LADDER.
+        profile (dict, optional): The encoding profile of all rungs. Defaults to DEFAULT_PROFILE.
+        on_progress (callable, optional): Called with the encoded seconds of the source, see run_ffmpeg.
+
+    Returns:
+        dict: Mapping of resolution to the converted video file path. Empty if the conversion failed.
+    """
+    rungs = rungs or LADDER
+    if not os.path.exists(source):
+        logger.error(f"Videoquelle existiert nicht: {source}")
+        return {}
+    targets = {}
+    for resolution, _ in rungs:
+        source_linux, target_linux = get_paths(source, resolution, resolution)
+        os.makedirs(os.path.dirname(target_linux), exist_ok=True)
+        targets[resolution] = target_linux
+    audio = None
+    if has_audio(source_linux):
+        fd, audio = tempfile.mkstemp(suffix='.mka')
+        os.close(fd)
+        if not encode_audio(source_linux, audio, profile):
+            os.remove(audio)
+            return {}
+    cmd = build_ladder_command(source_linux, rungs, targets, profile, audio)
+    logger.info(f"FFmpeg Befehl: {' '.join(cmd)}")
+    returncode, stderr = run_ffmpeg(cmd, on_progress)
+    if audio:
+        os.remove(audio)
+    if returncode == 0:
+        logger.info(f"Konvertierung erfolgreich: {', '.join(targets.values())}")
+        return targets
+    logger.error(f"Fehler bei der Konvertierung: {stderr}")
+    return {}
+
+
+def run_ffmpeg(cmd, on_progress=None):
+    """
+    Runs an FFmpeg command and reports its progress.
+
+    With a progress callback, FFmpeg writes its machine-readable -progress output
+    to stdout; the callback is called with the encoded seconds of the source for
+    every progress block. stderr goes to a temporary file so a chatty FFmpeg can't
+    block on a full pipe.
+
+    Args:
+        cmd (list): The FFmpeg command as argument list, starting with 'ffmpeg'.
+        on_progress (callable, optional): Called with the encoded seconds (float).
+
+    Returns:
+        tuple: The return code of FFmpeg and its stderr output.
+    """
+    if not on_progress:
+        run = subprocess.run(cmd, capture_output=True, text=True)
+        return run.returncode, run.stderr
+    cmd = [cmd[0], '-progress', 'pipe:1', '-nostats', *cmd[1:]]
+    with tempfile.TemporaryFile(mode='w+') as stderr:
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr, text=True)
+        for line in process.stdout:
+            key, _, value = line.strip().partition('=')
+            if key == 'out_time_us' and value.isdigit():
+                on_progress(int(value) / 1_000_000)
+        returncode = process.wait()
+        stderr.seek(0)
+        return returncode, stderr.read()
+
+
+def build_ladder_command(source, rungs, targets, profile=None, audio=None):
+    """
+    Builds an FFmpeg command that writes every rung of the ladder from one decode.
+
+    Args:
+        source (str): Path to the source video file.
+        rungs (list): (resolution, size) tuples to produce, e.g. ('720p', '1280x720').
+        targets (dict): Mapping of resolution to the output file path.
+        profile (dict, optional): The encoding profile of all rungs. Defaults to DEFAULT_PROFILE.
+        audio (str, optional): Path to the encoded audio, see encode_audio, which is copied
+            into every rung. Defaults to no audio.
+
+    Returns:
+        list: The FFmpeg command as argument list.
+    """
+    splits = ''.join(f"[s{index}]" for index in range(len(rungs)))
+    graph = [f"[0:v]split={len(rungs)}{splits}"]
+    for index, (_, size) in enumerate(rungs):
+        width, height = size.split('x')
+        graph.append(f"[s{index}]scale={width}:{height}[v{index}]")
+    video_args = get_video_args(profile or DEFAULT_PROFILE)
+    audio_args = ['-map', '1:a', '-c:a', 'copy'] if audio else []
+    cmd = ['ffmpeg', '-y', '-i', source, *(['-i', audio] if audio else []), '-filter_complex', ';'.join(graph)]
+    for index, (resolution, _) in enumerate(rungs):
+        cmd += ['-map', f"[v{index}]", *video_args, *get_keyframe_args(), *audio_args, targets[resolution]]
+    return cmd
+
+
+def has_audio(source):
+    """
+    Checks whether a video file has an audio stream.
+
+    Args:
+        source (str): Path to the video file.
+
+    Returns:
+        bool: True if ffprobe found an audio stream.
+    """
+    metadata = probe_video(source)
+    return bool(metadata and metadata['audio_codec'])
+
+
+def encode_audio(source, target, profile=None):
+    """
+    Encodes the first audio stream of a source once, so the resolutions can copy it
+    instead of encoding the same audio again.
+
+    Args:
+        source (str): Path to the source video file.
+        target (str): Path of the audio file; a Matroska file takes every audio codec.
+        profile (dict, optional): The encoding profile of the audio. Defaults to DEFAULT_PROFILE.
+
+    Returns:
+        str: The path of the audio file, or None if the encoding failed.
+    """
+    cmd = build_audio_command(source, target, profile)
+    logger.info(f"FFmpeg Befehl: {' '.join(cmd)}")
+    returncode, stderr = run_ffmpeg(cmd)
+    if returncode == 0:
+        return target
+    logger.error(f"Fehler bei der Audiokodierung: {stderr}")
+    return None
+
+
+def build_audio_command(source, target, profile=None):
+    """
+    Builds an FFmpeg command that encodes only the first audio stream of a source.
+
+    Args:
+        source (str): Path to the source video file.
+        target (str): Path of the audio file.
+        profile (dict, optional): The encoding profile of the audio. Defaults to DEFAULT_PROFILE.
+
+    Returns:
+        list: The FFmpeg command as argument list.
+    """
+    return ['ffmpeg', '-y', '-i', source, '-map', '0:a:0', '-vn', *get_audio_args(profile or DEFAULT_PROFILE), target]
+
+
+def split_source(source, target_dir, chunk_seconds):
+    """
+    Splits the video stream of a source into chunks at keyframes without re-encoding.
+
+    Every chunk starts at a keyframe of the source, so it can be encoded on its
+    own. The audio is not split; it is encoded once for all resolutions and
+    copied in when the chunks are concatenated, which avoids gaps at the
+    chunk boundaries.
+
+    Args:
+        source (str): Path to the source video file.
+        target_dir (str): Directory for the chunks.
+        chunk_seconds (int): Minimum length of a chunk in seconds; a chunk ends at the first keyframe after it.
+
+    Returns:
+        list: Paths of the chunks in playback order. Empty if the split failed.
+    """
+    if not os.path.exists(source):
+        logger.error(f"Videoquelle existiert nicht: {source}")
+        return []
+    os.makedirs(target_dir, exist_ok=True)
+    cmd = build_split_command(source, os.path.join(target_dir, 'chunk_%05d.mkv'), chunk_seconds)
+    logger.info(f"FFmpeg Befehl: {' '.join(cmd)}")
+    returncode, stderr = run_ffmpeg(cmd)
+    if returncode != 0:
+        logger.error(f"Fehler beim Aufteilen: {stderr}")
+        return []
+    return [os.path.join(target_dir, name) for name in sorted(os.listdir(target_dir)) if name.startswith('chunk_')]
+
+
+def build_split_command(source, pattern, chunk_seconds):
+    """
+    Builds an FFmpeg command that copies the video stream of a source into keyframe-aligned chunks.
+
+    Args:
+        source (str): Path to the source video file.
+        pattern (str): Output path pattern of the chunks, e.g. 'chunk_%05d.mkv'.
+        chunk_seconds (int): Minimum length of a chunk in seconds.
+
+    Returns:
+        list: The FFmpeg command as argument list.
+    """
+    return ['ffmpeg', '-y', '-i', source, '-map', '0:v:0', '-c', 'copy', '-f', 'segment',
+            '-segment_time', str(chunk_seconds), '-reset_timestamps', '1', pattern]
+
+
+def encode_chunk(chunk, rungs, target_dir, profile=None, on_progress=None):
+    """
+    Converts a chunk of a source into several resolutions with a single FFmpeg run.
+
+    Keyframes are forced every HLS_SEGMENT_SECONDS from the start of the chunk,
+    so all resolutions share the same keyframes after the concatenation.
+
+    Args:
+        chunk (str): Path to the chunk, see split_source.
+        rungs (list): (resolution, size) tuples to produce.
+        target_dir (str): Directory for the encoded chunks; each resolution gets a subdirectory.
+        profile (dict, optional): The encoding profile of all rungs. Defaults to DEFAULT_PROFILE.
+        on_progress (callable, optional): Called with the encoded seconds of the chunk, see run_ffmpeg.
+
+    Returns:
+        dict: Mapping of resolution to the encoded chunk path. Empty if the conversion
+            failed, in which case partial outputs are removed.
+    """
+    name = os.path.splitext(os.path.basename(chunk))[0] + '.mp4'
+    targets = {}
+    for resolution, _ in rungs:
+        os.makedirs(os.path.join(target_dir, resolution), exist_ok=True)
+        targets[resolution] = os.path.join(target_dir, resolution, name)
+    cmd = build_ladder_command(chunk, rungs, targets, profile)
+    logger.info(f"FFmpeg Befehl: {' '.join(cmd)}")
+    returncode, stderr = run_ffmpeg(cmd, on_progress)
+    if returncode == 0:
+        return targets
+    logger.error(f"Fehler bei der Konvertierung: {stderr}")
+    for target in targets.values():
+        if os.path.exists(target):
+            os.remove(target)
+    return {}
+
+
+def concat_chunks(chunks, audio, target):
+    """
+    Concatenates encoded chunks and adds the encoded audio, both without re-encoding.
+
+    Args:
+        chunks (list): Paths of the encoded chunks in playback order.
+        audio (str or None): Path to the encoded audio, see encode_audio. None for a video without audio.
+        target (str): Path of the output file.
+
+    Returns:
+        str: The path of the output file, or None if the concatenation failed.
+    """
+    list_path = f"{target}.txt"
+    with open(list_path, 'w') as file:
+        for chunk in chunks:
+            file.write("file '{}'\n".format(chunk.replace("'", "'\\''")))
+    cmd = build_concat_command(list_path, audio, target)
+    logger.info(f"FFmpeg Befehl: {' '.join(cmd)}")
+    returncode, stderr = run_ffmpeg(cmd)
+    os.remove(list_path)
+    if returncode == 0:
+        return target
+    logger.error(f"Fehler beim Zusammenfügen: {stderr}")
+    return None
+
+
+def build_concat_command(list_path, audio, target):
+    """
+    Builds an FFmpeg command that joins the chunks of a concat list and muxes in the encoded audio.
+
+    Args:
+        list_path (str): Path to the concat list of the encoded chunks.
+        audio (str or None): Path to the encoded audio. None for a video without audio.
+        target (str): Path of the output file.
+
+    Returns:
+        list: The FFmpeg command as argument list.
+    """
+    audio_args = ['-i', audio, '-map', '0:v', '-map', '1:a'] if audio else ['-map', '0:v']
+    return ['ffmpeg', '-y', '-f', 'concat', '-safe', '0', '-i', list_path, *audio_args, '-c', 'copy', target]
+
+
+def package_hls(renditions, target_dir):
+    """
+    Packages converted videos as HLS with fMP4 segments and writes a master playlist.
+
+    The renditions are remuxed without re-encoding. Their keyframes are aligned
+    by the ladder conversion, so all renditions share the same segment boundaries
+    and players can switch between them mid-stream.
+
+    Args:
+        renditions (list): (resolution, size, path) tuples of the converted videos.
+        target_dir (str): Directory for the playlists and segments.
+
+    Returns:
+        str or None: Path to the master playlist if successful, otherwise None.
+    """
+    os.makedirs(target_dir, exist_ok=True)
+    variants = []
+    for resolution, size, path in renditions:
+        playlist = os.path.join(target_dir, f"{resolution}.m3u8")
+        cmd = build_hls_command(path, resolution, target_dir, playlist)
+        logger.info(f"FFmpeg Befehl: {' '.join(cmd)}")
+        run = subprocess.run(cmd, capture_output=True, text=True)
+        if run.returncode != 0:
+            logger.error(f"Fehler beim HLS-Packaging: {run.stderr}")
+            return None
+        variants.append((playlist, size, get_peak_bandwidth(playlist)))
+    master_path = os.path.join(target_dir, "master.m3u8")
+    with open(master_path, "w", encoding="utf-8") as master:
+        master.write(build_master_playlist(variants))
+    logger.info(f"HLS-Packaging erfolgreich: {master_path}")
+    return master_path
+
+
+def build_hls_command(source, resolution, target_dir, playlist):
+    """
+    Builds an FFmpeg command that remuxes one rendition into HLS fMP4 segments.
+
+    Args:
+        source (str): Path to the converted video file.
+        resolution (str): Resolution of the rendition, used as segment prefix.
+        target_dir (str): Directory for the segments.
+        playlist (str): Path of the rendition playlist.
+
+    Returns:
+        list: The FFmpeg command as argument list.
+    """
+    return ['ffmpeg', '-y', '-i', source, '-c', 'copy', '-f', 'hls',
+            '-hls_time', str(HLS_SEGMENT_SECONDS), '-hls_playlist_type', 'vod',
+            '-hls_segment_type', 'fmp4', '-hls_fmp4_init_filename', f"{resolution}_init.mp4",
+            '-hls_segment_filename', os.path.join(target_dir, f"{resolution}_%05d.m4s"), playlist]
+
+
+def get_peak_bandwidth(playlist):
+    """
+    Calculates the peak bitrate of a rendition from the segments of its playlist.
+
+    Args:
+        playlist (str): Path of the rendition playlist.
+
+    Returns:
+        int: The highest segment bitrate in bits per second.
+    """
+    target_dir = os.path.dirname(playlist)
+    peak = 0
+    duration = None
+    with open(playlist, encoding="utf-8") as file:
+        for line in file:
+            line = line.strip()
+            if line.startswith("#EXTINF:"):
+                duration = float(line[len("#EXTINF:"):].split(",")[0])
+            elif line and not line.startswith("#") and duration:
+                size = os.path.getsize(os.path.join(target_dir, line))
+                peak = max(peak, int(size * 8 / duration))
+                duration = None
+    return peak
+
+
+def build_master_playlist(variants):
+    """
+    Builds the content of an HLS master playlist.
+
+    Args:
+        variants (list): (playlist path, size, bandwidth) tuples, one per rendition.
+
+    Returns:
+        str: The master playlist.
+    """
+    lines = ["#EXTM3U", "#EXT-X-VERSION:7", "#EXT-X-INDEPENDENT-SEGMENTS"]
+    for playlist, size, bandwidth in variants:
+        lines.append(f"#EXT-X-STREAM-INF:BANDWIDTH={bandwidth},RESOLUTION={size}")
+        lines.append(os.path.basename(playlist))
+    return "\n".join(lines) + "\n"
+
+
 
 def convert_144p(source):
     """
@@ -0,0 +1,21 @@
+"""
+Periodic jobs of the RQ cron scheduler.
+
+Start the scheduler next to the workers with:
+
+    rq cron videoflix_backend_hub.cron
+"""
+
+import os
+
+import django
+from rq import cron
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'videoflix_backend_hub.settings')
+django.setup()
+
+from users_app.tasks import EMAIL_QUEUE, purge_expired_tokens, recover_stalled_emails  # noqa: E402
+
+
+cron.register(purge_expired_tokens, 'low', interval=60 * 60)
+cron.register(recover_stalled_emails, EMAIL_QUEUE, interval=5 * 60)
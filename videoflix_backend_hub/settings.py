@@ -19,8 +19,22 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
 
+# Hands media delivery off to the web server, e.g. '/protected-media/' for an
+# internal nginx location aliased to MEDIA_ROOT, or X-Sendfile for Apache.
+MEDIA_ACCEL_REDIRECT_PREFIX = None
+MEDIA_USE_SENDFILE = False
+
 SECRET_KEY = SECRET_KEY
 
+# Keys for the HMAC signatures of media URLs. The first key signs, all keys
+# verify: to rotate, put the new key in front and drop the old one once the
+# URLs signed with it have expired (MEDIA_URL_LIFETIME).
+MEDIA_SIGNING_KEYS = [SECRET_KEY]
+# Signed media URLs are valid for at least MEDIA_URL_LIFETIME seconds; their
+# expiry is rounded up to MEDIA_URL_WINDOW, so URLs stay stable for CDN caching.
+MEDIA_URL_LIFETIME = 6 * 60 * 60
+MEDIA_URL_WINDOW = 60 * 60
+
 DEBUG = True
 
 ALLOWED_HOSTS = ALLOWED_HOSTS
@@ -44,6 +58,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'users_app',
     'video_app.apps.VideoAppConfig',
     'rest_framework',
@@ -72,12 +87,76 @@ MIDDLEWARE = [
 ]
 
 RQ_QUEUES = {
+    'high': {
+        'HOST': 'localhost',
+        'PORT': 6379,
+        'DB': 0,
+        'DEFAULT_TIMEOUT': 360,
+    },
     'default': {
         'HOST': 'localhost',
         'PORT': 6379,
         'DB': 0,
         'DEFAULT_TIMEOUT': 360,
     },
+    'low': {
+        'HOST': 'localhost',
+        'PORT': 6379,
+        'DB': 0,
+        'DEFAULT_TIMEOUT': 360,
+    },
+    'email': {
+        'HOST': 'localhost',
+        'PORT': 6379,
+        'DB': 0,
+        'DEFAULT_TIMEOUT': 360,
+    },
+}
+
+VIDEO_LADDER_MODE = True
+
+VIDEO_CHUNKED_MIN_DURATION = 10 * 60
+
+VIDEO_CHUNK_SECONDS = 120
+
+VIDEO_SEARCH_CONFIG = 'german'
+
+VIDEO_ENCODING_PROFILES = {
+    'preview': {
+        'codec': 'libx264',
+        'preset': 'veryfast',
+        'crf': 28,
+        'audio_bitrate': '64k',
+        'queue': 'high',
+        'timeout': 60 * 60,
+    },
+    'standard': {
+        'codec': 'libx264',
+        'preset': 'medium',
+        'crf': 23,
+        'audio_bitrate': '128k',
+        'queue': 'default',
+        'timeout': 4 * 60 * 60,
+    },
+    'high_quality': {
+        'codec': 'libx264',
+        'preset': 'slow',
+        'crf': 20,
+        'maxrate': '8M',
+        'bufsize': '16M',
+        'audio_bitrate': '192k',
+        'queue': 'low',
+        'timeout': 8 * 60 * 60,
+    },
+}
+
+VIDEO_RUNG_PROFILES = {
+    '144p': 'preview',
+    '240p': 'preview',
+    '360p': 'standard',
+    '480p': 'standard',
+    '720p': 'standard',
+    '1080p': 'high_quality',
 }
 
 INTERNAL_IPS = [
@@ -95,6 +174,35 @@ CACHES = {
     }
 }
 
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'users_app.authentication.CachedTokenAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ],
+    # Sliding-window limits of the login, registration and password reset views
+    # per client IP and per email address (see users_app.api.throttling).
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': '30/min',
+        'login_email': '10/hour',
+        'registration_ip': '10/hour',
+        'registration_email': '3/hour',
+        'password_reset_ip': '10/hour',
+        'password_reset_email': '3/hour',
+    },
+    # Number of trusted proxies in front of the app. While None, the limits per IP
+    # use REMOTE_ADDR and ignore X-Forwarded-For, which clients can set freely.
+    'NUM_PROXIES': None,
+}
+
+# Seconds an auth token is valid after it was issued; active tokens are mirrored
+# in the cache until they expire (see users_app.authentication).
+TOKEN_LIFETIME = 7 * 24 * 60 * 60
+# Seconds the flags of a token's user (is_active, is_staff, ...) stay cached.
+TOKEN_USER_CACHE_TIMEOUT = 5 * 60
+# Number of expired tokens the purge job deletes per query.
+TOKEN_PURGE_BATCH_SIZE = 1000
+
 ROOT_URLCONF = 'videoflix_backend_hub.urls'
 
 TEMPLATES = [
@@ -163,5 +271,9 @@ EMAIL_PORT = 587
 EMAIL_USE_TLS = True
 EMAIL_HOST_USER = EMAIL_HOST_USER
 EMAIL_HOST_PASSWORD = EMAIL_HOST_PASSWORD
+# Maximum number of queued emails the email worker takes from Redis at once.
+EMAIL_BATCH_SIZE = 50
+# Failed send attempts after which an email is moved to the dead-letter list (emails:dead).
+EMAIL_MAX_ATTEMPTS = 10
 
 
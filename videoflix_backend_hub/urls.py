@@ -17,8 +17,8 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path
 from django.conf import settings
-from django.conf.urls.static import static
 from django.urls import include
+from video_app.media import serve_media, serve_signed_media
 
 
 urlpatterns = [
@@ -27,5 +27,8 @@ urlpatterns = [
     path('django-rq/', include('django_rq.urls')),
     path('api/', include('users_app.api.urls')),
     path('api/', include('video_app.api.urls')),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    path(f"{settings.MEDIA_URL.lstrip('/')}s/<int:expires>/<str:signature>/<path:path>", serve_signed_media,
+         name='signed-media'),
+    path(f"{settings.MEDIA_URL.lstrip('/')}<path:path>", serve_media, name='media'),
+]
 